@@ -0,0 +1,169 @@
+"""Admission control for requests that parse models.
+
+The worker pools bound how many parses run, but not how much memory they
+take: a burst of large uploads can fit in the pools' queues and still drive
+the container into swap, after which every request times out. The
+``AdmissionController`` sheds load before that happens:
+
+* **Memory budget.** Every parse reserves its estimated peak memory (from
+  file size and pre-scanned entity count) for as long as it runs. Memory
+  the process holds outside parses (``held_bytes``, such as open models in
+  the model cache) counts against the budget too. A parse that does not
+  fit is rejected with 503, or waits when it comes from the
+  job queue, which is already the place where work waits. A model larger
+  than the whole budget is admitted only when nothing else is reserved.
+* **Per-client limits.** A token bucket caps how often one client may
+  submit parses, and a counter caps how many of its requests are in
+  flight at once, so one client's burst cannot use up the budget for
+  everyone. Both answer 429.
+
+Rejections carry a ``retry_after`` in seconds for the Retry-After header:
+the time until the client's next token, or a fixed back-off when memory or
+concurrency is exhausted. ``saturated`` reports whether the service should
+take new work at all; ``/health`` uses it for readiness.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator
+
+# Client buckets kept before idle (full) ones are dropped
+MAX_TRACKED_CLIENTS = 10_000
+
+
+class AdmissionError(Exception):
+    """Raised when a request is not admitted; maps to an HTTP 429 or 503."""
+
+    def __init__(self, message: str, status_code: int, retry_after: float, reason: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Bucket:
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        memory_budget: int,
+        client_concurrency: int = 0,
+        client_rate_per_minute: float = 0.0,
+        client_burst: int = 1,
+        retry_after: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+        held_bytes: Callable[[], int] = lambda: 0,
+    ):
+        self.memory_budget = memory_budget
+        self.held_bytes = held_bytes
+        self.client_concurrency = client_concurrency
+        self.client_rate = client_rate_per_minute / 60.0
+        self.client_burst = max(1, client_burst)
+        self.retry_after = retry_after
+        self.clock = clock
+        self.reserved_bytes = 0
+        self.reservations = 0
+        self._released = asyncio.Condition()
+        self._waiting = 0
+        self._buckets: Dict[str, _Bucket] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._rejected = {"rate": 0, "concurrency": 0, "memory": 0}
+
+    # -- per-client limits ------------------------------------------------
+
+    def _take_token(self, client: str) -> None:
+        if self.client_rate <= 0:
+            return
+        now = self.clock()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_CLIENTS:
+                self._prune(now)
+            bucket = self._buckets[client] = _Bucket(self.client_burst, now)
+        bucket.tokens = min(self.client_burst, bucket.tokens + (now - bucket.updated) * self.client_rate)
+        bucket.updated = now
+        if bucket.tokens < 1:
+            self._rejected["rate"] += 1
+            raise AdmissionError(
+                f"Rate limit exceeded: at most {self.client_rate * 60:g} parse requests per minute",
+                429, (1 - bucket.tokens) / self.client_rate, "rate",
+            )
+        bucket.tokens -= 1
+
+    def _prune(self, now: float) -> None:
+        for client, bucket in list(self._buckets.items()):
+            if bucket.tokens + (now - bucket.updated) * self.client_rate >= self.client_burst:
+                del self._buckets[client]
+
+    @contextmanager
+    def client(self, client: str) -> Iterator[None]:
+        """Hold one of ``client``'s request slots for the ``with`` block"""
+        active = self._in_flight.get(client, 0)
+        if self.client_concurrency and active >= self.client_concurrency:
+            self._rejected["concurrency"] += 1
+            raise AdmissionError(
+                f"Too many concurrent parse requests: at most {self.client_concurrency} per client",
+                429, self.retry_after, "concurrency",
+            )
+        self._take_token(client)
+        self._in_flight[client] = active + 1
+        try:
+            yield
+        finally:
+            remaining = self._in_flight[client] - 1
+            if remaining:
+                self._in_flight[client] = remaining
+            else:
+                del self._in_flight[client]
+
+    # -- memory budget ----------------------------------------------------
+
+    def _fits(self, cost: int) -> bool:
+        return self.reservations == 0 or self.reserved_bytes + self.held_bytes() + cost <= self.memory_budget
+
+    @asynccontextmanager
+    async def reserve(self, cost: int, wait: bool = False) -> AsyncIterator[None]:
+        """Reserve ``cost`` bytes of the budget for the ``with`` block"""
+        if not self._fits(cost):
+            if not wait:
+                self._rejected["memory"] += 1
+                raise AdmissionError(
+                    f"Not enough memory to parse this model now ({cost // 2 ** 20} MB needed, "
+                    f"{max(self.memory_budget - self.reserved_bytes - self.held_bytes(), 0) // 2 ** 20} MB free)",
+                    503, self.retry_after, "memory",
+                )
+            async with self._released:
+                self._waiting += 1
+                try:
+                    await self._released.wait_for(lambda: self._fits(cost))
+                finally:
+                    self._waiting -= 1
+        self.reserved_bytes += cost
+        self.reservations += 1
+        try:
+            yield
+        finally:
+            self.reserved_bytes -= cost
+            self.reservations -= 1
+            async with self._released:
+                self._released.notify_all()
+
+    @property
+    def saturated(self) -> bool:
+        """Whether the memory budget is used up"""
+        return self.reservations > 0 and self.reserved_bytes + self.held_bytes() >= self.memory_budget
+
+    def stats(self) -> Dict:
+        return {
+            "memory_budget_bytes": self.memory_budget,
+            "reserved_bytes": self.reserved_bytes,
+            "held_bytes": self.held_bytes(),
+            "reservations": self.reservations,
+            "waiting": self._waiting,
+            "clients_in_flight": sum(self._in_flight.values()),
+            "rejected": dict(self._rejected),
+        }
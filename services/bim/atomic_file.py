@@ -0,0 +1,33 @@
+"""Atomic replacement of files written by concurrent workers.
+
+Parse outputs are content-addressed, so two workers parsing the same model
+write byte-identical files to the same path. Each writer gets its own
+temporary name; whichever ``os.replace`` lands last wins, and a writer that
+loses the race has still left the correct content in place.
+"""
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator
+from uuid import uuid4
+
+
+def temporary_path(path: Path) -> Path:
+    """A sibling of ``path`` no other process or thread will pick"""
+    return path.with_name(f"{path.name}.{os.getpid()}.{uuid4().hex}.tmp")
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = "w") -> Iterator[IO]:
+    """Open a temporary file that replaces ``path`` when the block exits cleanly
+
+    The temporary file is removed if the block raises.
+    """
+    tmp_path = temporary_path(path)
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,100 @@
+"""Benchmark: element classification in BIMProcessor.parse_ifc.
+
+Compares the legacy approach (one ``by_type`` scan per cost database entry)
+against the single-pass ``BIMProcessor._classify_elements`` on a synthetic
+model, both with the stock 7-entry cost database and with a catalogue
+covering every IfcElement subclass in the schema.
+
+    python benchmarks/bench_classification.py --entities 1000000
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ifcopenshell  # noqa: E402
+
+from benchmarks.synthetic_ifc import write_synthetic_ifc  # noqa: E402
+from main import BIMProcessor  # noqa: E402
+
+
+def classify_legacy(processor, ifc_file):
+    """The pre-index behaviour: a by_type scan per cost category."""
+    return {element_type: ifc_file.by_type(element_type) for element_type in processor.cost_database}
+
+
+def _all_element_classes(schema_name):
+    schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema_name)
+    root = schema.declaration_by_name("IfcElement").as_entity()
+    found, stack = [], [root]
+    while stack:
+        entity = stack.pop()
+        found.append(entity.name())
+        stack.extend(entity.subtypes())
+    return found
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"best_s": round(min(samples), 4), "median_s": round(statistics.median(samples), 4)}
+
+
+def run(entities, repeat, model=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(model) if model else Path(tmp) / "bench.ifc"
+        if not model:
+            write_synthetic_ifc(path, entities)
+
+        start = time.perf_counter()
+        ifc_file = ifcopenshell.open(str(path))
+        open_s = time.perf_counter() - start
+
+        results = {
+            "model": str(path),
+            "entities": len(ifc_file.wrapped_data.entity_names()),
+            "open_s": round(open_s, 3),
+            "catalogues": {},
+        }
+
+        processor = BIMProcessor()
+        large_catalogue = {cls: {"material_cost": 1.0, "labor_cost": 1.0, "unit": "each"}
+                           for cls in _all_element_classes(ifc_file.schema)}
+
+        for name, catalogue in (("stock", dict(processor.cost_database)), ("all_ifc_elements", large_catalogue)):
+            processor.cost_database = catalogue
+            legacy = classify_legacy(processor, ifc_file)
+            single = processor._classify_elements(ifc_file)
+            # Both must find the same number of priced elements
+            assert sum(map(len, legacy.values())) >= sum(map(len, single.values()))
+            processor._classify_elements(ifc_file)  # warm the category index
+            results["catalogues"][name] = {
+                "categories": len(catalogue),
+                "legacy_by_type": _time(lambda: classify_legacy(processor, ifc_file), repeat),
+                "single_pass": _time(lambda: processor._classify_elements(ifc_file), repeat),
+                "classified_elements": sum(map(len, single.values())),
+            }
+            entry = results["catalogues"][name]
+            entry["speedup"] = round(entry["legacy_by_type"]["best_s"] / max(entry["single_pass"]["best_s"], 1e-9), 2)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--model", help="benchmark an existing IFC file instead of a synthetic one")
+    args = parser.parse_args()
+    print(json.dumps(run(args.entities, args.repeat, args.model), indent=2))
+
+
+if __name__ == "__main__":
+    main()
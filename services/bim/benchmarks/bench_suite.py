@@ -0,0 +1,249 @@
+"""Benchmark suite for the BIM service.
+
+Generates synthetic models at each requested size, with and without
+quantity sets, and measures:
+
+* ``parse_ifc`` and ``parse_ifc_streaming`` end to end;
+* per-element quantity lookups: the legacy ``IsDefinedBy`` walk, the
+  in-memory ``QuantityIndex`` and the persisted index the element endpoint
+  loads;
+* report generation (``generate_pdf_report``);
+* ``POST /upload`` latency and throughput through the ASGI app, with the
+  real worker pool, for cold parses and parse-cache hits.
+
+Results are JSON (see ``--output``) with the commit and environment they
+were taken on; ``compare.py`` diffs two result files.
+
+    python benchmarks/bench_suite.py --sizes 10000,100000,1000000 --output before.json
+    python benchmarks/bench_suite.py --sizes 10000,100000,1000000 --output after.json
+    python benchmarks/compare.py before.json after.json
+
+Sizes up to 5M entities work, but the full parser then needs several GB of
+memory; ``--skip`` drops groups (``parse``, ``lookups``, ``report``,
+``upload``) that are not of interest.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVICE_DIR))
+
+import ifcopenshell  # noqa: E402
+
+from benchmarks.synthetic_ifc import write_synthetic_ifc  # noqa: E402
+
+GROUPS = ("parse", "lookups", "report", "upload")
+QUANTITY_VARIANTS = {"both": (True, False), "with": (True,), "without": (False,)}
+
+
+def _time(fn: Callable, repeat: int) -> Dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"best_s": round(min(samples), 4), "median_s": round(statistics.median(samples), 4)}
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_parse(main, model: Path, repeat: int) -> Dict:
+    processor = main.bim_processor
+    results = {}
+    for name, parse in (("parse_ifc", processor.parse_ifc), ("parse_ifc_streaming", processor.parse_ifc_streaming)):
+        results[name] = _time(lambda: parse(model), repeat)
+    return results
+
+
+def bench_lookups(main, model: Path, workdir: Path, repeat: int) -> Dict:
+    processor = main.bim_processor
+    ifc_file = ifcopenshell.open(str(model))
+    elements = [e for category, found in processor._classify_elements(ifc_file).items()
+                if category in processor.AREA_BASED for e in found]
+    if not elements:
+        return {}
+    index = processor.build_quantity_index(ifc_file)
+    index_path = workdir / "lookup-index.json"
+    index.save(index_path)
+    global_ids = [e.GlobalId for e in elements]
+
+    def legacy():
+        for element in elements:
+            processor._get_element_area(element)
+
+    def indexed():
+        for element in elements:
+            processor._get_element_area(element, index)
+
+    def persisted():
+        loaded = main.QuantityIndex.load(index_path)
+        for global_id in global_ids:
+            loaded.get(global_id)
+
+    results = {
+        "elements": len(elements),
+        "build_index": _time(lambda: processor.build_quantity_index(ifc_file), repeat),
+        "legacy_is_defined_by": _time(legacy, repeat),
+        "quantity_index": _time(indexed, repeat),
+        "persisted_index_load_and_lookup": _time(persisted, repeat),
+    }
+    for name in ("legacy_is_defined_by", "quantity_index"):
+        results[name]["us_per_element"] = round(1e6 * results[name]["best_s"] / len(elements), 3)
+    return results
+
+
+def bench_report(main, model: Path, workdir: Path, repeat: int) -> Dict:
+    data = main.bim_processor.parse_ifc(model)
+    report_path = workdir / "bench-report.pdf"
+    return {"generate_pdf_report": _time(
+        lambda: main.bim_processor.generate_pdf_report("bench", data, report_path=report_path), repeat
+    )}
+
+
+async def _upload_round(main, client, paths: List[Path], concurrency: int) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def upload(path: Path):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            with open(path, "rb") as f:
+                response = await client.post("/upload", files={"file": (path.name, f)})
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(path) for path in paths))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(paths),
+        "failures": failures,
+        "concurrency": concurrency,
+        "throughput_per_s": round(len(paths) / elapsed, 3),
+        "p50_s": round(_percentile(latencies, 0.50), 4),
+        "p95_s": round(_percentile(latencies, 0.95), 4),
+        "p99_s": round(_percentile(latencies, 0.99), 4),
+    }
+
+
+def bench_upload(main, workdir: Path, entities: int, requests: int, concurrency: int) -> Dict:
+    import httpx
+
+    # Distinct models so the first round parses every upload
+    paths = []
+    for seed in range(requests):
+        path = workdir / f"upload-{seed}.ifc"
+        write_synthetic_ifc(path, entities, seed=seed)
+        paths.append(path)
+
+    async def run():
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                return {
+                    "cold": await _upload_round(main, client, paths, concurrency),
+                    "cached": await _upload_round(main, client, paths, concurrency),
+                }
+
+    results = asyncio.run(run())
+    results["entities"] = entities
+    return results
+
+
+def run(args) -> Dict:
+    skip = set(args.skip or ())
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        # The service creates its data directories relative to the working directory
+        os.chdir(workdir)
+        os.environ.setdefault("BIM_PARSE_WORKERS", str(args.workers))
+        import main
+
+        results = {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "environment": {
+                "python": platform.python_version(),
+                "ifcopenshell": ifcopenshell.version,
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "models": {},
+        }
+        for entities in args.sizes:
+            for with_quantities in QUANTITY_VARIANTS[args.quantities]:
+                name = f"{entities}-{'qsets' if with_quantities else 'no-qsets'}"
+                model = workdir / f"{name}.ifc"
+                entry = {"model": write_synthetic_ifc(model, entities, with_quantities=with_quantities)}
+                entry["model"].pop("path")
+                if "parse" not in skip:
+                    entry.update(bench_parse(main, model, args.repeat))
+                if "lookups" not in skip and with_quantities:
+                    entry["lookups"] = bench_lookups(main, model, workdir, args.repeat)
+                if "report" not in skip and with_quantities:
+                    entry.update(bench_report(main, model, workdir, args.repeat))
+                results["models"][name] = entry
+                model.unlink()
+                print(f"benchmarked {name}", file=sys.stderr)
+
+        if "upload" not in skip:
+            results["upload"] = bench_upload(
+                main, workdir, args.upload_entities, args.upload_requests, args.concurrency
+            )
+        os.chdir(SERVICE_DIR)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=lambda s: [int(v) for v in s.split(",")], default=[10_000, 100_000],
+                        help="comma-separated model sizes in entities (10k .. 5M)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quantities", choices=sorted(QUANTITY_VARIANTS), default="both",
+                        help="benchmark models with quantity sets, without, or both")
+    parser.add_argument("--skip", type=lambda s: s.split(","), help=f"groups to skip: {','.join(GROUPS)}")
+    parser.add_argument("--workers", type=int, default=2, help="parse worker processes for the upload benchmark")
+    parser.add_argument("--upload-entities", type=int, default=10_000)
+    parser.add_argument("--upload-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", type=Path, help="write results here instead of stdout")
+    args = parser.parse_args()
+    if args.output:
+        # run() changes into a scratch directory
+        args.output = args.output.resolve()
+
+    results = json.dumps(run(args), indent=2)
+    if args.output:
+        args.output.write_text(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
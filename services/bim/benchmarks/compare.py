@@ -0,0 +1,79 @@
+"""Compare two bench_suite.py result files.
+
+Prints every timing present in both files with its relative change and
+exits with status 1 when any got worse by more than ``--threshold``
+(default 10%), so it can gate CI runs against a stored baseline. Timings
+below ``--min-seconds`` in both runs are shown but never flagged; they are
+mostly noise.
+
+    python benchmarks/compare.py baseline.json current.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+
+def _flatten(node, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, float(node)
+
+
+def _direction(metric: str) -> Optional[int]:
+    """+1 when larger values are better, -1 when smaller are, None for non-timings"""
+    leaf = metric.rsplit(".", 1)[-1]
+    if leaf.endswith("_per_s"):
+        return 1
+    if leaf.endswith("_s") or leaf == "us_per_element":
+        return -1
+    return None
+
+
+def compare(baseline: Dict, current: Dict, threshold: float, min_seconds: float = 0.0) -> Tuple[list, list]:
+    before = dict(_flatten(baseline.get("models", {}), "models"))
+    before.update(_flatten(baseline.get("upload", {}), "upload"))
+    after = dict(_flatten(current.get("models", {}), "models"))
+    after.update(_flatten(current.get("upload", {}), "upload"))
+
+    rows, regressions = [], []
+    for metric, old in before.items():
+        direction = _direction(metric)
+        if direction is None or metric not in after or old == 0:
+            continue
+        new = after[metric]
+        change = (new - old) / old
+        rows.append((metric, old, new, change))
+        too_small = metric.endswith("_s") and not metric.endswith("_per_s") and max(old, new) < min_seconds
+        if -direction * change > threshold and not too_small:
+            regressions.append(metric)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--min-seconds", type=float, default=0.005)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    rows, regressions = compare(baseline, current, args.threshold, args.min_seconds)
+
+    print(f"{baseline.get('commit', '?')} -> {current.get('commit', '?')}")
+    width = max((len(metric) for metric, *_ in rows), default=0)
+    for metric, old, new, change in rows:
+        flag = "  REGRESSION" if metric in regressions else ""
+        print(f"{metric:<{width}}  {old:>10.4f}  {new:>10.4f}  {change:>+8.1%}{flag}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""External, versioned cost catalogue.
+
+Rates used to be a dict hard-coded in ``BIMProcessor``. They now come from a
+catalogue file (JSON, CSV or SQLite, chosen by suffix) that operators can
+edit without a redeploy. Each entry prices one IFC class; subclasses inherit
+the rate of their nearest priced ancestor (see
+``BIMProcessor._category_index``), so pricing IfcWall also covers
+IfcWallStandardCase unless the catalogue lists it separately.
+
+Entries may be tagged with a region; when a region is selected its entries
+override the untagged ones for the same class.
+
+JSON::
+
+    {"version": "2024.2", "rates": [
+        {"ifc_class": "IfcWall", "material_cost": 25.0, "labor_cost": 15.0, "unit": "m²"},
+        {"ifc_class": "IfcWall", "material_cost": 28.0, "labor_cost": 19.0, "unit": "m²", "region": "nyc"}
+    ]}
+
+CSV: a header row with ``ifc_class,material_cost,labor_cost,unit[,region]``.
+SQLite: a ``cost_rates`` table with the same columns; the version is
+``PRAGMA user_version``.
+"""
+import csv
+import hashlib
+import json
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import ifcopenshell
+
+# The rates the service shipped with, used when no catalogue file exists
+DEFAULT_RATES = {
+    "IfcWall": {"material_cost": 25.0, "labor_cost": 15.0, "unit": "m²"},
+    "IfcSlab": {"material_cost": 30.0, "labor_cost": 20.0, "unit": "m²"},
+    "IfcBeam": {"material_cost": 150.0, "labor_cost": 75.0, "unit": "m"},
+    "IfcColumn": {"material_cost": 200.0, "labor_cost": 100.0, "unit": "m"},
+    "IfcDoor": {"material_cost": 800.0, "labor_cost": 150.0, "unit": "each"},
+    "IfcWindow": {"material_cost": 600.0, "labor_cost": 100.0, "unit": "each"},
+    "IfcRoof": {"material_cost": 45.0, "labor_cost": 25.0, "unit": "m²"},
+}
+
+# Unit -> what the rate is multiplied by
+AREA_UNITS = ("m²", "m2")
+LENGTH_UNITS = ("m",)
+COUNT_UNITS = ("each",)
+
+
+class CatalogueError(ValueError):
+    """Raised for unreadable catalogues and invalid entries."""
+
+
+@dataclass
+class CostCatalogue:
+    rates: Dict[str, Dict]
+    version: str
+    source: Optional[str] = None
+    region: Optional[str] = None
+
+    @property
+    def area_based(self) -> tuple:
+        return tuple(name for name, rate in self.rates.items() if rate["unit"] in AREA_UNITS)
+
+    @property
+    def length_based(self) -> tuple:
+        return tuple(name for name, rate in self.rates.items() if rate["unit"] in LENGTH_UNITS)
+
+    @classmethod
+    def default(cls) -> "CostCatalogue":
+        return cls({name: dict(rate) for name, rate in DEFAULT_RATES.items()}, version="builtin")
+
+    @classmethod
+    def load(cls, path: Path, region: Optional[str] = None) -> "CostCatalogue":
+        path = Path(path)
+        suffix = path.suffix.lower()
+        try:
+            if suffix == ".json":
+                entries, version = _read_json(path)
+            elif suffix == ".csv":
+                entries, version = _read_csv(path)
+            elif suffix in (".db", ".sqlite", ".sqlite3"):
+                entries, version = _read_sqlite(path)
+            else:
+                raise CatalogueError(f"Unsupported cost catalogue format: {path.name}")
+        except (OSError, sqlite3.Error, json.JSONDecodeError, csv.Error) as e:
+            raise CatalogueError(f"Cannot read cost catalogue {path}: {e}") from e
+
+        rates = _select_region(entries, region)
+        if not rates:
+            raise CatalogueError(f"Cost catalogue {path} has no rates")
+        if version is None:
+            # Unversioned formats are identified by their content
+            payload = json.dumps(rates, sort_keys=True).encode()
+            version = hashlib.sha256(payload).hexdigest()[:12]
+        if region:
+            version = f"{version}@{region}"
+        return cls(rates, version=str(version), source=str(path), region=region)
+
+
+def _read_json(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    rates = data.get("rates") if isinstance(data, dict) else None
+    if isinstance(rates, dict):
+        rates = [{"ifc_class": name, **rate} for name, rate in rates.items()]
+    if not isinstance(rates, list):
+        raise CatalogueError(f"{path.name}: expected a 'rates' list or object")
+    return rates, data.get("version")
+
+
+def _read_csv(path: Path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f)), None
+
+
+def _read_sqlite(path: Path):
+    if not path.exists():
+        raise CatalogueError(f"Cost catalogue {path} does not exist")
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        conn.row_factory = sqlite3.Row
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(cost_rates)")}
+        region = "region" if "region" in columns else "NULL AS region"
+        rows = conn.execute(
+            f"SELECT ifc_class, material_cost, labor_cost, unit, {region} FROM cost_rates"
+        ).fetchall()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+    return [dict(row) for row in rows], (version or None)
+
+
+def _canonical_class(name: str) -> str:
+    """Schema spelling of an IFC class name (catalogues may use any case)"""
+    for schema_name in ("IFC4", "IFC2X3"):
+        schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema_name)
+        try:
+            return schema.declaration_by_name(name).name()
+        except RuntimeError:
+            continue
+    raise CatalogueError(f"Unknown IFC class '{name}'")
+
+
+def _select_region(entries: List[Dict], region: Optional[str]) -> Dict[str, Dict]:
+    rates: Dict[str, Dict] = {}
+    regional: Dict[str, Dict] = {}
+    for entry in entries:
+        name = (entry.get("ifc_class") or "").strip()
+        if not name:
+            raise CatalogueError(f"Cost catalogue entry without ifc_class: {entry}")
+        unit = (entry.get("unit") or "").strip()
+        if unit not in AREA_UNITS + LENGTH_UNITS + COUNT_UNITS:
+            raise CatalogueError(f"{name}: unsupported unit '{unit}'")
+        try:
+            rate = {
+                "material_cost": float(entry["material_cost"]),
+                "labor_cost": float(entry["labor_cost"]),
+                "unit": unit,
+            }
+        except (KeyError, TypeError, ValueError):
+            raise CatalogueError(f"{name}: material_cost and labor_cost must be numbers")
+
+        entry_region = (entry.get("region") or "").strip()
+        if not entry_region:
+            rates[_canonical_class(name)] = rate
+        elif entry_region == region:
+            regional[_canonical_class(name)] = rate
+    rates.update(regional)
+    return rates
@@ -0,0 +1,207 @@
+"""Per-element takeoff tables and incremental merging of federated models.
+
+A building is usually delivered as several discipline models (architecture,
+structure, MEP) that share some elements. ``ElementTable`` records, for every
+priced element of one parsed model, its cost category and measured
+area/length keyed by GlobalId. It is saved next to the quantity index, so
+models can be combined later without reopening their IFC files. The table
+also records how missing quantities were measured, so a revision can be
+measured the same way.
+
+``Federation`` merges the tables of its member projects, counting each
+GlobalId once. It keeps running category totals and remembers which member
+contributed each element, so replacing or removing one member only touches
+that member's elements. An element shared by several members is always
+counted from the first of them in membership order. Comparing two tables of
+the same project gives the elements a revision added, changed or removed.
+"""
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from atomic_file import atomic_write
+
+# (cost category, area, length) of one element
+ElementRow = Tuple[str, float, float]
+
+
+class ElementTable:
+    def __init__(
+        self,
+        rows: Optional[Dict[str, ElementRow]] = None,
+        geometry_fallback: bool = False,
+        shapes: Optional[Dict[str, str]] = None,
+    ):
+        # GlobalId -> (cost category, area, length)
+        self.rows: Dict[str, ElementRow] = rows or {}
+        # Whether areas/lengths missing from quantity sets were measured from
+        # geometry rather than given default values
+        self.geometry_fallback = geometry_fallback
+        # GlobalId -> shape digest of each element measured from geometry
+        self.shapes: Dict[str, str] = shapes or {}
+
+    def add(self, global_id: str, category: str, area: float, length: float) -> None:
+        self.rows[global_id] = (category, area, length)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def category_totals(self) -> Dict[str, Dict]:
+        """Element count and summed area/length per cost category"""
+        return accumulate(self.rows.values())
+
+    def diff(self, other: "ElementTable") -> Tuple[List[str], List[str], List[str]]:
+        """GlobalIds added, changed and removed going from this table to ``other``"""
+        added = [global_id for global_id in other.rows if global_id not in self.rows]
+        changed = []
+        removed = []
+        for global_id, row in self.rows.items():
+            other_row = other.rows.get(global_id)
+            if other_row is None:
+                removed.append(global_id)
+            elif other_row != row:
+                changed.append(global_id)
+        return added, changed, removed
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path) as f:
+            json.dump(
+                {"rows": self.rows, "geometry_fallback": self.geometry_fallback, "shapes": self.shapes},
+                f, separators=(",", ":")
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "ElementTable":
+        with open(path, "r") as f:
+            data = json.load(f)
+        if not isinstance(data.get("rows"), dict):
+            # Tables saved before measurement sources were recorded hold only rows
+            data = {"rows": data}
+        return cls(
+            {global_id: tuple(row) for global_id, row in data["rows"].items()},
+            data.get("geometry_fallback", False),
+            data.get("shapes"),
+        )
+
+
+def accumulate(rows: Iterable[ElementRow], totals: Optional[Dict[str, Dict]] = None, sign: int = 1) -> Dict[str, Dict]:
+    """Add (or with ``sign=-1`` subtract) element rows to category totals"""
+    totals = {} if totals is None else totals
+    for category, area, length in rows:
+        entry = totals.setdefault(category, {"count": 0, "area": 0.0, "length": 0.0})
+        entry["count"] += sign
+        entry["area"] += sign * area
+        entry["length"] += sign * length
+    for category in [c for c, entry in totals.items() if entry["count"] <= 0]:
+        del totals[category]
+    return totals
+
+
+class Federation:
+    """Running merge of several projects' element tables.
+
+    Members are identified by project id and a version (the file hash of the
+    model they were parsed from). An element shared by several members is
+    counted from the first of them in membership order, exactly as a fresh
+    merge of the same members would. ``sync`` brings the merge up to date
+    with a member list, re-reading only members that were added or whose
+    version changed, and re-deciding ownership only for their elements.
+    """
+
+    def __init__(self):
+        # project id -> (version, element table), in membership order
+        self.members: Dict[str, Tuple[str, ElementTable]] = {}
+        # GlobalId -> (project id, row) of the member whose row is counted
+        self.owners: Dict[str, Tuple[str, ElementRow]] = {}
+        self.totals: Dict[str, Dict] = {}
+        # project id -> number of elements counted from that member
+        self.contributed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def sync(self, members: List[Tuple[str, str]], load: Callable[[str, str], ElementTable]) -> Dict:
+        """Update the merge to ``members`` (``(project id, version)`` pairs).
+
+        ``load(project_id, version)`` is only called for members that are new
+        or changed. Returns how many members were reused and re-applied.
+        """
+        with self._lock:
+            wanted = dict(members)
+            affected = set()
+            dropped = [
+                project_id for project_id, (version, _) in self.members.items()
+                if wanted.get(project_id) != version
+            ]
+            for project_id in dropped:
+                _, table = self.members.pop(project_id)
+                del self.contributed[project_id]
+                affected.update(table.rows)
+
+            reused = [project_id for project_id, _ in members if project_id in self.members]
+            reordered = reused != list(self.members)
+            ordered: Dict[str, Tuple[str, ElementTable]] = {}
+            applied = 0
+            for project_id, version in members:
+                if project_id in self.members:
+                    ordered[project_id] = self.members[project_id]
+                else:
+                    table = load(project_id, version)
+                    ordered[project_id] = (version, table)
+                    self.contributed[project_id] = 0
+                    affected.update(table.rows)
+                    applied += 1
+            self.members = ordered
+            if reordered:
+                # Precedence among kept members changed too
+                for _, table in ordered.values():
+                    affected.update(table.rows)
+            self._reassign(affected, set(dropped))
+            return {"reused": len(members) - applied, "applied": applied}
+
+    def _reassign(self, global_ids: Iterable[str], dropped: Set[str]) -> None:
+        """Give each element to the first member that has it and adjust the totals
+
+        Elements owned by a ``dropped`` member (removed, or replaced by a new
+        version whose count starts from zero) are not discounted from it.
+        """
+        released = []
+        claimed = []
+        for global_id in global_ids:
+            previous = self.owners.pop(global_id, None)
+            if previous is not None:
+                owner, row = previous
+                released.append(row)
+                if owner not in dropped:
+                    self.contributed[owner] -= 1
+            for project_id, (_, table) in self.members.items():
+                row = table.rows.get(global_id)
+                if row is not None:
+                    self.owners[global_id] = (project_id, row)
+                    self.contributed[project_id] += 1
+                    claimed.append(row)
+                    break
+        accumulate(released, self.totals, sign=-1)
+        accumulate(claimed, self.totals)
+
+    def category_totals(self) -> Dict[str, Dict]:
+        """Snapshot of the merged totals, safe to price while syncs continue"""
+        with self._lock:
+            return {category: dict(entry) for category, entry in self.totals.items()}
+
+    def stats(self) -> Dict:
+        """Per-member element counts and how many of them are counted"""
+        with self._lock:
+            total = sum(len(table) for _, table in self.members.values())
+            return {
+                "members": [
+                    {
+                        "project_id": project_id,
+                        "elements": len(table),
+                        "contributed": self.contributed[project_id]
+                    }
+                    for project_id, (_, table) in self.members.items()
+                ],
+                "elements": len(self.owners),
+                "duplicates_removed": total - len(self.owners)
+            }
@@ -0,0 +1,267 @@
+"""Background job queue for asynchronous IFC uploads.
+
+``/upload?async_mode=true`` persists the file, enqueues a job and returns
+immediately; consumers pull jobs off the queue and hand them to the parse
+worker pool. Two backends are provided:
+
+* ``LocalJobQueue`` - an in-process ``asyncio.Queue``; fine for a single
+  replica.
+* ``RedisJobQueue`` - a Redis list plus per-job status hashes, so several
+  replicas sharing the uploads volume can drain one queue and answer status
+  polls for each other's jobs.
+
+A ``LocalJobQueue`` dies with its process, so each process records itself as
+the owner of the jobs it queues (``JobOwner``); at startup, jobs whose owner
+is gone are queued again.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Job lifecycle states reported by /projects/{id}
+JOB_QUEUED = "queued"
+JOB_PARSING = "parsing"
+JOB_PROCESSED = "processed"
+JOB_FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has reached its configured size."""
+
+
+class JobQueue(ABC):
+    """Common consumer loop shared by the queue backends."""
+
+    def __init__(self, concurrency: int = 1, max_size: int = 0):
+        self.concurrency = max(concurrency, 1)
+        self.max_size = max_size
+        self._handler: Optional[JobHandler] = None
+        self._consumers: List[asyncio.Task] = []
+        self._active = 0
+
+    async def start(self, handler: JobHandler) -> None:
+        self._handler = handler
+        self._consumers = [
+            asyncio.create_task(self._consume(i)) for i in range(self.concurrency)
+        ]
+        logger.info(
+            f"Started {type(self).__name__} with {self.concurrency} consumers"
+        )
+
+    async def stop(self) -> None:
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+
+    async def _consume(self, index: int) -> None:
+        while True:
+            job = await self._next_job()
+            if job is None:
+                continue
+            self._active += 1
+            try:
+                await self._handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The handler records failures itself; this only guards the loop.
+                logger.error(f"Job consumer {index} failed on {job.get('id')}: {e}")
+            finally:
+                self._active -= 1
+                self._task_done()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def _task_done(self) -> None:
+        pass
+
+    @abstractmethod
+    async def _next_job(self) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def enqueue(self, job: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def depth(self) -> int:
+        ...
+
+    @abstractmethod
+    async def set_status(self, job_id: str, status: str, progress: int, error: Optional[str] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+
+class LocalJobQueue(JobQueue):
+    """In-process queue; status lives in this process only."""
+
+    def __init__(self, concurrency: int = 1, max_size: int = 0):
+        super().__init__(concurrency, max_size)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._statuses: Dict[str, Dict[str, Any]] = {}
+
+    async def _next_job(self) -> Optional[Dict[str, Any]]:
+        return await self._queue.get()
+
+    def _task_done(self) -> None:
+        self._queue.task_done()
+
+    async def enqueue(self, job: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Job queue is full ({self._queue.qsize()} jobs waiting)")
+        await self.set_status(job["id"], JOB_QUEUED, 0)
+
+    async def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def set_status(self, job_id: str, status: str, progress: int, error: Optional[str] = None) -> None:
+        self._statuses[job_id] = {
+            "status": status,
+            "progress": progress,
+            "error": error,
+            "updated_at": datetime.now().isoformat(),
+        }
+        if status in (JOB_PROCESSED, JOB_FAILED):
+            # Finished jobs are answered from the project record instead.
+            self._statuses.pop(job_id, None)
+
+    async def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._statuses.get(job_id)
+
+
+class RedisJobQueue(JobQueue):
+    """Queue shared between replicas through Redis."""
+
+    QUEUE_KEY = "bim:jobs"
+    STATUS_KEY = "bim:job:{}"
+    STATUS_TTL = 7 * 24 * 3600
+
+    def __init__(self, redis_url: str, concurrency: int = 1, max_size: int = 0):
+        super().__init__(concurrency, max_size)
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(redis_url, decode_responses=True)
+
+    async def stop(self) -> None:
+        await super().stop()
+        await self._redis.close()
+
+    async def _next_job(self) -> Optional[Dict[str, Any]]:
+        # Short timeout so cancellation on shutdown is picked up promptly.
+        item = await self._redis.brpop(self.QUEUE_KEY, timeout=1)
+        if item is None:
+            return None
+        return json.loads(item[1])
+
+    async def enqueue(self, job: Dict[str, Any]) -> None:
+        if self.max_size and await self.depth() >= self.max_size:
+            raise QueueFullError(f"Job queue is full ({self.max_size} jobs waiting)")
+        await self.set_status(job["id"], JOB_QUEUED, 0)
+        await self._redis.lpush(self.QUEUE_KEY, json.dumps(job))
+
+    async def depth(self) -> int:
+        return await self._redis.llen(self.QUEUE_KEY)
+
+    async def set_status(self, job_id: str, status: str, progress: int, error: Optional[str] = None) -> None:
+        key = self.STATUS_KEY.format(job_id)
+        await self._redis.hset(key, mapping={
+            "status": status,
+            "progress": progress,
+            "error": error or "",
+            "updated_at": datetime.now().isoformat(),
+        })
+        await self._redis.expire(key, self.STATUS_TTL)
+
+    async def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = await self._redis.hgetall(self.STATUS_KEY.format(job_id))
+        if not data:
+            return None
+        return {
+            "status": data["status"],
+            "progress": int(data["progress"]),
+            "error": data["error"] or None,
+            "updated_at": data["updated_at"],
+        }
+
+
+class JobOwner:
+    """Identifies the process holding a job in its in-memory queue.
+
+    The process keeps an exclusive lock on ``<lock_dir>/<id>.lock`` for its
+    lifetime. The OS drops the lock when the process exits, however it exits,
+    so an owner whose lock can be taken has lost its queue.
+    """
+
+    def __init__(self, lock_dir: Path):
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        self.id = uuid.uuid4().hex
+        self._dir = lock_dir
+        self._lock = open(self._path(self.id), "w")
+        fcntl.flock(self._lock, fcntl.LOCK_EX)
+
+    def _path(self, owner: str) -> Path:
+        return self._dir / f"{owner}.lock"
+
+    @contextmanager
+    def recovering(self) -> Iterator[None]:
+        """Serialise recovery between processes starting at the same time"""
+        with open(self._dir / "recovery.lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def is_alive(self, owner: Optional[str]) -> bool:
+        if owner == self.id:
+            return True
+        if not owner:
+            return False
+        try:
+            f = open(self._path(owner), "r")
+        except FileNotFoundError:
+            return False
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+        return False
+
+    def prune(self) -> None:
+        """Remove the lock files of owners that have exited"""
+        for path in self._dir.glob("*.lock"):
+            if path.stem != "recovery" and not self.is_alive(path.stem):
+                path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        self._path(self.id).unlink(missing_ok=True)
+        self._lock.close()
+
+
+def create_job_queue(backend: str, concurrency: int, max_size: int, redis_url: Optional[str] = None) -> JobQueue:
+    """Build the queue backend selected by configuration."""
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("BIM_JOB_BACKEND=redis requires REDIS_URL")
+        return RedisJobQueue(redis_url, concurrency=concurrency, max_size=max_size)
+    if backend != "local":
+        raise ValueError(f"Unknown job queue backend: {backend}")
+    return LocalJobQueue(concurrency=concurrency, max_size=max_size)
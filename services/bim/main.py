@@ -1,21 +1,87 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Header
+from fastapi import Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
+from pydantic import BaseModel
 import ifcopenshell
 import ifcopenshell.util.element
+import numpy as np
 from pathlib import Path
+from contextlib import ExitStack, asynccontextmanager, nullcontext
+import os
+import functools
+import itertools
+import hashlib
 import uuid
 import asyncio
 import json
+import math
+import re
+import time
+import zipfile
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
 
+import cost_engine
+import metrics
+import prescan
+import profiling
+import responses
+from admission import AdmissionController, AdmissionError
+from atomic_file import atomic_write
+from cost_catalogue import CatalogueError, CostCatalogue
+from federation import ElementTable, Federation, accumulate
+from geometry import measure_elements, shape_digest
+from model_cache import ModelCache
+from jobs import (
+    JOB_FAILED, JOB_PARSING, JOB_PROCESSED, JOB_QUEUED, JobOwner, QueueFullError, create_job_queue,
+)
+from project_store import DEFAULT_LIST_FIELDS, InvalidQueryError, ProjectQuery, create_project_store
+from quantity_index import QUANTITY_FIELDS, QuantityIndex
+from reports import ReportCache
+from responses import FastJSONResponse
+from result_cache import ParseResultCache
+from spatial_index import LEVELS as SPATIAL_LEVELS, ROW_COLUMNS as SPATIAL_ROW_COLUMNS, SpatialIndex
+from step_reader import StepStreamReader
+from takeoff import (
+    COLUMNS as TAKEOFF_COLUMNS, TakeoffBuilder, TakeoffTable, location_names, model_locations,
+    reprice as reprice_takeoff, resolve_locations, resolve_zones,
+)
+from uploads import (
+    UploadFormError, UploadTooLargeError, check_content_length, extract_ifc_archive, receive_upload, receive_uploads,
+)
+from worker_pool import ParseWorkerPool, PoolSaturatedError
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="InstallSure BIM Service", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    parse_pool.start()
+    heavy_pool.start()
+    report_pool.start()
+    await job_queue.start(_process_upload_job)
+    if JOB_BACKEND == "local":
+        await _recover_jobs()
+    yield
+    await job_queue.stop()
+    job_owner.close()
+    await model_cache.close()
+    parse_pool.shutdown()
+    heavy_pool.shutdown()
+    report_pool.shutdown()
+    project_store.close()
+
+app = FastAPI(
+    title="InstallSure BIM Service",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
 
 # CORS middleware
 app.add_middleware(
@@ -26,112 +92,813 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Requests that may start a parse, subject to per-client limits
+_PARSE_REQUEST_PATH = re.compile(r"^/(upload(/batch)?|projects/[^/]+/revisions)$")
+
+class _LimitParseRequests:
+    """Per-client rate and concurrency limits, and load shedding, for parse requests
+
+    A plain ASGI middleware rather than an ``http`` one, so the client's slot
+    is held until the response has been sent (a batch upload parses while its
+    body streams) and is released however the request ends, a client that
+    disconnects before the body is read included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not _PARSE_REQUEST_PATH.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        slot = ExitStack()
+        try:
+            if admission.saturated:
+                raise AdmissionError(
+                    "The service is at its parse memory budget; try again shortly",
+                    503, admission.retry_after, "saturated"
+                )
+            slot.enter_context(admission.client(_client_id(Request(scope))))
+        except AdmissionError as e:
+            await _admission_response(e)(scope, receive, send)
+            return
+        with slot:
+            await self.app(scope, receive, send)
+
+app.add_middleware(_LimitParseRequests)
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuse an upload by its Content-Length before any of the body is read"""
+    if request.method == "POST" and _PARSE_REQUEST_PATH.match(request.url.path):
+        limit = MAX_BATCH_BYTES if request.url.path == "/upload/batch" else MAX_UPLOAD_BYTES
+        try:
+            check_content_length(request.headers, limit)
+        except UploadTooLargeError as e:
+            return JSONResponse(status_code=413, content={"detail": str(e)})
+    return await call_next(request)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template so project ids do not explode the series count
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code
+    )
+    return response
+
 # Data directory
 DATA_DIR = Path("data")
 UPLOADS_DIR = DATA_DIR / "uploads"
 REPORTS_DIR = DATA_DIR / "reports"
+CACHE_DIR = DATA_DIR / "cache"
+INDEXES_DIR = DATA_DIR / "indexes"
+FEDERATIONS_DIR = DATA_DIR / "federations"
+PROFILES_DIR = DATA_DIR / "profiles"
 
 # Create directories
 UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
 REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+FEDERATIONS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Parse worker tier (0 = one worker per CPU core)
+PARSE_WORKERS = int(os.getenv("BIM_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+PARSE_QUEUE_DEPTH = int(os.getenv("BIM_PARSE_QUEUE_DEPTH", str(PARSE_WORKERS * 4)))
+PARSE_WORKER_MAX_TASKS = int(os.getenv("BIM_PARSE_WORKER_MAX_TASKS", "0"))
+
+def _physical_memory() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return 8 * 1024 ** 3
+
+# Admission control: parses reserve their estimated peak memory from this
+# budget (default: half of physical memory), which is split evenly between
+# the BIM_API_WORKERS processes and also covers models held in each one's
+# model cache. Full parses take about BIM_PARSE_BYTES_PER_ENTITY per entity
+# or BIM_MODEL_MEMORY_FACTOR times the file size, streaming parses about
+# BIM_STREAMING_BYTES_PER_ENTITY.
+API_WORKERS = max(1, int(os.getenv("BIM_API_WORKERS", "1")))
+PARSE_MEMORY_BUDGET = (
+    int(os.getenv("BIM_PARSE_MEMORY_MB", "0")) * 1024 * 1024 or _physical_memory() // 2
+) // API_WORKERS
+PARSE_BYTES_PER_ENTITY = int(os.getenv("BIM_PARSE_BYTES_PER_ENTITY", "800"))
+STREAMING_BYTES_PER_ENTITY = int(os.getenv("BIM_STREAMING_BYTES_PER_ENTITY", "350"))
+
+# Per-client limits on uploads and revisions (0 disables a limit). Clients
+# are told apart by BIM_CLIENT_ID_HEADER, then X-Forwarded-For, then address.
+CLIENT_CONCURRENCY = int(os.getenv("BIM_CLIENT_CONCURRENCY", "4"))
+CLIENT_RATE_PER_MIN = float(os.getenv("BIM_CLIENT_RATE_PER_MIN", "60"))
+CLIENT_BURST = int(os.getenv("BIM_CLIENT_BURST", "20"))
+CLIENT_ID_HEADER = os.getenv("BIM_CLIENT_ID_HEADER", "X-Client-Id")
 
-# In-memory project storage (use Redis in production)
-projects_db: Dict[str, Dict] = {}
+# Uploads pre-scanned at this many entities or more parse in a separate pool,
+# so a few huge models cannot occupy every parse worker (0 workers: no split)
+HEAVY_PARSE_ENTITIES = int(os.getenv("BIM_HEAVY_PARSE_ENTITIES", "1000000"))
+HEAVY_PARSE_WORKERS = int(os.getenv("BIM_HEAVY_PARSE_WORKERS", "1"))
+
+# Uploads are streamed to disk in chunks and rejected above this size
+MAX_UPLOAD_BYTES = int(os.getenv("BIM_MAX_UPLOAD_MB", "2048")) * 1024 * 1024
+UPLOAD_CHUNK_BYTES = int(os.getenv("BIM_UPLOAD_CHUNK_KB", "1024")) * 1024
+
+# Report rendering workers (kept apart from parsing so downloads never wait
+# behind a long parse)
+REPORT_WORKERS = int(os.getenv("BIM_REPORT_WORKERS", "1"))
+REPORT_CACHE_MAX_DISK_BYTES = int(os.getenv("BIM_REPORT_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Batch uploads (multi-file or zip archive)
+BATCH_MAX_FILES = int(os.getenv("BIM_BATCH_MAX_FILES", "200"))
+# Whole request body of a batch upload
+MAX_BATCH_BYTES = int(os.getenv("BIM_MAX_BATCH_MB", "8192")) * 1024 * 1024
+
+# GlobalIds listed per diff category in revision responses
+REVISION_DIFF_SAMPLE = 100
+
+# Page size of /projects/{id}/elements in JSON format (ndjson/csv stream all rows)
+ELEMENT_PAGE_DEFAULT = 1000
+ELEMENT_PAGE_MAX = 10000
+
+# Parse result cache keyed by file hash + cost database version
+PARSE_CACHE_MEMORY_ENTRIES = int(os.getenv("BIM_PARSE_CACHE_MEMORY_ENTRIES", "256"))
+PARSE_CACHE_MAX_DISK_BYTES = int(os.getenv("BIM_PARSE_CACHE_MAX_DISK_MB", "1024")) * 1024 * 1024
+
+# Files at least this large are parsed with the memory-mapped streaming reader
+# instead of ifcopenshell.open (0 disables the automatic switch)
+STREAMING_PARSE_BYTES = int(os.getenv("BIM_STREAMING_PARSE_MB", "1024")) * 1024 * 1024
+
+# Measure elements without quantity sets from their geometry instead of
+# pricing them at a default size (slower; off by default)
+GEOMETRY_FALLBACK = os.getenv("BIM_GEOMETRY_FALLBACK", "false").lower() in ("1", "true", "yes")
+GEOMETRY_THREADS = int(os.getenv("BIM_GEOMETRY_THREADS", "0")) or max(1, (os.cpu_count() or 1) // PARSE_WORKERS)
+
+# Fraction of uploads parsed under the profiler (the X-Profile header
+# overrides it per request)
+PROFILE_SAMPLE_RATE = float(os.getenv("BIM_PROFILE_SAMPLE_RATE", "0"))
+# Milliseconds between the profiler's stack samples
+PROFILE_INTERVAL = float(os.getenv("BIM_PROFILE_INTERVAL_MS", "5")) / 1000
+
+# Opened models kept in the API process for follow-up queries, bounded by
+# their estimated footprint (file size x BIM_MODEL_MEMORY_FACTOR)
+MODEL_CACHE_BYTES = int(os.getenv("BIM_MODEL_CACHE_MB", "2048")) * 1024 * 1024
+MODEL_MEMORY_FACTOR = float(os.getenv("BIM_MODEL_MEMORY_FACTOR", "10"))
+# Models are opened on the first element-detail request; BIM_MODEL_CACHE_WARM
+# opens each upload's model right away instead, outside the parse admission
+# budget, so it is off by default
+MODEL_CACHE_WARM = os.getenv("BIM_MODEL_CACHE_WARM", "false").lower() in ("1", "true", "yes")
+
+# Federated merges kept in memory; each holds all of its members' element rows
+FEDERATION_CACHE_ENTRIES = max(1, int(os.getenv("BIM_FEDERATION_CACHE_ENTRIES", "16")))
+
+# Async upload jobs ("local" in-process queue or "redis" for multi-replica)
+JOB_BACKEND = os.getenv("BIM_JOB_BACKEND", "local")
+JOB_QUEUE_SIZE = int(os.getenv("BIM_JOB_QUEUE_SIZE", "1000"))
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Cost catalogue (JSON, CSV or SQLite); edits are picked up by every process
+# within BIM_COST_CATALOGUE_POLL_S seconds, without a restart
+COST_CATALOGUE_PATH = Path(os.getenv("BIM_COST_CATALOGUE", str(Path(__file__).parent / "cost_catalogue.json")))
+COST_REGION = os.getenv("BIM_COST_REGION") or None
+COST_CATALOGUE_POLL_S = float(os.getenv("BIM_COST_CATALOGUE_POLL_S", "2"))
+
+# Project storage ("sqlite" on disk, shared by all workers, or "memory")
+PROJECT_STORE_BACKEND = os.getenv("BIM_PROJECT_STORE", "sqlite")
+PROJECT_DB_PATH = Path(os.getenv("BIM_PROJECT_DB", str(DATA_DIR / "projects.db")))
 
 class BIMProcessor:
-    def __init__(self):
-        self.cost_database = {
-            "IfcWall": {"material_cost": 25.0, "labor_cost": 15.0, "unit": "m²"},
-            "IfcSlab": {"material_cost": 30.0, "labor_cost": 20.0, "unit": "m²"},
-            "IfcBeam": {"material_cost": 150.0, "labor_cost": 75.0, "unit": "m"},
-            "IfcColumn": {"material_cost": 200.0, "labor_cost": 100.0, "unit": "m"},
-            "IfcDoor": {"material_cost": 800.0, "labor_cost": 150.0, "unit": "each"},
-            "IfcWindow": {"material_cost": 600.0, "labor_cost": 100.0, "unit": "each"},
-            "IfcRoof": {"material_cost": 45.0, "labor_cost": 25.0, "unit": "m²"},
-        }
+    def __init__(
+        self,
+        catalogue_path: Optional[Path] = None,
+        region: Optional[str] = None,
+        geometry_fallback: bool = False,
+        geometry_threads: int = 1
+    ):
+        self.catalogue_path = catalogue_path
+        self.region = region
+        self.geometry_fallback = geometry_fallback
+        self.geometry_threads = geometry_threads
+        # (mtime, size) of the loaded catalogue file and when to look again
+        self._catalogue_stamp = None
+        self._next_catalogue_check = 0.0
+        
+        if catalogue_path is not None and catalogue_path.exists():
+            self._catalogue_stamp = self._stat_catalogue()
+            self._apply_catalogue(CostCatalogue.load(catalogue_path, region))
+        else:
+            if catalogue_path is not None:
+                logger.warning(f"Cost catalogue {catalogue_path} not found, using built-in rates")
+            self._apply_catalogue(CostCatalogue.default())
 
-    def parse_ifc(self, file_path: Path) -> Dict:
-        """Parse IFC file and extract quantities"""
+        # (schema, cost database version) -> {IFC class: cost category}
+        self._category_indexes: Dict[tuple, Dict[str, str]] = {}
+        # cost database version -> rates as arrays
+        self._rate_tables: Dict[str, cost_engine.RateTable] = {}
+
+    def _apply_catalogue(self, catalogue: CostCatalogue) -> None:
+        self.catalogue = catalogue
+        self.cost_database = catalogue.rates
+        # Cost categories priced per m² and per m; the rest are priced per item
+        self.AREA_BASED = catalogue.area_based
+        self.LENGTH_BASED = catalogue.length_based
+
+    def _stat_catalogue(self) -> tuple:
+        stat = self.catalogue_path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def refresh_catalogue(self, force: bool = False) -> bool:
+        """Reload the cost catalogue if its file changed; True when reloaded
+
+        Checks at most every BIM_COST_CATALOGUE_POLL_S seconds unless
+        ``force`` is set. A catalogue that fails to load is logged and the
+        current rates stay in effect.
+        """
+        if self.catalogue_path is None:
+            return False
+        now = time.monotonic()
+        if not force and now < self._next_catalogue_check:
+            return False
+        self._next_catalogue_check = now + COST_CATALOGUE_POLL_S
         try:
-            ifc_file = ifcopenshell.open(str(file_path))
+            stamp = self._stat_catalogue()
+            if stamp == self._catalogue_stamp and not force:
+                return False
+            catalogue = CostCatalogue.load(self.catalogue_path, self.region)
+        except (OSError, CatalogueError) as e:
+            logger.error(f"Keeping cost catalogue {self.catalogue.version}: {e}")
+            return False
+        self._catalogue_stamp = stamp
+        changed = catalogue.rates != self.cost_database
+        self._apply_catalogue(catalogue)
+        if changed:
+            logger.info(f"Loaded cost catalogue {catalogue.version} ({len(catalogue.rates)} rates)")
+        return changed
+
+    @property
+    def cost_database_version(self) -> str:
+        """Short fingerprint of the rates; results priced differently must not be reused"""
+        payload = json.dumps(self.cost_database, sort_keys=True).encode()
+        return hashlib.sha256(payload).hexdigest()[:16]
+
+    @property
+    def rate_table(self) -> cost_engine.RateTable:
+        version = self.cost_database_version
+        rates = self._rate_tables.get(version)
+        if rates is None:
+            rates = self._rate_tables[version] = cost_engine.RateTable(
+                self.cost_database, self.AREA_BASED, self.LENGTH_BASED
+            )
+        return rates
+
+    def _category_index(self, schema_name: str) -> Dict[str, str]:
+        """Map every entity class in the schema to its nearest cost category.
+
+        Subtypes inherit the category of their closest priced ancestor, so
+        IfcWallStandardCase is costed as IfcWall.
+        """
+        key = (schema_name, self.cost_database_version)
+        index = self._category_indexes.get(key)
+        if index is None:
+            schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema_name)
+            index = {}
+            for declaration in schema.declarations():
+                entity = declaration.as_entity()
+                ancestor = entity
+                while ancestor is not None and ancestor.name() not in self.cost_database:
+                    ancestor = ancestor.supertype()
+                if ancestor is not None:
+                    index[entity.name()] = ancestor.name()
+            self._category_indexes[key] = index
+        return index
+
+    def _classify_elements(self, ifc_file) -> Dict[str, List]:
+        """Bucket the model's elements by cost category.
+
+        Walks the file's table of instantiated classes once and looks each
+        class up in the precomputed index, instead of one by_type scan per
+        cost database entry.
+        """
+        index = self._category_index(ifc_file.schema)
+        buckets = {category: [] for category in self.cost_database}
+        for ifc_class in ifc_file.wrapped_data.types():
+            category = index.get(ifc_class)
+            if category is not None:
+                started = time.perf_counter()
+                instances = ifc_file.by_type(ifc_class, include_subtypes=False)
+                buckets[category].extend(instances)
+                profiling.record_entity("classify", ifc_class, time.perf_counter() - started, len(instances))
+        return buckets
+
+    def parse_ifc(
+        self,
+        file_path: Path,
+        quantity_index_path: Optional[Path] = None,
+        element_table_path: Optional[Path] = None,
+        takeoff_path: Optional[Path] = None,
+        spatial_index_path: Optional[Path] = None,
+        previous: Optional[ElementTable] = None
+    ) -> Dict:
+        """Parse IFC file and extract quantities
+
+        When ``quantity_index_path`` is given, the element quantity index is
+        saved there (keyed by GlobalId) for element-level queries. When
+        ``element_table_path`` is given, each priced element's category and
+        measurements are saved there for federation and revision diffs.
+        ``takeoff_path`` receives the per-element takeoff table and
+        ``spatial_index_path`` the per-location totals derived from it.
+
+        ``previous`` is the element table of the model's previous revision: it
+        decides whether missing quantities are measured from geometry, and
+        its measurements are reused for elements whose shape is unchanged.
+        """
+        self.refresh_catalogue()
+        try:
+            with metrics.stage("parse", "open"):
+                ifc_file = ifcopenshell.open(str(file_path))
+            metrics.MODEL_ENTITIES.observe(len(ifc_file.wrapped_data.entity_names()))
+            
+            # Element -> quantity lookups, built once for the whole model
+            with metrics.stage("parse", "quantity_index"):
+                quantity_index = self.build_quantity_index(ifc_file)
             
             # Extract project info
-            project = ifc_file.by_type("IfcProject")[0] if ifc_file.by_type("IfcProject") else None
+            projects = ifc_file.by_type("IfcProject")
+            project = projects[0] if projects else None
             
-            quantities = {}
-            total_cost = 0.0
+            # Bucket elements by cost category in a single pass
+            with metrics.stage("parse", "classify"):
+                elements_by_category = self._classify_elements(ifc_file)
             
-            # Process each element type
-            for element_type in self.cost_database.keys():
-                elements = ifc_file.by_type(element_type)
-                type_total = 0.0
-                count = len(elements)
-                
-                if count > 0:
-                    # Calculate quantities based on element type
-                    if element_type in ["IfcWall", "IfcSlab", "IfcRoof"]:
-                        # Area-based elements
-                        total_area = sum(self._get_element_area(elem) for elem in elements)
-                        cost_data = self.cost_database[element_type]
-                        type_cost = total_area * (cost_data["material_cost"] + cost_data["labor_cost"])
-                        
-                        quantities[element_type] = {
-                            "count": count,
-                            "total_area": round(total_area, 2),
-                            "unit": cost_data["unit"],
-                            "material_cost": round(total_area * cost_data["material_cost"], 2),
-                            "labor_cost": round(total_area * cost_data["labor_cost"], 2),
-                            "total_cost": round(type_cost, 2)
-                        }
-                        
-                    elif element_type in ["IfcBeam", "IfcColumn"]:
-                        # Length-based elements
-                        total_length = sum(self._get_element_length(elem) for elem in elements)
-                        cost_data = self.cost_database[element_type]
-                        type_cost = total_length * (cost_data["material_cost"] + cost_data["labor_cost"])
-                        
-                        quantities[element_type] = {
-                            "count": count,
-                            "total_length": round(total_length, 2),
-                            "unit": cost_data["unit"],
-                            "material_cost": round(total_length * cost_data["material_cost"], 2),
-                            "labor_cost": round(total_length * cost_data["labor_cost"], 2),
-                            "total_cost": round(type_cost, 2)
-                        }
-                        
-                    else:
-                        # Count-based elements (doors, windows)
-                        cost_data = self.cost_database[element_type]
-                        type_cost = count * (cost_data["material_cost"] + cost_data["labor_cost"])
-                        
-                        quantities[element_type] = {
-                            "count": count,
-                            "unit": cost_data["unit"],
-                            "material_cost": round(count * cost_data["material_cost"], 2),
-                            "labor_cost": round(count * cost_data["labor_cost"], 2),
-                            "total_cost": round(type_cost, 2)
-                        }
-                    
-                    total_cost += quantities[element_type]["total_cost"]
+            geometry_stats = None
+            shapes = {}
+            geometry_fallback = self.geometry_fallback if previous is None else previous.geometry_fallback
+            if geometry_fallback:
+                with metrics.stage("parse", "geometry"):
+                    geometry_stats, shapes = self._measure_missing_quantities(
+                        ifc_file, elements_by_category, quantity_index, previous
+                    )
+            if quantity_index_path is not None:
+                with metrics.stage("parse", "save_index"):
+                    quantity_index.save(quantity_index_path)
             
-            return {
-                "project_name": project.Name if project else "Unknown",
-                "processed_at": datetime.now().isoformat(),
-                "quantities": quantities,
-                "summary": {
-                    "total_material_cost": round(sum(q["material_cost"] for q in quantities.values()), 2),
-                    "total_labor_cost": round(sum(q["labor_cost"] for q in quantities.values()), 2),
-                    "total_cost": round(total_cost, 2),
-                    "element_count": sum(q["count"] for q in quantities.values())
+            # Measure each element type
+            measure_started = time.perf_counter()
+            element_table = (
+                ElementTable(geometry_fallback=geometry_fallback, shapes=shapes)
+                if element_table_path is not None else None
+            )
+            locations, zones, names = model_locations(ifc_file) if takeoff_path is not None else ({}, {}, {})
+            takeoff = TakeoffBuilder(zones, names) if takeoff_path is not None else None
+            category_totals = {}
+            for element_type, elements in elements_by_category.items():
+                if not elements:
+                    continue
+                is_area = element_type in self.AREA_BASED
+                is_length = element_type in self.LENGTH_BASED
+                total_area = total_length = 0.0
+                category_started = time.perf_counter()
+                for elem in elements:
+                    area = self._get_element_area(elem, quantity_index) if is_area else 0.0
+                    length = self._get_element_length(elem, quantity_index) if is_length else 0.0
+                    total_area += area
+                    total_length += length
+                    if element_table is not None:
+                        element_table.add(elem.GlobalId or f"#{elem.id()}", element_type, area, length)
+                    if takeoff is not None:
+                        takeoff.add(
+                            elem.GlobalId or f"#{elem.id()}", elem.is_a(), element_type,
+                            locations.get(elem.id()), area, length
+                        )
+                category_totals[element_type] = {
+                    "count": len(elements),
+                    "area": total_area,
+                    "length": total_length,
+                }
+                profiling.record_entity("measure", element_type, time.perf_counter() - category_started, len(elements))
+            if element_table is not None:
+                element_table.save(element_table_path)
+            if takeoff is not None:
+                takeoff.save(takeoff_path, self.rate_table, {"cost_database_version": self.cost_database_version})
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - measure_started, operation="parse", stage="measure")
+            if takeoff is not None and spatial_index_path is not None:
+                with metrics.stage("parse", "spatial_index"):
+                    SpatialIndex.from_takeoff(TakeoffTable(takeoff_path)).save(spatial_index_path)
+            
+            with metrics.stage("parse", "price"):
+                result = self._build_result(project.Name if project else "Unknown", category_totals)
+            if geometry_stats is not None:
+                result["geometry"] = geometry_stats
+            metrics.MODEL_ELEMENTS.observe(result["summary"]["element_count"], parser="ifcopenshell")
+            metrics.PARSES.inc(parser="ifcopenshell", outcome="success")
+            return result
+            
+        except Exception as e:
+            metrics.PARSES.inc(parser="ifcopenshell", outcome="error")
+            logger.error(f"Error parsing IFC file: {e}")
+            raise HTTPException(status_code=500, detail=f"Error parsing IFC file: {str(e)}")
+
+    def parse_ifc_streaming(
+        self,
+        file_path: Path,
+        quantity_index_path: Optional[Path] = None,
+        element_table_path: Optional[Path] = None,
+        takeoff_path: Optional[Path] = None,
+        spatial_index_path: Optional[Path] = None
+    ) -> Dict:
+        """Parse IFC file with the memory-mapped STEP reader and extract quantities
+
+        Produces the same result as parse_ifc without loading the model:
+        only elements, quantity sets and their relationships are decoded, so
+        memory is bounded by the number of relevant entities. Spatial
+        structure and zone records are decoded too when a takeoff table is
+        requested.
+        """
+        self.refresh_catalogue()
+        try:
+            scan_started = time.perf_counter()
+            with StepStreamReader(file_path) as reader:
+                schema_name = reader.schema or "IFC4"
+                categories = {
+                    ifc_class.upper(): category
+                    for ifc_class, category in self._category_index(schema_name).items()
+                }
+                schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema_name)
+                
+                def position(ifc_class: str, attribute: str) -> int:
+                    return schema.declaration_by_name(ifc_class).as_entity().attribute_index(attribute)
+                
+                quantity_fields = {
+                    ifc_class.upper(): (field, position(ifc_class, attribute))
+                    for ifc_class, (field, attribute) in QUANTITY_FIELDS.items()
+                }
+                qset_quantities = position("IfcElementQuantity", "Quantities")
+                rel_objects = position("IfcRelDefinesByProperties", "RelatedObjects")
+                rel_definition = position("IfcRelDefinesByProperties", "RelatingPropertyDefinition")
+                project_name_pos = position("IfcProject", "Name")
+                
+                project_name = None
+                element_categories: Dict[int, str] = {}
+                element_classes: Dict[int, str] = {}
+                global_ids: Dict[int, str] = {}
+                quantity_values: Dict[int, tuple] = {}
+                quantity_sets: Dict[int, List[int]] = {}
+                relations = []
+                
+                wanted = set(categories) | set(quantity_fields) | {
+                    "IFCPROJECT", "IFCELEMENTQUANTITY", "IFCRELDEFINESBYPROPERTIES"
                 }
+                
+                # Spatial containment, only decoded for the takeoff table
+                spatial_classes: Dict[str, str] = {}
+                spatial: Dict[int, tuple] = {}
+                contained = []
+                aggregates = []
+                zones: Dict[int, tuple] = {}
+                groups = []
+                if takeoff_path is not None:
+                    stack = [schema.declaration_by_name("IfcSpatialStructureElement").as_entity()]
+                    while stack:
+                        entity = stack.pop()
+                        spatial_classes[entity.name().upper()] = entity.name()
+                        stack.extend(entity.subtypes())
+                    wanted |= set(spatial_classes) | {
+                        "IFCRELCONTAINEDINSPATIALSTRUCTURE", "IFCRELAGGREGATES", "IFCZONE", "IFCRELASSIGNSTOGROUP"
+                    }
+                    name_pos = position("IfcRoot", "Name")
+                    contained_elements = position("IfcRelContainedInSpatialStructure", "RelatedElements")
+                    contained_structure = position("IfcRelContainedInSpatialStructure", "RelatingStructure")
+                    aggregate_whole = position("IfcRelAggregates", "RelatingObject")
+                    aggregate_parts = position("IfcRelAggregates", "RelatedObjects")
+                    group_members = position("IfcRelAssignsToGroup", "RelatedObjects")
+                    group_relating = position("IfcRelAssignsToGroup", "RelatingGroup")
+                
+                # Per-type scan timings, only taken while profiling
+                profiled = profiling.active()
+                scan_seconds: Dict[str, float] = {}
+                scan_counts: Dict[str, int] = {}
+                last = time.perf_counter()
+                for entity_id, ifc_type, args in reader.records(wanted):
+                    if ifc_type in categories:
+                        element_categories[entity_id] = categories[ifc_type]
+                        global_ids[entity_id] = args[0]
+                        if takeoff_path is not None:
+                            element_classes[entity_id] = ifc_type
+                    elif ifc_type in quantity_fields:
+                        field, value_pos = quantity_fields[ifc_type]
+                        if args[value_pos] is not None:
+                            quantity_values[entity_id] = (field, float(args[value_pos]))
+                    elif ifc_type == "IFCELEMENTQUANTITY":
+                        quantity_sets[entity_id] = args[qset_quantities] or []
+                    elif ifc_type == "IFCRELDEFINESBYPROPERTIES":
+                        definition = args[rel_definition]
+                        definitions = definition if isinstance(definition, list) else [definition]
+                        relations.append((args[rel_objects] or [], [d for d in definitions if d is not None]))
+                    elif ifc_type in spatial_classes:
+                        spatial[entity_id] = (spatial_classes[ifc_type], args[0], args[name_pos])
+                    elif ifc_type == "IFCRELCONTAINEDINSPATIALSTRUCTURE":
+                        contained.append((args[contained_structure], args[contained_elements] or []))
+                    elif ifc_type == "IFCRELAGGREGATES":
+                        aggregates.append((args[aggregate_whole], args[aggregate_parts] or []))
+                    elif ifc_type == "IFCZONE":
+                        zones[entity_id] = (args[0], args[name_pos])
+                    elif ifc_type == "IFCRELASSIGNSTOGROUP":
+                        groups.append((args[group_relating], args[group_members] or []))
+                    elif project_name is None:
+                        project_name = args[project_name_pos]
+                    if profiled:
+                        # Decoding the record plus handling it above
+                        now = time.perf_counter()
+                        scan_seconds[ifc_type] = scan_seconds.get(ifc_type, 0.0) + now - last
+                        scan_counts[ifc_type] = scan_counts.get(ifc_type, 0) + 1
+                        last = now
+                for ifc_type, seconds in scan_seconds.items():
+                    profiling.record_entity(
+                        "scan", schema.declaration_by_name(ifc_type).name(), seconds, scan_counts[ifc_type]
+                    )
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - scan_started, operation="parse_streaming", stage="scan")
+            
+            # Resolve quantity sets now that every referenced record has been seen
+            index_started = time.perf_counter()
+            set_values = {}
+            for set_id, quantity_ids in quantity_sets.items():
+                values = {}
+                for quantity_id in quantity_ids:
+                    if quantity_id in quantity_values:
+                        field, value = quantity_values[quantity_id]
+                        values.setdefault(field, value)
+                set_values[set_id] = values
+            quantity_index = QuantityIndex.from_relations(relations, set_values, global_ids)
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - index_started, operation="parse_streaming", stage="quantity_index")
+            if quantity_index_path is not None:
+                with metrics.stage("parse_streaming", "save_index"):
+                    quantity_index.save(quantity_index_path)
+            
+            measure_started = time.perf_counter()
+            element_table = ElementTable() if element_table_path is not None else None
+            takeoff = (
+                TakeoffBuilder(resolve_zones(spatial, zones, groups), location_names(spatial, zones))
+                if takeoff_path is not None else None
+            )
+            locations = resolve_locations(spatial, contained, aggregates) if takeoff is not None else {}
+            class_names = {
+                ifc_type: schema.declaration_by_name(ifc_type).name() for ifc_type in set(element_classes.values())
             }
+            category_totals = {}
+            measure_seconds: Dict[str, float] = {}
+            last = time.perf_counter()
+            for element_id, element_type in element_categories.items():
+                totals = category_totals.setdefault(element_type, {"count": 0, "area": 0.0, "length": 0.0})
+                totals["count"] += 1
+                area = length = 0.0
+                if element_type in self.AREA_BASED:
+                    area = quantity_index.value(element_id, "area")
+                    area = area if area is not None else 10.0
+                    totals["area"] += area
+                elif element_type in self.LENGTH_BASED:
+                    length = quantity_index.value(element_id, "length")
+                    length = length if length is not None else 3.0
+                    totals["length"] += length
+                if element_table is not None:
+                    element_table.add(global_ids[element_id] or f"#{element_id}", element_type, area, length)
+                if takeoff is not None:
+                    takeoff.add(
+                        global_ids[element_id] or f"#{element_id}", class_names[element_classes[element_id]],
+                        element_type, locations.get(element_id), area, length
+                    )
+                if profiled:
+                    now = time.perf_counter()
+                    measure_seconds[element_type] = measure_seconds.get(element_type, 0.0) + now - last
+                    last = now
+            for element_type, seconds in measure_seconds.items():
+                profiling.record_entity("measure", element_type, seconds, category_totals[element_type]["count"])
+            if element_table is not None:
+                element_table.save(element_table_path)
+            if takeoff is not None:
+                takeoff.save(takeoff_path, self.rate_table, {"cost_database_version": self.cost_database_version})
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - measure_started, operation="parse_streaming", stage="measure")
+            if takeoff is not None and spatial_index_path is not None:
+                with metrics.stage("parse_streaming", "spatial_index"):
+                    SpatialIndex.from_takeoff(TakeoffTable(takeoff_path)).save(spatial_index_path)
+            
+            with metrics.stage("parse_streaming", "price"):
+                result = self._build_result(project_name or "Unknown", category_totals)
+            metrics.MODEL_ELEMENTS.observe(result["summary"]["element_count"], parser="streaming")
+            metrics.PARSES.inc(parser="streaming", outcome="success")
+            return result
             
         except Exception as e:
+            metrics.PARSES.inc(parser="streaming", outcome="error")
             logger.error(f"Error parsing IFC file: {e}")
             raise HTTPException(status_code=500, detail=f"Error parsing IFC file: {str(e)}")
 
-    def _get_element_area(self, element) -> float:
+    def _build_result(self, project_name: str, category_totals: Dict[str, Dict]) -> Dict:
+        """Price measured categories and assemble the parse result
+
+        ``category_totals`` maps a cost category to its element count and
+        summed area/length.
+        """
+        rates = self.rate_table
+        element_types = [
+            element_type for element_type in self.cost_database
+            if category_totals.get(element_type) and category_totals[element_type]["count"] > 0
+        ]
+        codes = rates.encode(element_types)
+        counts = np.array([category_totals[t]["count"] for t in element_types], dtype=np.int64)
+        areas = np.array([category_totals[t]["area"] for t in element_types], dtype=np.float64)
+        lengths = np.array([category_totals[t]["length"] for t in element_types], dtype=np.float64)
+        material, labor, total = cost_engine.price(rates, codes, counts, areas, lengths)
+        
+        return {
+            "project_name": project_name,
+            "processed_at": datetime.now().isoformat(),
+            # Rates the result was priced with; cached results are keyed by it
+            "cost_database_version": self.cost_database_version,
+            "quantities": cost_engine.build_quantities(rates, codes, counts, areas, lengths, material, labor, total),
+            # Unrounded inputs, so re-pricing matches a fresh parse
+            "measures": {
+                element_type: {
+                    "count": int(counts[i]), "area": float(areas[i]), "length": float(lengths[i])
+                }
+                for i, element_type in enumerate(element_types)
+            },
+            "summary": {
+                "total_material_cost": round(float(material.sum()), 2),
+                "total_labor_cost": round(float(labor.sum()), 2),
+                "total_cost": round(float(total.sum()), 2),
+                "element_count": int(counts.sum())
+            }
+        }
+
+    def reprice_projects(self, store, on_repriced: Optional[Callable[[List[str]], int]] = None) -> Dict:
+        """Re-price every stored project's quantities against the current rates
+
+        Works from the store's columnar quantity rows, so no IFC file is
+        opened; pricing and per-project totals are array operations.
+        ``on_repriced`` is given the re-priced project ids to bring derived
+        per-element data onto the same rates, and returns how many files it
+        rewrote.
+        """
+        self.refresh_catalogue()
+        rates = self.rate_table
+        project_ids, rows = store.quantity_rows()
+        columns = cost_engine.quantity_columns(rows, rates)
+        material, labor, total = cost_engine.price(
+            rates, columns["code"], columns["count"], columns["area"], columns["length"]
+        )
+        # Types that no longer have a rate are left out of the quantities, so
+        # they are not counted either
+        priced_counts = np.where(columns["code"] >= 0, columns["count"], 0)
+        totals = cost_engine.project_totals(
+            columns["project"], len(project_ids), material, labor, total, priced_counts
+        )
+        
+        # Rows arrive grouped by project; slice each project's rows out.
+        # Plain lists make the per-row payload building several times faster.
+        boundaries = np.flatnonzero(np.diff(columns["project"])) + 1
+        starts = np.concatenate(([0], boundaries)).astype(np.int64).tolist()
+        ends = np.concatenate((boundaries, [len(columns["project"])])).astype(np.int64).tolist()
+        row_columns = [
+            column.tolist() for column in
+            (columns["code"], columns["count"], columns["area"], columns["length"], material, labor, total)
+        ]
+        summaries = zip(*(totals[key].tolist() for key in (
+            "total_material_cost", "total_labor_cost", "total_cost", "element_count"
+        )))
+        updates = []
+        for index, (project_id, summary) in enumerate(zip(project_ids, summaries)):
+            quantities = cost_engine.build_quantities(
+                rates, *row_columns, rows=range(starts[index], ends[index])
+            )
+            updates.append((project_id, quantities, dict(zip(
+                ("total_material_cost", "total_labor_cost", "total_cost", "element_count"), summary
+            ))))
+        store.update_costs(updates, self.cost_database_version)
+        takeoffs = on_repriced(project_ids) if on_repriced is not None else 0
+        
+        unpriced = sorted({rows[i][1] for i in np.flatnonzero(columns["code"] < 0)})
+        return {
+            "projects": len(project_ids),
+            "rows": len(rows),
+            "takeoffs_repriced": takeoffs,
+            "total_cost": round(float(totals["total_cost"].sum()), 2),
+            "unpriced_types": unpriced
+        }
+
+    def price_revision(self, previous: ElementTable, current: ElementTable, project_name: str) -> Dict:
+        """Re-price a project from the elements a revision touched
+
+        Starts from the previous revision's totals, takes out the old rows
+        of changed and removed elements and adds the rows of added and
+        changed ones, so unchanged elements are never re-measured or summed.
+        """
+        self.refresh_catalogue()
+        added, changed, removed = previous.diff(current)
+        old_rows = [previous.rows[global_id] for global_id in changed + removed]
+        new_rows = [current.rows[global_id] for global_id in added + changed]
+        
+        category_totals = accumulate(old_rows, previous.category_totals(), sign=-1)
+        accumulate(new_rows, category_totals)
+        result = self._build_result(project_name, category_totals)
+        
+        # Cost of what was taken out versus what was put in, per type
+        before = self._build_result(project_name, accumulate(old_rows))["quantities"]
+        after = self._build_result(project_name, accumulate(new_rows))["quantities"]
+        by_type = {}
+        for element_type in self.cost_database:
+            old, new = before.get(element_type, {}), after.get(element_type, {})
+            if not old and not new:
+                continue
+            by_type[element_type] = {
+                key: round(new.get(key, 0) - old.get(key, 0), 2)
+                for key in ("count", "total_area", "total_length", "material_cost", "labor_cost", "total_cost")
+                if key in old or key in new
+            }
+        
+        return {
+            "result": result,
+            "diff": {
+                "added": added,
+                "changed": changed,
+                "removed": removed,
+                "unchanged": len(current) - len(added) - len(changed)
+            },
+            "cost_delta": {
+                "total_material_cost": round(sum(d["material_cost"] for d in by_type.values()), 2),
+                "total_labor_cost": round(sum(d["labor_cost"] for d in by_type.values()), 2),
+                "total_cost": round(sum(d["total_cost"] for d in by_type.values()), 2),
+                "by_type": by_type
+            }
+        }
+
+    def _measure_missing_quantities(
+        self,
+        ifc_file,
+        elements_by_category: Dict[str, List],
+        quantity_index: QuantityIndex,
+        previous: Optional[ElementTable] = None
+    ) -> Tuple[Dict, Dict[str, str]]:
+        """Fill in areas/lengths missing from quantity sets from element geometry
+
+        Measured values are added to ``quantity_index``, so they are priced
+        and persisted like quantity-set values. An element of ``previous``
+        with the same category and shape digest keeps its measurement
+        instead of being tessellated again. Returns timing statistics and
+        the shape digest of every element measured, by GlobalId.
+        """
+        missing = []
+        for element_type, elements in elements_by_category.items():
+            field = "area" if element_type in self.AREA_BASED else "length" if element_type in self.LENGTH_BASED else None
+            if field is None:
+                continue
+            missing.extend(
+                (element, element_type, field) for element in elements
+                if quantity_index.value(element.id(), field) is None
+            )
+        if not missing:
+            return {"elements": 0, "measured": 0}, {}
+        
+        shapes = {}
+        to_measure = []
+        for element, element_type, field in missing:
+            global_id = element.GlobalId or f"#{element.id()}"
+            row = previous.rows.get(global_id) if previous is not None else None
+            if row is not None and row[0] == element_type and global_id in previous.shapes:
+                digest = shape_digest(ifc_file, element)
+                if digest == previous.shapes[global_id]:
+                    quantity_index.entries.setdefault(element.id(), {})[field] = row[1] if field == "area" else row[2]
+                    quantity_index.global_ids.setdefault(element.id(), element.GlobalId)
+                    shapes[global_id] = digest
+                    continue
+            to_measure.append((element, field))
+        
+        measured, stats = measure_elements(ifc_file, [element for element, _ in to_measure], self.geometry_threads)
+        for element, field in to_measure:
+            measures = measured.get(element.id())
+            if measures and measures.get(field):
+                quantity_index.entries.setdefault(element.id(), {})[field] = measures[field]
+                quantity_index.global_ids.setdefault(element.id(), element.GlobalId)
+                shapes[element.GlobalId or f"#{element.id()}"] = shape_digest(ifc_file, element)
+        stats["unchanged"] = len(missing) - len(to_measure)
+        logger.info(
+            f"Measured {stats['measured']} of {stats['elements']} elements from geometry "
+            f"({stats['tessellated']} tessellated, {stats['unchanged']} unchanged since the previous revision) "
+            f"in {stats['seconds']}s"
+        )
+        return stats, shapes
+
+    def build_quantity_index(self, ifc_file) -> QuantityIndex:
+        """Index area/length/volume/count quantities of every element in one pass"""
+        return QuantityIndex.from_model(ifc_file)
+
+    def _get_element_area(self, element, quantity_index: Optional[QuantityIndex] = None) -> float:
         """Calculate area for area-based elements"""
+        if quantity_index is not None:
+            area = quantity_index.value(element.id(), "area")
+            return area if area is not None else 10.0  # Default area in m²
+        
         try:
             # Try to get quantity sets
             for definition in element.IsDefinedBy:
@@ -148,8 +915,12 @@ class BIMProcessor:
         except:
             return 10.0
 
-    def _get_element_length(self, element) -> float:
+    def _get_element_length(self, element, quantity_index: Optional[QuantityIndex] = None) -> float:
         """Calculate length for length-based elements"""
+        if quantity_index is not None:
+            length = quantity_index.value(element.id(), "length")
+            return length if length is not None else 3.0  # Default length in m
+        
         try:
             # Try to get quantity sets
             for definition in element.IsDefinedBy:
@@ -166,13 +937,14 @@ class BIMProcessor:
         except:
             return 3.0
 
-    def generate_pdf_report(self, project_id: str, data: Dict) -> Path:
+    def generate_pdf_report(self, project_id: str, data: Dict, report_path: Optional[Path] = None) -> Path:
         """Generate PDF report (placeholder - implement with ReportLab)"""
+        started = time.perf_counter()
         try:
             from reportlab.pdfgen import canvas
             from reportlab.lib.pagesizes import letter
             
-            report_path = REPORTS_DIR / f"{project_id}_report.pdf"
+            report_path = report_path or REPORTS_DIR / f"{project_id}_report.pdf"
             
             # Create PDF
             c = canvas.Canvas(str(report_path), pagesize=letter)
@@ -219,14 +991,16 @@ class BIMProcessor:
                 
                 c.drawString(50, y, f"{element_type}: {qty['count']} items, ${qty['total_cost']:,.2f}")
                 y -= 15
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, operation="report", stage="draw")
             
-            c.save()
+            with metrics.stage("report", "write"):
+                c.save()
             return report_path
             
         except ImportError:
             # Fallback: create simple text file
-            report_path = REPORTS_DIR / f"{project_id}_report.txt"
-            with open(report_path, 'w') as f:
+            report_path = report_path.with_suffix(".txt") if report_path else REPORTS_DIR / f"{project_id}_report.txt"
+            with metrics.stage("report", "write"), open(report_path, 'w') as f:
                 f.write(f"InstallSure BIM Cost Report\n")
                 f.write(f"Project: {data['project_name']}\n")
                 f.write(f"Generated: {data['processed_at']}\n\n")
@@ -237,47 +1011,705 @@ class BIMProcessor:
             return report_path
 
 # Initialize processor
-bim_processor = BIMProcessor()
+bim_processor = BIMProcessor(
+    COST_CATALOGUE_PATH,
+    COST_REGION,
+    geometry_fallback=GEOMETRY_FALLBACK,
+    geometry_threads=GEOMETRY_THREADS
+)
+
+project_store = create_project_store(PROJECT_STORE_BACKEND, PROJECT_DB_PATH)
+
+# Worker processes that run parse_ifc off the event loop
+parse_pool = ParseWorkerPool(
+    max_workers=PARSE_WORKERS,
+    max_queue_depth=PARSE_QUEUE_DEPTH,
+    max_tasks_per_child=PARSE_WORKER_MAX_TASKS,
+)
+heavy_pool = ParseWorkerPool(
+    max_workers=HEAVY_PARSE_WORKERS,
+    max_queue_depth=HEAVY_PARSE_WORKERS * 4,
+    max_tasks_per_child=PARSE_WORKER_MAX_TASKS,
+) if HEAVY_PARSE_WORKERS > 0 else parse_pool
+
+def _pool_for(summary: Optional[Dict]) -> ParseWorkerPool:
+    """Parse pool for a model, given its pre-scan summary"""
+    return heavy_pool if summary and summary.get("heavy") else parse_pool
+
+admission = AdmissionController(
+    PARSE_MEMORY_BUDGET,
+    client_concurrency=CLIENT_CONCURRENCY,
+    client_rate_per_minute=CLIENT_RATE_PER_MIN,
+    client_burst=CLIENT_BURST,
+    held_bytes=lambda: model_cache.loaded_bytes
+)
+
+def _client_id(request: Request) -> str:
+    client = request.headers.get(CLIENT_ID_HEADER)
+    if not client:
+        forwarded = request.headers.get("X-Forwarded-For")
+        client = forwarded.split(",")[0].strip() if forwarded else None
+    return client or (request.client.host if request.client else "unknown")
+
+def _admission_response(error: AdmissionError) -> JSONResponse:
+    metrics.ADMISSION_REJECTIONS.inc(reason=error.reason)
+    return JSONResponse(
+        status_code=error.status_code,
+        content={"detail": str(error)},
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    )
+
+def _admission_http_error(error: AdmissionError) -> HTTPException:
+    metrics.ADMISSION_REJECTIONS.inc(reason=error.reason)
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    )
+
+def _parse_memory_estimate(file_size: int, summary: Optional[Dict], streaming: bool) -> int:
+    """Estimated peak memory of parsing a model, for admission"""
+    entities = (summary or {}).get("approx_entities", 0)
+    if streaming:
+        # The streaming reader keeps only elements, quantities and relationships
+        return entities * STREAMING_BYTES_PER_ENTITY if entities else int(file_size * MODEL_MEMORY_FACTOR / 2)
+    return max(int(file_size * MODEL_MEMORY_FACTOR), entities * PARSE_BYTES_PER_ENTITY)
+
+def _quantity_index_path(file_hash: str) -> Path:
+    """Quantity indexes are content-addressed, like the parse cache"""
+    return INDEXES_DIR / f"{file_hash}.json"
+
+def _element_table_path(file_hash: str) -> Path:
+    return INDEXES_DIR / f"{file_hash}.elements.json"
+
+def _takeoff_path(file_hash: str) -> Path:
+    return INDEXES_DIR / f"{file_hash}.takeoff"
+
+def _spatial_index_path(file_hash: str) -> Path:
+    return INDEXES_DIR / f"{file_hash}.spatial.json"
+
+def _profile_path(project_id: str) -> Path:
+    return PROFILES_DIR / f"{project_id}.folded"
+
+def _use_streaming_parser(file_path: Path, streaming: Optional[bool]) -> bool:
+    if streaming is not None:
+        return streaming
+    return STREAMING_PARSE_BYTES > 0 and file_path.stat().st_size >= STREAMING_PARSE_BYTES
+
+def _parse_ifc_job(
+    file_path: str,
+    quantity_index_path: Optional[str] = None,
+    streaming: bool = False,
+    element_table_path: Optional[str] = None,
+    profile_path: Optional[str] = None,
+    takeoff_path: Optional[str] = None,
+    spatial_index_path: Optional[str] = None
+) -> Dict:
+    """Worker-process entry point for parse_ifc / parse_ifc_streaming.
+
+    HTTPException does not survive pickling back to the API process, so it is
+    converted to a plain error carrying the same detail. With
+    ``profile_path`` the parse is profiled and the result gains a
+    ``profile`` summary.
+    """
+    parse = functools.partial(
+        bim_processor.parse_ifc_streaming if streaming else bim_processor.parse_ifc,
+        Path(file_path),
+        quantity_index_path=Path(quantity_index_path) if quantity_index_path else None,
+        element_table_path=Path(element_table_path) if element_table_path else None,
+        takeoff_path=Path(takeoff_path) if takeoff_path else None,
+        spatial_index_path=Path(spatial_index_path) if spatial_index_path else None
+    )
+    try:
+        if profile_path is None:
+            return parse()
+        with profiling.capture(Path(profile_path), PROFILE_INTERVAL) as session:
+            result = parse()
+        result["profile"] = session.summary()
+        return result
+    except HTTPException as e:
+        raise RuntimeError(e.detail) from None
+
+def _revision_job(
+    previous_table_path: str,
+    current_table_path: str,
+    project_name: str,
+    file_path: str,
+    quantity_index_path: str,
+    takeoff_path: str,
+    spatial_index_path: str
+) -> Dict:
+    """Worker-process entry point for revision diffs.
+
+    The new model is measured the way the previous revision was, so their
+    rows compare like with like: scanned with the streaming reader, or, when
+    the previous revision's missing quantities were measured from geometry,
+    parsed in full with only the shapes that changed tessellated again. An
+    element table already on disk for the new model is used as it is when it
+    was measured the same way. The revision is then priced incrementally
+    against the previous one.
+    """
+    previous = ElementTable.load(Path(previous_table_path))
+    current_path = Path(current_table_path)
+    current = ElementTable.load(current_path) if current_path.exists() else None
+    parsed = None
+    if current is None or current.geometry_fallback != previous.geometry_fallback:
+        outputs = {
+            "quantity_index_path": Path(quantity_index_path),
+            "element_table_path": current_path,
+            "takeoff_path": Path(takeoff_path),
+            "spatial_index_path": Path(spatial_index_path),
+        }
+        try:
+            if previous.geometry_fallback:
+                parsed = bim_processor.parse_ifc(Path(file_path), previous=previous, **outputs)
+            else:
+                parsed = bim_processor.parse_ifc_streaming(Path(file_path), **outputs)
+        except HTTPException as e:
+            raise RuntimeError(e.detail) from None
+        project_name = parsed["project_name"]
+        current = ElementTable.load(current_path)
+    revision = bim_processor.price_revision(previous, current, project_name)
+    if parsed is not None and "geometry" in parsed:
+        revision["result"]["geometry"] = parsed["geometry"]
+    revision["parsed"] = parsed is not None
+    revision["geometry_fallback"] = current.geometry_fallback
+    return revision
+
+parse_cache = ParseResultCache(
+    CACHE_DIR,
+    memory_entries=PARSE_CACHE_MEMORY_ENTRIES,
+    max_disk_bytes=PARSE_CACHE_MAX_DISK_BYTES,
+)
+
+def _render_report_job(project_id: str, data: Dict, report_path: str) -> str:
+    """Worker-process entry point for generate_pdf_report.
+
+    Renders to a temporary name and renames, so a report is never served
+    half-written.
+    """
+    target = Path(report_path)
+    tmp_path = target.with_name(f".{target.stem}.{os.getpid()}{target.suffix}")
+    rendered = bim_processor.generate_pdf_report(project_id, data, report_path=tmp_path)
+    final_path = target.with_suffix(rendered.suffix)
+    os.replace(rendered, final_path)
+    return str(final_path)
+
+report_pool = ParseWorkerPool(max_workers=REPORT_WORKERS, max_queue_depth=REPORT_WORKERS * 16)
+report_cache = ReportCache(REPORTS_DIR, report_pool, _render_report_job, max_disk_bytes=REPORT_CACHE_MAX_DISK_BYTES)
+
+model_cache = ModelCache(
+    MODEL_CACHE_BYTES, memory_factor=MODEL_MEMORY_FACTOR, reserve=lambda cost: admission.reserve(cost)
+)
+
+def _warm_model(project_id: str, file_path: Path) -> None:
+    """Open a freshly processed model so follow-up queries skip the parse"""
+    if MODEL_CACHE_WARM:
+        model_cache.warm(project_id, file_path)
+
+# Upload jobs are drained by one consumer per worker; the pool does the parsing
+job_queue = create_job_queue(
+    JOB_BACKEND,
+    concurrency=PARSE_WORKERS + (heavy_pool.max_workers if heavy_pool is not parse_pool else 0),
+    max_size=JOB_QUEUE_SIZE,
+    redis_url=REDIS_URL
+)
+# Jobs are stamped with the process queuing them so a restart can tell which
+# queued projects were lost with a dead process's in-memory queue
+job_owner = JobOwner(DATA_DIR / "workers")
+
+def _prescan_rejection(error: prescan.PrescanError) -> HTTPException:
+    metrics.PRESCANS.inc(result=error.reason)
+    return HTTPException(status_code=400, detail=f"Invalid IFC file: {error}")
+
+async def _prescan_upload(file_path: Path) -> Dict:
+    """Pre-scan a stored upload; a rejected file is deleted and raises PrescanError"""
+    try:
+        with metrics.stage("upload", "prescan"):
+            summary = await asyncio.to_thread(prescan.prescan, file_path)
+    except prescan.PrescanError:
+        file_path.unlink(missing_ok=True)
+        raise
+    metrics.PRESCANS.inc(result="accepted")
+    metrics.PRESCAN_ENTITIES.observe(summary["approx_entities"], schema=summary["schema"])
+    summary["heavy"] = (
+        heavy_pool is not parse_pool and HEAVY_PARSE_ENTITIES > 0 and summary["approx_entities"] >= HEAVY_PARSE_ENTITIES
+    )
+    return summary
+
+
+def _result_cache_key(file_hash: str, cost_version: str, streamed: bool) -> str:
+    # Geometry-measured results differ from default-sized ones; the
+    # streaming parser never measures geometry
+    if GEOMETRY_FALLBACK and not streamed:
+        cost_version = f"{cost_version}-geometry"
+    return ParseResultCache.make_key(file_hash, cost_version)
+
+async def _lookup_cached_result(file_hash: str, streamed: bool) -> Optional[Dict]:
+    bim_processor.refresh_catalogue()
+    key = _result_cache_key(file_hash, bim_processor.cost_database_version, streamed)
+    with metrics.stage("upload", "cache_lookup"):
+        cached = await asyncio.to_thread(parse_cache.get, key)
+    return dict(cached) if cached is not None else None
+
+async def _parse_upload(
+    file_path: Path,
+    file_hash: str,
+    wait_for_capacity: bool = False,
+    streaming: Optional[bool] = None,
+    profile_path: Optional[Path] = None,
+    summary: Optional[Dict] = None
+) -> Dict:
+    """Return parse_ifc results for an upload, from the cache when possible.
+
+    Background jobs share the pool with synchronous uploads, so with
+    ``wait_for_capacity`` a full pool only means the job waits its turn;
+    otherwise PoolSaturatedError propagates to the caller. ``streaming``
+    forces the parser choice; by default large files are streamed.
+    A profiled upload (``profile_path``) is always parsed, and its result
+    carries the profile summary. Models the pre-scan ``summary`` marks as
+    heavy are parsed in the heavy pool.
+
+    The parse reserves its estimated memory from the admission budget. When
+    the budget is used up, AdmissionError propagates, or the parse waits
+    with ``wait_for_capacity``.
+    """
+    use_streaming = _use_streaming_parser(file_path, streaming)
+    if profile_path is None:
+        cached = await _lookup_cached_result(file_hash, use_streaming)
+        if cached is not None:
+            logger.info(f"Parse cache hit for {file_path.name}")
+            return cached
+
+    if use_streaming:
+        logger.info(f"Using streaming parser for {file_path.name}")
+    cost = _parse_memory_estimate(file_path.stat().st_size, summary, use_streaming)
+    async with admission.reserve(cost, wait=wait_for_capacity):
+        while True:
+            try:
+                processed_data = await _pool_for(summary).run(
+                    _parse_ifc_job,
+                    str(file_path),
+                    str(_quantity_index_path(file_hash)),
+                    use_streaming,
+                    str(_element_table_path(file_hash)),
+                    str(profile_path) if profile_path is not None else None,
+                    str(_takeoff_path(file_hash)),
+                    str(_spatial_index_path(file_hash))
+                )
+                break
+            except PoolSaturatedError:
+                if not wait_for_capacity:
+                    raise
+                await asyncio.sleep(1.0)
+
+    # Keyed by the rates the worker actually used, which may be newer than
+    # the API process's if the catalogue was edited meanwhile
+    key = _result_cache_key(file_hash, processed_data["cost_database_version"], use_streaming)
+    cached_data = {k: v for k, v in processed_data.items() if k != "profile"}
+    await asyncio.to_thread(parse_cache.put, key, cached_data)
+    return processed_data
+
+async def _process_upload_job(job: Dict) -> Optional[Dict]:
+    """Parse an uploaded file and record the outcome.
+
+    Used by the queue consumers and the batch endpoint. Returns the parse
+    results, or None when processing failed (the failure is recorded on the
+    project).
+    """
+    project_id = job["id"]
+    if await asyncio.to_thread(project_store.get, project_id, include_quantities=False) is None:
+        await asyncio.to_thread(project_store.create, job)
+    await _set_job_status(project_id, JOB_PARSING, 10)
+    try:
+        summary = job.get("prescan")
+        if summary is None:
+            # Batch members are pre-scanned here rather than on receipt
+            try:
+                summary = await _prescan_upload(Path(job["file_path"]))
+            except prescan.PrescanError as e:
+                metrics.PRESCANS.inc(result=e.reason)
+                raise ValueError(f"Invalid IFC file: {e}") from None
+            await asyncio.to_thread(project_store.update, project_id, {"prescan": summary})
+        with metrics.stage("job", "parse"):
+            processed_data = await _parse_upload(
+                Path(job["file_path"]),
+                job["file_hash"],
+                wait_for_capacity=True,
+                streaming=job.get("streaming"),
+                profile_path=_profile_path(project_id) if job.get("profiling") else None,
+                summary=summary
+            )
+    except Exception as e:
+        logger.error(f"Error processing project {project_id}: {e}")
+        await asyncio.to_thread(project_store.update, project_id, {"error": str(e)})
+        await _set_job_status(project_id, JOB_FAILED, 100, error=str(e))
+        return None
+
+    await asyncio.to_thread(project_store.update, project_id, processed_data)
+    await _set_job_status(project_id, JOB_PROCESSED, 100)
+    _warm_model(project_id, Path(job["file_path"]))
+    logger.info(f"Successfully processed project {project_id}")
+    return processed_data
+
+def _claim_orphaned_jobs() -> List[Dict]:
+    """Take over queued or parsing projects whose owning process has exited"""
+    claimed = []
+    with job_owner.recovering():
+        for status in (JOB_QUEUED, JOB_PARSING):
+            query = ProjectQuery(limit=500, status=status, fields=("id",))
+            while True:
+                page, query.cursor = project_store.list_projects(query)
+                for row in page:
+                    job = project_store.get(row["id"], include_quantities=False)
+                    if job is None or job_owner.is_alive(job.get("worker")):
+                        continue
+                    job.update(status=JOB_QUEUED, progress=0, worker=job_owner.id)
+                    project_store.update(job["id"], {"status": JOB_QUEUED, "progress": 0, "worker": job_owner.id})
+                    claimed.append(job)
+                if query.cursor is None:
+                    break
+        job_owner.prune()
+    return claimed
+
+async def _recover_jobs() -> None:
+    """Queue again the jobs lost when a process holding them exited
+
+    Their projects would otherwise report queued or parsing forever. A job
+    whose file is gone, or that no longer fits in the queue, is failed.
+    """
+    for job in await asyncio.to_thread(_claim_orphaned_jobs):
+        error = None
+        if not Path(job["file_path"]).exists():
+            error = "The uploaded file was lost when the service restarted"
+        else:
+            try:
+                await job_queue.enqueue(job)
+            except QueueFullError:
+                error = "The job queue was full when the service restarted"
+        if error is not None:
+            await asyncio.to_thread(project_store.update, job["id"], {"error": error})
+            await _set_job_status(job["id"], JOB_FAILED, 100, error=error)
+        logger.info(f"Recovered project {job['id']}: {error or 'queued again'}")
+
+async def _set_job_status(project_id: str, status: str, progress: int, error: Optional[str] = None):
+    await asyncio.to_thread(project_store.update, project_id, {"status": status, "progress": progress})
+    await job_queue.set_status(project_id, status, progress, error=error)
+
+async def _get_processed_project(project_id: str, include_quantities: bool = True) -> Dict:
+    """Look up a project whose quantities are available."""
+    project = await asyncio.to_thread(project_store.get, project_id, include_quantities=include_quantities)
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if project["status"] != JOB_PROCESSED:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Project is not processed yet (status: {project['status']})"
+        )
+    return project
+
+async def _readiness() -> Dict:
+    """Whether new parse work can be taken on, and what is limiting it"""
+    reasons = []
+    if admission.saturated:
+        reasons.append("parse memory budget in use")
+    if not parse_pool.has_capacity():
+        reasons.append("parse pool full")
+    if JOB_QUEUE_SIZE and await job_queue.depth() >= JOB_QUEUE_SIZE:
+        reasons.append("job queue full")
+    return {"ready": not reasons, "reasons": reasons}
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive"}
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
+    """Health check endpoint
+
+    Doubles as a readiness probe: answers 503 with status ``saturated`` while
+    the service cannot take new parses (memory budget, parse pool or job
+    queue full), so gateways stop routing uploads to it. Container health
+    checks use ``/health/live``, the plain liveness check, so a busy
+    service is not restarted.
+    """
+    readiness = await _readiness()
+    body = {
+        "status": "healthy" if readiness["ready"] else "saturated",
+        **readiness,
         "service": "BIM Service",
         "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "workers": parse_pool.stats(),
+        "heavy_workers": heavy_pool.stats() if heavy_pool is not parse_pool else None,
+        "jobs": {
+            "backend": JOB_BACKEND,
+            "queued": await job_queue.depth(),
+            "active": job_queue.active
+        },
+        "projects": {
+            "backend": PROJECT_STORE_BACKEND,
+            "count": await asyncio.to_thread(project_store.count)
+        },
+        "admission": admission.stats(),
+        "parse_cache": parse_cache.stats(),
+        "model_cache": model_cache.stats(),
+        "reports": report_cache.stats()
     }
+    if not readiness["ready"]:
+        return FastJSONResponse(status_code=503, content=body, headers={"Retry-After": str(math.ceil(admission.retry_after))})
+    return body
 
-@app.post("/upload")
-async def upload_ifc(file: UploadFile = File(...)):
-    """Upload and process IFC file"""
-    if not file.filename.lower().endswith('.ifc'):
-        raise HTTPException(status_code=400, detail="Only IFC files are supported")
-    
+def _pool_families(pools: Dict[str, ParseWorkerPool]) -> List[metrics.Family]:
+    stats = {name: pool.stats() for name, pool in pools.items()}
+
+    def samples(key: str):
+        return [({"pool": name}, pool_stats[key]) for name, pool_stats in stats.items()]
+
+    return [
+        metrics.Family("bim_pool_workers", "gauge", "Worker processes per pool", samples("workers")),
+        metrics.Family("bim_pool_busy_workers", "gauge", "Workers currently running a job", samples("busy_workers")),
+        metrics.Family(
+            "bim_pool_utilization", "gauge", "Fraction of workers currently running a job",
+            [({"pool": name}, round(s["busy_workers"] / s["workers"], 4)) for name, s in stats.items()]
+        ),
+        metrics.Family("bim_pool_queued", "gauge", "Jobs waiting for a free worker", samples("queued")),
+        metrics.Family("bim_pool_jobs_completed_total", "counter", "Jobs completed per pool", samples("completed")),
+        metrics.Family("bim_pool_jobs_failed_total", "counter", "Jobs failed per pool", samples("failed")),
+        metrics.Family("bim_pool_jobs_rejected_total", "counter", "Jobs rejected because the pool was full", samples("rejected")),
+    ]
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics in the text exposition format"""
+    cache = parse_cache.stats()
+    reports = report_cache.stats()
+    models = model_cache.stats()
+    pools = {"parse": parse_pool, "heavy": heavy_pool, "report": report_pool}
+    if heavy_pool is parse_pool:
+        del pools["heavy"]
+    families = _pool_families(pools) + [
+        metrics.Family("bim_job_queue_depth", "gauge", "Upload jobs waiting in the job queue", [({}, await job_queue.depth())]),
+        metrics.Family("bim_job_queue_active", "gauge", "Upload jobs being processed", [({}, job_queue.active)]),
+        metrics.Family(
+            "bim_parse_cache_lookups_total", "counter", "Parse result cache lookups by outcome",
+            [({"result": result}, cache[key]) for result, key in (
+                ("memory_hit", "memory_hits"), ("disk_hit", "disk_hits"), ("miss", "misses")
+            )]
+        ),
+        metrics.Family("bim_parse_cache_hit_ratio", "gauge", "Parse result cache hits per lookup", [({}, cache["hit_rate"])]),
+        metrics.Family("bim_parse_cache_evictions_total", "counter", "Parse results evicted from disk", [({}, cache["evictions"])]),
+        metrics.Family("bim_parse_cache_disk_bytes", "gauge", "Disk used by cached parse results", [({}, cache["disk_bytes"])]),
+        metrics.Family(
+            "bim_report_requests_total", "counter", "Report requests by how they were served",
+            [({"result": result}, reports[result]) for result in ("hits", "renders", "deduplicated")]
+        ),
+        metrics.Family(
+            "bim_model_cache_lookups_total", "counter", "Opened-model cache lookups by outcome",
+            [({"result": "hit"}, models["hits"]), ({"result": "miss"}, models["misses"])]
+        ),
+        metrics.Family("bim_model_cache_evictions_total", "counter", "Models evicted from the opened-model cache", [({}, models["evictions"])]),
+        metrics.Family("bim_model_cache_models", "gauge", "Models held open", [({}, models["models"])]),
+        metrics.Family("bim_model_cache_estimated_bytes", "gauge", "Estimated memory of the models held open", [({}, models["estimated_bytes"])]),
+        metrics.Family("bim_projects", "gauge", "Stored projects", [({}, await asyncio.to_thread(project_store.count))]),
+        metrics.Family("bim_admission_memory_budget_bytes", "gauge", "Parse memory budget", [({}, admission.memory_budget)]),
+        metrics.Family(
+            "bim_admission_reserved_bytes", "gauge", "Estimated memory reserved by running parses",
+            [({}, admission.reserved_bytes)]
+        ),
+        metrics.Family(
+            "bim_admission_waiting", "gauge", "Queued parses waiting for memory", [({}, admission.stats()["waiting"])]
+        ),
+    ]
+    return PlainTextResponse(metrics.REGISTRY.render(families), media_type=metrics.CONTENT_TYPE)
+
+# The upload routes read their multipart body themselves (see _receive_ifc
+# and _store_batch_files); these document the forms they expect
+_IFC_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+_BATCH_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+                }
+            }
+        },
+    }
+}
+
+def _ifc_dest_path(prefix: str):
+    def dest_path_for(filename: str) -> Path:
+        if not filename.lower().endswith('.ifc'):
+            raise HTTPException(status_code=400, detail="Only IFC files are supported")
+        return UPLOADS_DIR / f"{prefix}_{Path(filename).name}"
+    return dest_path_for
+
+async def _receive_ifc(request: Request, prefix: str):
+    """Stream the request's ``file`` field to disk as it arrives, pre-checking its start"""
+    try:
+        return await receive_upload(
+            request.headers, request.stream(), _ifc_dest_path(prefix), MAX_UPLOAD_BYTES,
+            chunk_size=UPLOAD_CHUNK_BYTES, check_start=prescan.check_start
+        )
+    except UploadFormError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/upload", openapi_extra=_IFC_UPLOAD_BODY)
+async def upload_ifc(
+    request: Request,
+    async_mode: bool = False,
+    streaming: Optional[bool] = None,
+    x_profile: Optional[str] = Header(None)
+):
+    """Upload and process IFC file
+
+    With ``async_mode=true`` the file is queued for background processing and
+    the response returns immediately with status ``queued``; poll
+    ``/projects/{project_id}`` for progress. ``streaming`` forces (or
+    disables) the memory-mapped parser, which is otherwise used for files of
+    at least BIM_STREAMING_PARSE_MB.
+
+    ``X-Profile: 1`` profiles the parse (see ``/projects/{project_id}/profile``);
+    BIM_PROFILE_SAMPLE_RATE profiles a random fraction of uploads.
+
+    Files are pre-scanned before parsing (STEP header, schema, DATA section,
+    truncation); malformed files are rejected with 400 without a parse, and
+    the scan summary is stored on the project as ``prescan``.
+    """
     try:
         # Generate project ID
         project_id = str(uuid.uuid4())
         
-        # Save uploaded file
-        file_path = UPLOADS_DIR / f"{project_id}_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # Stream uploaded file to disk
+        try:
+            with metrics.stage("upload", "receive"):
+                filename, stored = await _receive_ifc(request, project_id)
+            file_path = stored.path
+            summary = await _prescan_upload(file_path)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except prescan.PrescanError as e:
+            raise _prescan_rejection(e)
+        metrics.UPLOAD_BYTES.observe(stored.size)
+        
+        uploaded_at = datetime.now().isoformat()
+        profile = profiling.should_profile(x_profile, PROFILE_SAMPLE_RATE)
         
-        # Process IFC file
-        logger.info(f"Processing IFC file: {file.filename}")
-        processed_data = bim_processor.parse_ifc(file_path)
+        if async_mode:
+            # A known revision is answered straight from the cache, unless
+            # the parse is to be profiled
+            cached = None if profile else await _lookup_cached_result(
+                stored.sha256, _use_streaming_parser(file_path, streaming)
+            )
+            if cached is not None:
+                await asyncio.to_thread(project_store.create, {
+                    "id": project_id,
+                    "filename": filename,
+                    "file_path": str(file_path),
+                    "file_size": stored.size,
+                    "file_hash": stored.sha256,
+                    "uploaded_at": uploaded_at,
+                    "status": JOB_PROCESSED,
+                    "progress": 100,
+                    "prescan": summary,
+                    **cached
+                })
+                _warm_model(project_id, file_path)
+                return {
+                    "success": True,
+                    "project_id": project_id,
+                    "status": JOB_PROCESSED,
+                    "cached": True,
+                    "message": "IFC file processed successfully",
+                    "data": cached
+                }
+            
+            job = {
+                "id": project_id,
+                "filename": filename,
+                "file_path": str(file_path),
+                "file_size": stored.size,
+                "file_hash": stored.sha256,
+                "uploaded_at": uploaded_at,
+                "status": JOB_QUEUED,
+                "progress": 0,
+                "streaming": streaming,
+                "prescan": summary,
+                "worker": job_owner.id
+            }
+            if profile:
+                job["profiling"] = True
+            await asyncio.to_thread(project_store.create, job)
+            try:
+                with metrics.stage("upload", "enqueue"):
+                    await job_queue.enqueue(job)
+            except QueueFullError as e:
+                await asyncio.to_thread(project_store.delete, project_id)
+                file_path.unlink(missing_ok=True)
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+            
+            logger.info(f"Queued IFC file {filename} as project {project_id}")
+            return JSONResponse(status_code=202, content={
+                "success": True,
+                "project_id": project_id,
+                "status": JOB_QUEUED,
+                "message": "IFC file queued for processing",
+                "status_url": f"/projects/{project_id}",
+                "prescan": summary
+            })
+        
+        # Process IFC file in the worker pool so the event loop stays free
+        logger.info(f"Processing IFC file: {filename}")
+        try:
+            with metrics.stage("upload", "parse"):
+                processed_data = await _parse_upload(
+                    file_path,
+                    stored.sha256,
+                    streaming=streaming,
+                    profile_path=_profile_path(project_id) if profile else None,
+                    summary=summary
+                )
+        except PoolSaturatedError as e:
+            file_path.unlink(missing_ok=True)
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        except AdmissionError as e:
+            file_path.unlink(missing_ok=True)
+            raise _admission_http_error(e)
         
         # Store project data
-        projects_db[project_id] = {
-            "id": project_id,
-            "filename": file.filename,
-            "file_path": str(file_path),
-            "uploaded_at": datetime.now().isoformat(),
-            "status": "processed",
-            **processed_data
-        }
+        with metrics.stage("upload", "store"):
+            await asyncio.to_thread(project_store.create, {
+                "id": project_id,
+                "filename": filename,
+                "file_path": str(file_path),
+                "file_size": stored.size,
+                "file_hash": stored.sha256,
+                "uploaded_at": uploaded_at,
+                "status": JOB_PROCESSED,
+                "progress": 100,
+                "prescan": summary,
+                **processed_data
+            })
+        _warm_model(project_id, file_path)
         
         logger.info(f"Successfully processed project {project_id}")
         
@@ -285,98 +1717,918 @@ async def upload_ifc(file: UploadFile = File(...)):
             "success": True,
             "project_id": project_id,
             "message": "IFC file processed successfully",
-            "data": processed_data
+            "data": processed_data,
+            "prescan": summary
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing upload: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _merge_quantities(results: List[Dict]) -> Dict:
+    """Sum per-type quantities and costs of several parse results"""
+    merged: Dict[str, Dict] = {}
+    for result in results:
+        for element_type, qty in result["quantities"].items():
+            target = merged.setdefault(element_type, {"unit": qty["unit"]})
+            for key, value in qty.items():
+                if key != "unit":
+                    target[key] = target.get(key, 0) + value
+    for qty in merged.values():
+        for key, value in qty.items():
+            if isinstance(value, float):
+                qty[key] = round(value, 2)
+    return {
+        "quantities": merged,
+        "summary": {
+            "total_material_cost": round(sum(q["material_cost"] for q in merged.values()), 2),
+            "total_labor_cost": round(sum(q["labor_cost"] for q in merged.values()), 2),
+            "total_cost": round(sum(q["total_cost"] for q in merged.values()), 2),
+            "element_count": sum(q["count"] for q in merged.values())
+        }
+    }
+
+async def _store_batch_files(batch_id: str, request: Request) -> List[Dict]:
+    """Persist the files of a batch upload and create a queued project for each
+
+    The form is read as it arrives, so the per-file and whole-batch limits
+    hold for a chunked body too.
+    """
+    def dest_path_for(filename: str) -> Path:
+        name = Path(filename).name
+        if name.lower().endswith(".zip"):
+            return UPLOADS_DIR / f"{batch_id}_{uuid.uuid4().hex}.zip"
+        if name.lower().endswith(".ifc"):
+            return UPLOADS_DIR / f"{uuid.uuid4()}_{name}"
+        raise HTTPException(status_code=400, detail=f"{filename}: only IFC files and zip archives are supported")
+
+    try:
+        received = await receive_uploads(
+            request.headers, request.stream(), dest_path_for, MAX_UPLOAD_BYTES, MAX_BATCH_BYTES,
+            chunk_size=UPLOAD_CHUNK_BYTES
+        )
+    except UploadFormError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    stored_files = []
+    try:
+        for name, stored in received:
+            name = Path(name).name
+            if not name.lower().endswith(".zip"):
+                stored_files.append((name, stored))
+            else:
+                try:
+                    stored_files.extend(await asyncio.to_thread(
+                        extract_ifc_archive,
+                        stored.path,
+                        lambda member: UPLOADS_DIR / f"{uuid.uuid4()}_{member}",
+                        MAX_UPLOAD_BYTES,
+                        BATCH_MAX_FILES,
+                        UPLOAD_CHUNK_BYTES,
+                    ))
+                except zipfile.BadZipFile:
+                    raise HTTPException(status_code=400, detail=f"{name} is not a valid zip archive")
+                finally:
+                    stored.path.unlink(missing_ok=True)
+            if len(stored_files) > BATCH_MAX_FILES:
+                raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_FILES} IFC files")
+    except BaseException:
+        for _, stored in received + stored_files:
+            stored.path.unlink(missing_ok=True)
+        raise
+
+    jobs = []
+    uploaded_at = datetime.now().isoformat()
+    for name, stored in stored_files:
+        metrics.UPLOAD_BYTES.observe(stored.size)
+        job = {
+            "id": stored.path.name.split("_", 1)[0],
+            "batch_id": batch_id,
+            "filename": name,
+            "file_path": str(stored.path),
+            "file_size": stored.size,
+            "file_hash": stored.sha256,
+            "uploaded_at": uploaded_at,
+            "status": JOB_QUEUED,
+            "progress": 0,
+            "worker": job_owner.id
+        }
+        await asyncio.to_thread(project_store.create, job)
+        jobs.append(job)
+    return jobs
+
+@app.post("/upload/batch", openapi_extra=_BATCH_UPLOAD_BODY)
+async def upload_batch(request: Request, stream: bool = True):
+    """Upload and process a package of IFC files in parallel
+
+    Accepts several ``.ifc`` files and/or zip archives of them. Every file
+    becomes its own project and is parsed across the worker pool. With
+    ``stream=true`` (default) the response is NDJSON: one ``file`` line per
+    model as it finishes, then a ``summary`` line aggregating the batch.
+    """
+    batch_id = str(uuid.uuid4())
+    try:
+        jobs = await _store_batch_files(batch_id, request)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if not jobs:
+        raise HTTPException(status_code=400, detail="No IFC files found in the upload")
+    
+    logger.info(f"Processing batch {batch_id} with {len(jobs)} IFC files")
+    started = time.perf_counter()
+    
+    async def process(job: Dict):
+        processed_data = await _process_upload_job(job)
+        return job, processed_data, time.perf_counter() - started
+    
+    # Tasks are started now so the batch completes even if the client
+    # stops reading the stream.
+    tasks = [asyncio.create_task(process(job)) for job in jobs]
+    
+    async def results():
+        processed = []
+        for next_done in asyncio.as_completed(tasks):
+            job, processed_data, elapsed = await next_done
+            line = {
+                "type": "file",
+                "filename": job["filename"],
+                "project_id": job["id"],
+                "status": JOB_PROCESSED if processed_data is not None else JOB_FAILED,
+                "elapsed_s": round(elapsed, 3)
+            }
+            if processed_data is not None:
+                processed.append(processed_data)
+                line["project_name"] = processed_data["project_name"]
+                line["summary"] = processed_data["summary"]
+            else:
+                record = await asyncio.to_thread(project_store.get, job["id"], include_quantities=False) or {}
+                line["error"] = record.get("error")
+            yield line
+        
+        yield {
+            "type": "summary",
+            "batch_id": batch_id,
+            "files": len(jobs),
+            "processed": len(processed),
+            "failed": len(jobs) - len(processed),
+            "elapsed_s": round(time.perf_counter() - started, 3),
+            **_merge_quantities(processed)
+        }
+    
+    if stream:
+        async def ndjson():
+            async for line in results():
+                yield json.dumps(line) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    lines = [line async for line in results()]
+    return {"success": True, "files": lines[:-1], "summary": lines[-1]}
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Parse result cache hit/miss counters"""
+    return {
+        "cost_database_version": bim_processor.cost_database_version,
+        "parse_cache": parse_cache.stats()
+    }
+
+@app.get("/cost-catalogue")
+async def get_cost_catalogue():
+    """Rates currently in effect and the catalogue they came from"""
+    bim_processor.refresh_catalogue()
+    catalogue = bim_processor.catalogue
+    return {
+        "version": catalogue.version,
+        "cost_database_version": bim_processor.cost_database_version,
+        "source": catalogue.source,
+        "region": catalogue.region,
+        "rates": catalogue.rates
+    }
+
+@app.post("/cost-catalogue/reload")
+async def reload_cost_catalogue():
+    """Re-read the catalogue file now
+
+    Parse workers notice the change on their next parse. Stored projects keep
+    their old prices until ``POST /projects/reprice``.
+    """
+    previous = bim_processor.cost_database_version
+    await asyncio.to_thread(bim_processor.refresh_catalogue, True)
+    return {
+        "version": bim_processor.catalogue.version,
+        "cost_database_version": bim_processor.cost_database_version,
+        "changed": bim_processor.cost_database_version != previous
+    }
+
+def _reprice_takeoffs(project_ids: List[str]) -> int:
+    """Re-price the takeoff tables and spatial indexes of ``project_ids``' models"""
+    file_hashes = set()
+    for project_id in project_ids:
+        project = project_store.get(project_id, include_quantities=False)
+        if project is not None and project.get("file_hash"):
+            file_hashes.add(project["file_hash"])
+    rewritten = 0
+    for file_hash in file_hashes:
+        takeoff_path = _takeoff_path(file_hash)
+        if not takeoff_path.exists():
+            # Built with current rates on first use
+            continue
+        table = reprice_takeoff(
+            takeoff_path, bim_processor.rate_table, {"cost_database_version": bim_processor.cost_database_version}
+        )
+        SpatialIndex.from_takeoff(table).save(_spatial_index_path(file_hash))
+        rewritten += 1
+    return rewritten
+
+@app.post("/projects/reprice")
+async def reprice_projects():
+    """Re-price every processed project against the current cost database
+
+    Uses the stored per-type quantities; no IFC file is re-opened.
+    """
+    started = time.perf_counter()
+    result = await asyncio.to_thread(bim_processor.reprice_projects, project_store, _reprice_takeoffs)
+    logger.info(f"Re-priced {result['projects']} projects in {time.perf_counter() - started:.2f}s")
+    return {
+        **result,
+        "cost_database_version": bim_processor.cost_database_version,
+        "elapsed_s": round(time.perf_counter() - started, 3)
+    }
+
+# Columns of streamed quantity rows, one row per element type
+QUANTITY_ROW_COLUMNS = (
+    "element_type", "count", "total_area", "total_length", "unit", "material_cost", "labor_cost", "total_cost"
+)
+
+def _check_format(format: str) -> None:
+    if format not in responses.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(responses.FORMATS)}")
+
+def _quantity_rows(quantities: Dict[str, Dict]):
+    for element_type, entry in quantities.items():
+        yield {"element_type": element_type, **entry}
+
 @app.get("/projects/{project_id}")
-async def get_project(project_id: str):
-    """Get project data"""
-    if project_id not in projects_db:
-        raise HTTPException(status_code=404, detail="Project not found")
+async def get_project(project_id: str, format: str = "json"):
+    """Get project data, including job status and progress
+
+    ``format=ndjson`` streams the record without its quantities on the first
+    line, then one line per element type; ``format=csv`` streams the
+    quantity rows only.
+    """
+    _check_format(format)
+    project = await asyncio.to_thread(project_store.get, project_id)
+    if project is None:
+        # Another replica may own the job when the queue is shared
+        status = await job_queue.get_status(project_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        project = {"id": project_id, **status}
     
-    return projects_db[project_id]
+    if format == "json":
+        return FastJSONResponse(project)
+    quantities = project.pop("quantities", None) or {}
+    if format == "csv":
+        return responses.stream(
+            format, _quantity_rows(quantities), QUANTITY_ROW_COLUMNS, filename=f"{project_id}_quantities.csv"
+        )
+    return responses.stream(format, itertools.chain((project,), _quantity_rows(quantities)))
 
 @app.get("/projects/{project_id}/quantities")
-async def get_quantities(project_id: str):
-    """Get project quantities"""
-    if project_id not in projects_db:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    project = projects_db[project_id]
-    return {
+async def get_quantities(project_id: str, format: str = "json"):
+    """Get project quantities
+
+    ``format=ndjson`` and ``format=csv`` stream one row per element type;
+    the totals are in the JSON form's ``summary``.
+    """
+    _check_format(format)
+    project = await _get_processed_project(project_id)
+    if format != "json":
+        return responses.stream(
+            format, _quantity_rows(project["quantities"]), QUANTITY_ROW_COLUMNS,
+            filename=f"{project_id}_quantities.csv"
+        )
+    return FastJSONResponse({
         "project_id": project_id,
         "quantities": project["quantities"],
         "summary": project["summary"]
+    })
+
+@functools.lru_cache(maxsize=8)
+def _load_quantity_index(path: str) -> QuantityIndex:
+    return QuantityIndex.load(Path(path))
+
+@app.get("/projects/{project_id}/elements/{global_id}/quantities")
+async def get_element_quantities(project_id: str, global_id: str):
+    """Get the indexed quantities of one element"""
+    project = await _get_processed_project(project_id, include_quantities=False)
+    
+    index_path = _quantity_index_path(project["file_hash"])
+    if not index_path.exists():
+        raise HTTPException(status_code=404, detail="Quantity index not available for this project")
+    
+    index = await asyncio.to_thread(_load_quantity_index, str(index_path))
+    quantities = index.get(global_id)
+    if quantities is None:
+        raise HTTPException(status_code=404, detail="No quantities recorded for this element")
+    
+    return {
+        "project_id": project_id,
+        "global_id": global_id,
+        "quantities": quantities
+    }
+
+def _takeoff_records(table: TakeoffTable, rows: np.ndarray, columns: List[str]):
+    for chunk in table.iter_rows(rows, columns):
+        for row in chunk:
+            yield dict(zip(columns, row))
+
+@app.get("/projects/{project_id}/elements")
+async def list_elements(
+    project_id: str,
+    request: Request,
+    format: str = "json",
+    columns: Optional[str] = None,
+    ifc_class: Optional[List[str]] = Query(None),
+    category: Optional[List[str]] = Query(None),
+    building: Optional[List[str]] = Query(None),
+    storey: Optional[List[str]] = Query(None),
+    space: Optional[List[str]] = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """Per-element takeoff of a project
+
+    ``columns`` (comma-separated) picks the fields returned; ``ifc_class``,
+    ``category``, ``building``, ``storey`` and ``space`` filter rows and may
+    be repeated to match any of several values; locations match by GlobalId
+    or by name. ``format=json`` returns one page (``limit``, at most
+    ELEMENT_PAGE_MAX rows) with the offset of the next one; ``ndjson`` and
+    ``csv`` stream every matching row, inflating the compressed table a
+    block at a time.
+    """
+    _check_format(format)
+    selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else list(TAKEOFF_COLUMNS)
+    unknown = [c for c in selected if c not in TAKEOFF_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown columns: {', '.join(unknown)}; available: {', '.join(TAKEOFF_COLUMNS)}"
+        )
+    if format == "json":
+        limit = limit or ELEMENT_PAGE_DEFAULT
+        if limit > ELEMENT_PAGE_MAX:
+            raise HTTPException(
+                status_code=400,
+                detail=f"limit is at most {ELEMENT_PAGE_MAX} for JSON; use format=ndjson or csv for larger exports"
+            )
+    
+    project = await _get_processed_project(project_id, include_quantities=False)
+    table = TakeoffTable(await _ensure_takeoff(project, _client_id(request)))
+    filters = {
+        name: values
+        for name, values in (
+            ("ifc_class", ifc_class), ("category", category), ("building", building), ("storey", storey), ("space", space)
+        )
+        if values
+    }
+    matching = await asyncio.to_thread(table.select, filters)
+    rows = matching[offset:offset + limit if limit else None]
+    headers = {
+        "X-Total-Count": str(len(matching)),
+        "X-Cost-Database-Version": str(table.meta.get("cost_database_version", ""))
+    }
+    
+    if format != "json":
+        return responses.stream(
+            format, _takeoff_records(table, rows, selected), selected,
+            filename=f"{project_id}_elements.csv", headers=headers
+        )
+    
+    elements = list(_takeoff_records(table, rows, selected))
+    next_offset = offset + len(rows)
+    return FastJSONResponse(content={
+        "project_id": project_id,
+        "total": len(matching),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset if next_offset < len(matching) else None,
+        "elements": elements
+    }, headers=headers)
+
+@functools.lru_cache(maxsize=32)
+def _load_spatial_index(path: str, mtime_ns: int) -> SpatialIndex:
+    # Keyed by mtime too: a re-parse against new rates rewrites the file in place
+    return SpatialIndex.load(Path(path))
+
+@app.get("/projects/{project_id}/spatial")
+async def get_spatial_breakdown(
+    project_id: str,
+    request: Request,
+    level: str = "storey",
+    name: Optional[str] = None,
+    id: Optional[str] = None,
+    format: str = "json"
+):
+    """Quantities and costs per building, storey, space or zone
+
+    Served from the spatial index built when the model was processed.
+    Groups are keyed by the location's GlobalId and carry its ``name``.
+    ``id`` returns a single group and ``name`` the groups with that name.
+    ``format=ndjson`` and ``format=csv`` give one row per group and cost
+    category.
+    """
+    _check_format(format)
+    if level not in SPATIAL_LEVELS:
+        raise HTTPException(status_code=400, detail=f"level must be one of: {', '.join(SPATIAL_LEVELS)}")
+    project = await _get_processed_project(project_id, include_quantities=False)
+    await _ensure_takeoff(project, _client_id(request))
+    index_path = _spatial_index_path(project["file_hash"])
+    index = await asyncio.to_thread(_load_spatial_index, str(index_path), index_path.stat().st_mtime_ns)
+    groups = index.find(level, name, id)
+    if id is not None and not groups:
+        raise HTTPException(status_code=404, detail=f"No {level} with id '{id}' in this project")
+    if name is not None and not groups:
+        raise HTTPException(status_code=404, detail=f"No {level} named '{name}' in this project")
+    headers = {"X-Cost-Database-Version": str(index.meta.get("cost_database_version", ""))}
+    
+    if format != "json":
+        return responses.stream(
+            format, index.rows(level, name, id), SPATIAL_ROW_COLUMNS,
+            filename=f"{project_id}_{level}.csv", headers=headers
+        )
+    return FastJSONResponse({
+        "project_id": project_id,
+        "level": level,
+        "groups": groups,
+        "unassigned": index.unassigned.get(level)
+    }, headers=headers)
+
+def _element_details(model, global_id: str) -> Optional[Dict]:
+    try:
+        element = model.by_guid(global_id)
+    except RuntimeError:
+        return None
+    element_type = ifcopenshell.util.element.get_type(element)
+    container = ifcopenshell.util.element.get_container(element)
+    return {
+        "global_id": global_id,
+        "ifc_class": element.is_a(),
+        "name": element.Name,
+        "object_type": getattr(element, "ObjectType", None),
+        "type": {"ifc_class": element_type.is_a(), "name": element_type.Name} if element_type else None,
+        "container": {
+            "global_id": container.GlobalId,
+            "ifc_class": container.is_a(),
+            "name": container.Name
+        } if container else None,
+        "property_sets": ifcopenshell.util.element.get_psets(element, psets_only=True),
+        "quantity_sets": ifcopenshell.util.element.get_psets(element, qtos_only=True)
+    }
+
+@app.get("/projects/{project_id}/elements/{global_id}")
+async def get_element(project_id: str, global_id: str):
+    """Get an element's class, type, container and property sets
+
+    Answered from the opened-model cache; the model is opened on first use
+    if it was not kept after its upload.
+    """
+    project = await _get_processed_project(project_id, include_quantities=False)
+    file_path = Path(project["file_path"])
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="The project's IFC file is no longer available")
+    
+    try:
+        element = await model_cache.run(project_id, file_path, _element_details, global_id)
+    except AdmissionError as e:
+        raise _admission_http_error(e)
+    if element is None:
+        raise HTTPException(status_code=404, detail="Element not found")
+    return {"project_id": project_id, **element}
+
+@app.post("/projects/{project_id}/revisions", openapi_extra=_IFC_UPLOAD_BODY)
+async def upload_revision(project_id: str, request: Request):
+    """Upload a new revision of a processed project's model
+
+    Elements are matched to the previous revision by GlobalId and compared on
+    their cost-relevant attributes (category, area, length), measured the
+    same way for both revisions; costs are recomputed only for added,
+    changed and removed elements, and with geometry fallback only changed
+    shapes are measured again. The response reports those elements and the
+    resulting cost delta, and the project is updated to the new revision.
+    """
+    project = await _get_processed_project(project_id, include_quantities=False)
+    # The middleware already holds this request's client slot
+    await _ensure_element_table(project, None)
+    
+    try:
+        filename, stored = await _receive_ifc(request, f"{project_id}_r{project.get('revision', 1) + 1}")
+        file_path = stored.path
+        summary = await _prescan_upload(file_path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except prescan.PrescanError as e:
+        raise _prescan_rejection(e)
+    metrics.UPLOAD_BYTES.observe(stored.size)
+    
+    if stored.sha256 == project["file_hash"]:
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=409, detail="The uploaded file is identical to the current revision")
+    
+    # A model that was parsed before already has its element table. Otherwise
+    # it is parsed like the previous revision was: in full when that one was
+    # measured from geometry
+    table_path = _element_table_path(stored.sha256)
+    streaming = not (GEOMETRY_FALLBACK or "geometry" in project)
+    cost = _parse_memory_estimate(stored.size, summary, streaming) if not table_path.exists() else 0
+    try:
+        async with admission.reserve(cost):
+            revision = await _pool_for(summary).run(
+                _revision_job,
+                str(_element_table_path(project["file_hash"])),
+                str(table_path),
+                project["project_name"],
+                str(file_path),
+                str(_quantity_index_path(stored.sha256)),
+                str(_takeoff_path(stored.sha256)),
+                str(_spatial_index_path(stored.sha256))
+            )
+    except PoolSaturatedError as e:
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except AdmissionError as e:
+        file_path.unlink(missing_ok=True)
+        raise _admission_http_error(e)
+    except Exception as e:
+        file_path.unlink(missing_ok=True)
+        logger.error(f"Error processing revision of {project_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    result = revision["result"]
+    number = project.get("revision", 1) + 1
+    history = project.get("revisions") or [{
+        "revision": 1,
+        "file_hash": project["file_hash"],
+        "uploaded_at": project.get("uploaded_at"),
+        "total_cost": project["summary"]["total_cost"]
+    }]
+    uploaded_at = datetime.now().isoformat()
+    await asyncio.to_thread(project_store.update, project_id, {
+        **result,
+        "filename": filename,
+        "file_path": str(file_path),
+        "file_size": stored.size,
+        "file_hash": stored.sha256,
+        "prescan": summary,
+        "revision": number,
+        "revisions": history + [{
+            "revision": number,
+            "file_hash": stored.sha256,
+            "uploaded_at": uploaded_at,
+            "total_cost": result["summary"]["total_cost"]
+        }]
+    })
+    _warm_model(project_id, file_path)
+    # A model parsed before has its own result cached already; a geometry
+    # measured one has no cache key of its own unless geometry fallback is on
+    if revision["parsed"] and (GEOMETRY_FALLBACK or not revision["geometry_fallback"]):
+        await asyncio.to_thread(
+            parse_cache.put,
+            _result_cache_key(stored.sha256, result["cost_database_version"], streamed=not revision["geometry_fallback"]),
+            result
+        )
+    
+    diff = revision["diff"]
+    logger.info(
+        f"Revision {number} of {project_id}: {len(diff['added'])} added, "
+        f"{len(diff['changed'])} changed, {len(diff['removed'])} removed"
+    )
+    return {
+        "project_id": project_id,
+        "revision": number,
+        "previous_file_hash": project["file_hash"],
+        "file_hash": stored.sha256,
+        "diff": {
+            "added": len(diff["added"]),
+            "changed": len(diff["changed"]),
+            "removed": len(diff["removed"]),
+            "unchanged": diff["unchanged"]
+        },
+        "elements": {
+            kind: diff[kind][:REVISION_DIFF_SAMPLE] for kind in ("added", "changed", "removed")
+        },
+        "cost_delta": revision["cost_delta"],
+        "summary": result["summary"],
+        "previous_summary": project["summary"]
     }
 
 @app.post("/projects/{project_id}/estimate")
 async def generate_estimate(project_id: str):
     """Generate cost estimate"""
-    if project_id not in projects_db:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    project = projects_db[project_id]
+    project = await _get_processed_project(project_id, include_quantities=False)
     
-    # Add markup and overhead
+    # Add markup and overhead (15% overhead, 10% profit)
     base_cost = project["summary"]["total_cost"]
-    overhead = base_cost * 0.15  # 15% overhead
-    profit = base_cost * 0.10    # 10% profit
-    final_cost = base_cost + overhead + profit
+    markup = cost_engine.apply_markup(np.array([base_cost]))
     
     estimate = {
         "project_id": project_id,
         "base_cost": base_cost,
-        "overhead": round(overhead, 2),
-        "profit": round(profit, 2),
-        "final_cost": round(final_cost, 2),
+        "overhead": float(markup["overhead"][0]),
+        "profit": float(markup["profit"][0]),
+        "final_cost": float(markup["final_cost"][0]),
         "generated_at": datetime.now().isoformat()
     }
     
     # Update project with estimate
-    projects_db[project_id]["estimate"] = estimate
+    await asyncio.to_thread(project_store.update, project_id, {"estimate": estimate})
     
     return estimate
 
 @app.get("/projects/{project_id}/report")
-async def download_report(project_id: str):
-    """Download PDF report"""
-    if project_id not in projects_db:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    project = projects_db[project_id]
-    
-    # Generate PDF report
-    report_path = bim_processor.generate_pdf_report(project_id, project)
+async def download_report(project_id: str, if_none_match: Optional[str] = Header(None)):
+    """Download PDF report
+
+    Reports are rendered once per distinct project data and served with an
+    ETag; a matching If-None-Match gets 304 Not Modified.
+    """
+    project = await _get_processed_project(project_id)
     
-    if not report_path.exists():
+    try:
+        report_path, digest = await report_cache.get(project_id, project)
+    except Exception as e:
+        logger.error(f"Error generating report for {project_id}: {e}")
         raise HTTPException(status_code=500, detail="Error generating report")
     
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    is_pdf = report_path.suffix == ".pdf"
     return FileResponse(
         path=report_path,
-        filename=f"{project['project_name']}_report.pdf",
-        media_type="application/pdf"
+        filename=f"{project['project_name']}_report{report_path.suffix}",
+        media_type="application/pdf" if is_pdf else "text/plain",
+        headers=headers
+    )
+
+@app.get("/projects/{project_id}/profile")
+async def download_profile(project_id: str, format: str = "folded"):
+    """Download the profile captured while the project's upload was parsed
+
+    ``format=folded`` (default) returns the sampled stacks in collapsed form
+    for ``flamegraph.pl`` or speedscope; ``format=text`` returns a report
+    sorted by cumulative time. The summary is part of the project under
+    ``profile``.
+    """
+    if format not in ("folded", "text"):
+        raise HTTPException(status_code=400, detail="format must be 'folded' or 'text'")
+    if await asyncio.to_thread(project_store.get, project_id, include_quantities=False) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    profile_path = _profile_path(project_id)
+    if not profile_path.exists():
+        raise HTTPException(status_code=404, detail="No profile was captured for this project")
+    
+    if format == "text":
+        return PlainTextResponse(await asyncio.to_thread(profiling.render_text, profile_path))
+    return FileResponse(
+        path=profile_path,
+        filename=f"{project_id}.folded",
+        media_type="text/plain"
     )
 
 @app.get("/projects")
-async def list_projects():
-    """List all projects"""
+async def list_projects(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: str = "uploaded_at",
+    order: str = "asc",
+    project_name: Optional[str] = None,
+    status: Optional[str] = None,
+    uploaded_from: Optional[str] = None,
+    uploaded_to: Optional[str] = None,
+    min_cost: Optional[float] = None,
+    max_cost: Optional[float] = None,
+    fields: Optional[str] = None,
+    format: str = "json"
+):
+    """List projects, one page at a time
+
+    Pass the returned ``next_cursor`` as ``cursor`` to fetch the next page.
+    ``project_name`` matches case-insensitively anywhere in the name,
+    ``uploaded_from``/``uploaded_to`` take ISO timestamps, and ``fields`` is a
+    comma-separated subset of the list-view columns.
+
+    ``format=ndjson`` and ``format=csv`` stream every matching project from
+    ``cursor`` on instead of one page; ``limit`` is then the number of rows
+    read from the store at a time.
+    """
+    _check_format(format)
+    query = ProjectQuery(
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        order=order,
+        project_name=project_name,
+        status=status,
+        uploaded_from=uploaded_from,
+        uploaded_to=uploaded_to,
+        min_cost=min_cost,
+        max_cost=max_cost,
+        fields=tuple(f.strip() for f in fields.split(",") if f.strip()) if fields else DEFAULT_LIST_FIELDS
+    )
+    try:
+        projects, next_cursor = await asyncio.to_thread(project_store.list_projects, query)
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if format != "json":
+        return responses.stream(
+            format, _remaining_projects(query, projects, next_cursor), query.fields, filename="projects.csv"
+        )
+    return FastJSONResponse({
+        "projects": projects,
+        "next_cursor": next_cursor,
+        "limit": limit
+    })
+
+def _remaining_projects(query: ProjectQuery, projects: List[Dict], next_cursor: Optional[str]):
+    """The first page's projects, then every later page's"""
+    while True:
+        yield from projects
+        if not next_cursor:
+            return
+        query.cursor = next_cursor
+        projects, next_cursor = project_store.list_projects(query)
+
+class FederationRequest(BaseModel):
+    name: Optional[str] = None
+    project_ids: List[str]
+
+# federation id -> running merge, least recently used first. Each holds its
+# members' element tables; an evicted merge is rebuilt from them on demand.
+_federations: "OrderedDict[str, Federation]" = OrderedDict()
+
+def _federation_state(federation_id: str) -> Federation:
+    federation = _federations.get(federation_id)
+    if federation is None:
+        federation = _federations[federation_id] = Federation()
+        while len(_federations) > FEDERATION_CACHE_ENTRIES:
+            _federations.popitem(last=False)
+    else:
+        _federations.move_to_end(federation_id)
+    return federation
+
+def _federation_path(federation_id: str) -> Path:
+    return FEDERATIONS_DIR / f"{Path(federation_id).name}.json"
+
+def _load_federation(federation_id: str) -> Dict:
+    try:
+        with open(_federation_path(federation_id), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Federation not found")
+
+def _save_federation(definition: Dict) -> None:
+    path = _federation_path(definition["id"])
+    with atomic_write(path) as f:
+        json.dump(definition, f)
+
+async def _backfill_parse(client: Optional[str], file_path: Path, *outputs: Optional[str]) -> None:
+    """Re-parse a stored model to write the derived files in ``outputs``
+
+    Admitted like an upload: the parse takes one of ``client``'s request
+    slots (``None`` when the calling request already holds one) and
+    reserves its memory, answering 429 or 503 with Retry-After if refused.
+    """
+    streaming = _use_streaming_parser(file_path, None)
+    cost = _parse_memory_estimate(file_path.stat().st_size, None, streaming)
+    try:
+        with admission.client(client) if client is not None else nullcontext():
+            async with admission.reserve(cost):
+                await parse_pool.run(_parse_ifc_job, str(file_path), None, streaming, *outputs)
+    except AdmissionError as e:
+        raise _admission_http_error(e)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+async def _ensure_element_table(project: Dict, client: Optional[str]) -> None:
+    """Backfill the element table of a project parsed before tables existed
+
+    ``client`` is passed to ``_backfill_parse``.
+    """
+    table_path = _element_table_path(project["file_hash"])
+    if table_path.exists():
+        return
+    file_path = Path(project.get("file_path") or "")
+    if not file_path.is_file():
+        raise HTTPException(
+            status_code=409,
+            detail=f"Element data for project {project['id']} is not available; upload the model again"
+        )
+    logger.info(f"Building element table for project {project['id']}")
+    await _backfill_parse(client, file_path, str(table_path))
+
+async def _ensure_takeoff(project: Dict, client: Optional[str]) -> Path:
+    """Path of the project's takeoff table, backfilled with its spatial index
+    for projects parsed before either existed (see ``_backfill_parse`` for
+    ``client``)"""
+    takeoff_path = _takeoff_path(project["file_hash"])
+    spatial_index_path = _spatial_index_path(project["file_hash"])
+    if takeoff_path.exists() and spatial_index_path.exists():
+        return takeoff_path
+    file_path = Path(project.get("file_path") or "")
+    if not file_path.is_file():
+        raise HTTPException(
+            status_code=409,
+            detail=f"Element data for project {project['id']} is not available; upload the model again"
+        )
+    logger.info(f"Building takeoff table for project {project['id']}")
+    await _backfill_parse(client, file_path, None, None, str(takeoff_path), str(spatial_index_path))
+    return takeoff_path
+
+async def _federation_takeoff(definition: Dict, client: str) -> Dict:
+    """Merge the members' element tables, re-reading only changed members"""
+    bim_processor.refresh_catalogue()
+    projects = [
+        await _get_processed_project(project_id, include_quantities=False)
+        for project_id in definition["project_ids"]
+    ]
+    for project in projects:
+        await _ensure_element_table(project, client)
+    
+    federation = _federation_state(definition["id"])
+    sync = await asyncio.to_thread(
+        federation.sync,
+        [(project["id"], project["file_hash"]) for project in projects],
+        lambda project_id, file_hash: ElementTable.load(_element_table_path(file_hash))
+    )
+    result = bim_processor._build_result(definition["name"], federation.category_totals())
     return {
-        "projects": [
-            {
-                "id": p["id"],
-                "filename": p["filename"],
-                "project_name": p["project_name"],
-                "uploaded_at": p["uploaded_at"],
-                "total_cost": p["summary"]["total_cost"]
-            }
-            for p in projects_db.values()
-        ]
+        "id": definition["id"],
+        "name": definition["name"],
+        "project_ids": definition["project_ids"],
+        "created_at": definition["created_at"],
+        "updated_at": definition["updated_at"],
+        "quantities": result["quantities"],
+        "summary": result["summary"],
+        "federation": {**federation.stats(), **sync}
+    }
+
+async def _federation_definition(federation_id: str, request: FederationRequest, created_at: str) -> Dict:
+    project_ids = list(dict.fromkeys(request.project_ids))
+    if not project_ids:
+        raise HTTPException(status_code=400, detail="A federation needs at least one project")
+    for project_id in project_ids:
+        await _get_processed_project(project_id, include_quantities=False)
+    return {
+        "id": federation_id,
+        "name": request.name or "Federated model",
+        "project_ids": project_ids,
+        "created_at": created_at,
+        "updated_at": datetime.now().isoformat()
     }
 
+@app.post("/federations")
+async def create_federation(request: FederationRequest, http_request: Request):
+    """Combine processed projects into one takeoff
+
+    Quantities come from the projects' stored element tables, so no IFC file
+    is re-parsed; elements present in several models (same GlobalId) are
+    counted once.
+    """
+    definition = await _federation_definition(str(uuid.uuid4()), request, datetime.now().isoformat())
+    takeoff = await _federation_takeoff(definition, _client_id(http_request))
+    _save_federation(definition)
+    return takeoff
+
+@app.get("/federations/{federation_id}")
+async def get_federation(federation_id: str, request: Request):
+    """Get the merged takeoff, updated for members that changed since the last call"""
+    return await _federation_takeoff(_load_federation(federation_id), _client_id(request))
+
+@app.put("/federations/{federation_id}")
+async def update_federation(federation_id: str, request: FederationRequest, http_request: Request):
+    """Replace the member list; only added or removed members are re-merged"""
+    current = _load_federation(federation_id)
+    if request.name is None:
+        request.name = current["name"]
+    definition = await _federation_definition(federation_id, request, current["created_at"])
+    takeoff = await _federation_takeoff(definition, _client_id(http_request))
+    _save_federation(definition)
+    return takeoff
+
+@app.delete("/federations/{federation_id}")
+async def delete_federation(federation_id: str):
+    """Delete a federation; member projects are not affected"""
+    _load_federation(federation_id)
+    _federation_path(federation_id).unlink(missing_ok=True)
+    _federations.pop(federation_id, None)
+    return {"success": True, "id": federation_id}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
\ No newline at end of file
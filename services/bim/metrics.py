@@ -0,0 +1,281 @@
+"""Prometheus metrics for the BIM service.
+
+A small in-process registry rendered in the Prometheus text exposition
+format by ``GET /metrics``. Recording a sample is a dict lookup and a few
+additions under a lock, cheap enough to leave on for every request.
+
+Parsing and report rendering run in worker processes, whose samples would be
+lost with the process. ``run_captured`` is what the worker pool actually
+executes: it buffers the samples recorded while the job runs and returns
+them with the job's result, and the pool replays them into the API process's
+registry. Metrics are therefore per API process; scrape each replica.
+
+Values that other components already track (queue depth, cache statistics,
+worker counts) are not duplicated here; the endpoint reads them when scraped
+and passes them to ``Registry.render`` as ``Family`` tuples.
+"""
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Seconds, from cache-hit fast paths to multi-minute parses of large models
+DURATION_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0
+)
+# 64 KiB .. 4 GiB in powers of four
+BYTES_BUCKETS = tuple(float(4 ** power * 1024) for power in range(3, 12))
+# 100 .. 100 million entities
+COUNT_BUCKETS = tuple(float(10 ** power) for power in range(2, 9))
+
+LabelValues = Tuple[str, ...]
+
+# Samples buffered while a worker-process job runs (see run_captured)
+_captured: Optional[List[Tuple[str, str, LabelValues, float]]] = None
+
+
+class Family(NamedTuple):
+    """A metric read from another component at scrape time"""
+    name: str
+    kind: str
+    documentation: str
+    samples: List[Tuple[Dict[str, str], float]]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _label_values(self, labels: Dict[str, Any]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def _record(self, values: LabelValues, amount: float) -> None:
+        ...
+
+    def _apply(self, amount: float, labels: Dict[str, Any]) -> None:
+        values = self._label_values(labels)
+        if _captured is not None:
+            _captured.append((self.kind, self.name, values, amount))
+        else:
+            self._record(values, amount)
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        ...
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        self._apply(amount, labels)
+
+    def _record(self, values: LabelValues, amount: float) -> None:
+        with self._lock:
+            self._values[values] = self._values.get(values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(dict(zip(self.labelnames, label_values)))} {_format_value(value)}"
+            for label_values, value in values.items()
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DURATION_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        self._apply(value, labels)
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the ``with`` block (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _record(self, values: LabelValues, amount: float) -> None:
+        index = bisect.bisect_left(self.buckets, amount)
+        with self._lock:
+            state = self._values.get(values)
+            if state is None:
+                state = self._values[values] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {label_values: (list(counts), total) for label_values, (counts, total) in self._values.items()}
+        lines = []
+        for label_values, (counts, total) in values.items():
+            labels = dict(zip(self.labelnames, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def replay(self, samples: List[Tuple[str, str, LabelValues, float]]) -> None:
+        """Record samples captured in a worker process"""
+        for kind, name, values, amount in samples:
+            metric = self._metrics.get(name)
+            if metric is not None and metric.kind == kind:
+                metric._record(values, amount)
+
+    def render(self, families: Sequence[Family] = ()) -> str:
+        """Text exposition of every registered metric followed by ``families``"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for family in families:
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            lines.extend(
+                f"{family.name}{_format_labels(labels)} {_format_value(value)}"
+                for labels, value in family.samples
+            )
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Content type of the text exposition format (the response adds the charset)
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def run_captured(fn: Callable[..., Any], *args: Any) -> Tuple[Any, List]:
+    """Run ``fn(*args)`` in a worker process and return its result with the samples it recorded
+
+    When ``fn`` raises, the samples travel back on the exception (see
+    ``raised_samples``).
+    """
+    global _captured
+    _captured = samples = []
+    try:
+        return fn(*args), samples
+    except Exception as e:
+        e._metrics_samples = samples
+        raise
+    finally:
+        _captured = None
+
+
+def raised_samples(error: BaseException) -> List:
+    """Samples recorded by a worker-process job that raised ``error``"""
+    return getattr(error, "_metrics_samples", [])
+
+
+# Service metrics, defined here so worker processes know them too
+STAGE_SECONDS = Histogram(
+    "bim_stage_seconds",
+    "Time spent in each stage of uploads, parses and report rendering",
+    ("operation", "stage"),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "bim_http_request_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status"),
+)
+UPLOAD_BYTES = Histogram(
+    "bim_upload_bytes",
+    "Size of uploaded IFC files",
+    buckets=BYTES_BUCKETS,
+)
+MODEL_ENTITIES = Histogram(
+    "bim_model_entities",
+    "Number of entity instances in parsed models (full parser only)",
+    buckets=COUNT_BUCKETS,
+)
+MODEL_ELEMENTS = Histogram(
+    "bim_model_elements",
+    "Number of priced elements in parsed models",
+    ("parser",),
+    buckets=COUNT_BUCKETS,
+)
+PARSES = Counter(
+    "bim_parses_total",
+    "Parses run by the workers, by parser and outcome",
+    ("parser", "outcome"),
+)
+ADMISSION_REJECTIONS = Counter(
+    "bim_admission_rejections_total",
+    "Parse requests turned away by admission control, by reason",
+    ("reason",),
+)
+PRESCANS = Counter(
+    "bim_prescans_total",
+    "Upload pre-scans by result: accepted, or the rejection reason",
+    ("result",),
+)
+PRESCAN_ENTITIES = Histogram(
+    "bim_prescan_entities",
+    "Estimated entity count of accepted uploads, by schema",
+    ("schema",),
+    buckets=COUNT_BUCKETS,
+)
+
+
+def stage(operation: str, name: str):
+    """Time one stage: ``with stage("parse", "open"): ...``"""
+    return STAGE_SECONDS.time(operation=operation, stage=name)
@@ -0,0 +1,174 @@
+"""Cache of opened IFC models for follow-up queries.
+
+Uploads are parsed in worker processes, which keep nothing: any query that
+needs the model itself (element details, spatial breakdowns) would have to
+``ifcopenshell.open`` the file again. ``ModelCache`` keeps recently used
+models open in the API process, keyed by project id.
+
+* Memory is bounded by an estimate of each model's footprint (file size
+  times ``memory_factor``; ifcopenshell needs roughly 9-10x the STEP text).
+  Least recently used models are evicted once the budget is exceeded.
+* Models are pinned while a query uses them and never evicted while
+  pinned, so the budget can be exceeded temporarily under load. A model
+  larger than the whole budget is opened, used and dropped.
+* Opening a model is itself a parse: ``reserve(estimated_bytes)`` is held
+  around it, so opens share the service's parse memory budget. Once open,
+  a model counts in ``loaded_bytes`` instead.
+* ``ifcopenshell.open`` releases the GIL, so models are opened in a thread
+  without stalling the event loop. Concurrent requests for a model that is
+  being opened wait for the same open.
+* Queries on one model are serialised; ifcopenshell files are not safe for
+  concurrent use.
+
+``warm`` opens a model in the background right after its upload has been
+processed, so follow-up queries skip the parse entirely.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, AsyncContextManager, Callable, Dict, Set
+
+import ifcopenshell
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    def __init__(self, file_path: Path, estimated_bytes: int):
+        self.file_path = file_path
+        self.estimated_bytes = estimated_bytes
+        self.model = None
+        self.pins = 0
+        self.loaded: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.lock = asyncio.Lock()
+
+
+class ModelCache:
+    def __init__(
+        self,
+        max_bytes: int,
+        memory_factor: float = 10.0,
+        opener: Callable[[str], Any] = ifcopenshell.open,
+        reserve: Callable[[int], AsyncContextManager] = lambda cost: nullcontext(),
+    ):
+        self.max_bytes = max_bytes
+        self.memory_factor = memory_factor
+        self.opener = opener
+        self.reserve = reserve
+        # project id -> entry, least recently used first
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._warming: Set[asyncio.Task] = set()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "open_seconds": 0.0}
+
+    def estimate_bytes(self, file_path: Path) -> int:
+        return int(file_path.stat().st_size * self.memory_factor)
+
+    @property
+    def cached_bytes(self) -> int:
+        return sum(entry.estimated_bytes for entry in self._entries.values())
+
+    @property
+    def loaded_bytes(self) -> int:
+        """Estimated footprint of the models already open"""
+        return sum(entry.estimated_bytes for entry in self._entries.values() if entry.loaded.done())
+
+    async def run(self, key: str, file_path: Path, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(model, *args)`` in a thread on the opened model for ``key``"""
+        entry = await self._pin(key, Path(file_path))
+        try:
+            async with entry.lock:
+                return await asyncio.to_thread(fn, entry.model, *args)
+        finally:
+            entry.pins -= 1
+            self._evict()
+
+    async def _pin(self, key: str, file_path: Path) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is not None and entry.file_path != file_path:
+            # The project moved on to a new revision
+            self.discard(key)
+            entry = None
+
+        if entry is not None:
+            self._stats["hits"] += 1
+            self._entries.move_to_end(key)
+            entry.pins += 1
+            try:
+                await asyncio.shield(entry.loaded)
+            except BaseException:
+                entry.pins -= 1
+                raise
+            return entry
+
+        self._stats["misses"] += 1
+        entry = _Entry(file_path, self.estimate_bytes(file_path))
+        entry.pins += 1
+        self._entries[key] = entry
+        started = time.perf_counter()
+        try:
+            async with self.reserve(entry.estimated_bytes):
+                entry.model = await asyncio.to_thread(self.opener, str(file_path))
+        except BaseException as e:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+            entry.pins -= 1
+            entry.loaded.set_exception(e)
+            # Waiters receive the exception; avoid "never retrieved" warnings
+            entry.loaded.exception()
+            raise
+        self._stats["open_seconds"] += time.perf_counter() - started
+        entry.loaded.set_result(None)
+        self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        total = self.cached_bytes
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.pins > 0 or not entry.loaded.done():
+                continue
+            del self._entries[key]
+            total -= entry.estimated_bytes
+            self._stats["evictions"] += 1
+
+    def discard(self, key: str) -> None:
+        """Forget ``key``; queries still using its model finish normally"""
+        self._entries.pop(key, None)
+
+    def warm(self, key: str, file_path: Path) -> None:
+        """Open the model in the background if it fits the budget"""
+        file_path = Path(file_path)
+        if key in self._entries or self.estimate_bytes(file_path) > self.max_bytes:
+            return
+
+        async def open_model():
+            try:
+                await self.run(key, file_path, lambda model: None)
+            except Exception as e:
+                logger.warning(f"Could not open {file_path.name} for the model cache: {e}")
+
+        task = asyncio.get_running_loop().create_task(open_model())
+        self._warming.add(task)
+        task.add_done_callback(self._warming.discard)
+
+    async def close(self) -> None:
+        tasks = list(self._warming)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            "open_seconds": round(self._stats["open_seconds"], 3),
+            "models": len(self._entries),
+            "pinned": sum(1 for entry in self._entries.values() if entry.pins > 0),
+            "estimated_bytes": self.cached_bytes,
+            "max_bytes": self.max_bytes,
+        }
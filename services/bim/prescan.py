@@ -0,0 +1,165 @@
+"""Fast structural checks of an uploaded IFC file before it is parsed.
+
+``ifcopenshell.open`` on a corrupt, truncated or unsupported file fails only
+after doing most of the work of a parse, in a worker the healthy uploads
+are waiting for. The pre-scan reads what the file says about itself, plus
+a fixed number of sampled bytes, and rejects it before any parse instead:
+
+* ``check_start`` looks at the first chunk of an upload while it is being
+  received: the ISO-10303-21 signature and, when the header is complete,
+  the schema. A file that fails is not copied to disk.
+* ``prescan`` examines the stored file: HEADER section (schema, authoring
+  tool, file name and timestamp), a DATA section, and the
+  ``END-ISO-10303-21;`` terminator that a truncated upload lacks. It
+  samples a few evenly spaced windows of the DATA section to estimate the
+  entity count and the mix of entity types, and reports whether it saw
+  quantity sets (``None`` when the sample was too sparse to tell).
+
+The summary is stored on the project. Callers use the entity estimate to
+route large models to the heavy worker pool and to size admission.
+"""
+import mmap
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+from step_reader import HEADER_SCAN_BYTES, StepSyntaxError, read_header
+
+SIGNATURE = b"ISO-10303-21;"
+# Whitespace and a UTF-8 byte order mark may precede the signature
+_LEADING = b"\xef\xbb\xbf \t\r\n"
+_TERMINATOR = b"END-ISO-10303-21;"
+_DATA_SECTION = re.compile(rb"\bDATA\s*(\([^;]*\))?\s*;")
+_RECORD = re.compile(rb";\s*#\d+\s*=\s*([A-Za-z0-9_]+)\s*\(")
+
+# Schema identifiers ifcopenshell parses, by the family reported for them
+SUPPORTED_SCHEMAS = {
+    "IFC2X3": "IFC2X3",
+    "IFC4": "IFC4",
+    "IFC4X3": "IFC4X3",
+    "IFC4X3_ADD1": "IFC4X3",
+    "IFC4X3_ADD2": "IFC4X3",
+    "IFC4X3_TC1": "IFC4X3",
+}
+
+# DATA section sampling: this many windows of this many bytes
+SAMPLE_WINDOWS = 8
+SAMPLE_WINDOW_BYTES = 64 * 1024
+# Entity types reported from the sample
+SAMPLE_TOP_TYPES = 10
+
+
+class PrescanError(ValueError):
+    """Raised for a file that is not a usable IFC model; ``reason`` is a short code."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _schema_family(identifier: str) -> str:
+    family = SUPPORTED_SCHEMAS.get(identifier.upper())
+    if family is None:
+        raise PrescanError(
+            "unsupported_schema",
+            f"Unsupported IFC schema {identifier!r}; supported: {', '.join(sorted(set(SUPPORTED_SCHEMAS.values())))}"
+        )
+    return family
+
+
+def _file_schema(header: Dict[str, list]) -> str:
+    schemas = (header.get("FILE_SCHEMA") or [None])[0]
+    if not schemas or not isinstance(schemas, list) or not isinstance(schemas[0], str):
+        raise PrescanError("missing_schema", "The STEP header does not declare a FILE_SCHEMA")
+    return schemas[0]
+
+
+def check_start(head: bytes) -> None:
+    """Reject an upload from its first bytes; tolerant of a header cut short"""
+    if not head.lstrip(_LEADING).startswith(SIGNATURE):
+        raise PrescanError("not_step", "Not an IFC-SPF file: missing the ISO-10303-21 signature")
+    try:
+        header = read_header(head)
+    except StepSyntaxError:
+        if len(head) < HEADER_SCAN_BYTES:
+            # The rest of the header may be in the next chunk; prescan decides
+            return
+        raise PrescanError("bad_header", "The STEP HEADER section is missing or malformed")
+    _schema_family(_file_schema(header))
+
+
+def prescan(file_path: Path) -> Dict:
+    """Validate ``file_path`` and summarise it; raises PrescanError"""
+    started = time.perf_counter()
+    with open(file_path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            raise PrescanError("empty", "The file is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _scan(mm, started)
+
+
+def _scan(mm: mmap.mmap, started: float) -> Dict:
+    head = mm[:HEADER_SCAN_BYTES]
+    if not head.lstrip(_LEADING).startswith(SIGNATURE):
+        raise PrescanError("not_step", "Not an IFC-SPF file: missing the ISO-10303-21 signature")
+    try:
+        header = read_header(mm)
+    except StepSyntaxError as e:
+        raise PrescanError("bad_header", f"Malformed STEP HEADER section: {e}")
+    identifier = _file_schema(header)
+    schema = _schema_family(identifier)
+
+    if _TERMINATOR not in mm[-4096:]:
+        raise PrescanError("truncated", "The file is truncated: END-ISO-10303-21 terminator not found")
+    data = _DATA_SECTION.search(mm)
+    if data is None:
+        raise PrescanError("no_data", "The file has no DATA section")
+    data_start = data.end() - 1
+    data_end = mm.rfind(b"ENDSEC", data_start)
+    data_end = data_end if data_end > 0 else len(mm)
+    data_bytes = data_end - data_start
+
+    # Record density in evenly spaced windows, extrapolated to the section
+    if data_bytes <= SAMPLE_WINDOWS * SAMPLE_WINDOW_BYTES:
+        spans = [(data_start, data_end)]
+    else:
+        step = data_bytes // SAMPLE_WINDOWS
+        spans = [
+            (data_start + i * step, data_start + i * step + SAMPLE_WINDOW_BYTES) for i in range(SAMPLE_WINDOWS)
+        ]
+    types = Counter()
+    for begin, end in spans:
+        types.update(match.group(1).upper().decode("ascii") for match in _RECORD.finditer(mm, begin, end))
+    sampled = sum(end - begin for begin, end in spans)
+    if not types:
+        raise PrescanError("no_entities", "The DATA section contains no entity records")
+    records = sum(types.values())
+    approx_entities = records if sampled >= data_bytes else int(records * data_bytes / sampled)
+
+    # Absence is only known when the whole section was sampled
+    if "IFCELEMENTQUANTITY" in types:
+        has_quantity_sets = True
+    else:
+        has_quantity_sets = False if sampled >= data_bytes else None
+
+    file_name = header.get("FILE_NAME") or []
+
+    def header_text(position: int) -> Optional[str]:
+        value = file_name[position] if len(file_name) > position else None
+        return (value or None) if isinstance(value, str) else None
+
+    return {
+        "schema": schema,
+        "schema_identifier": identifier,
+        "file_name": header_text(0),
+        "timestamp": header_text(1),
+        "preprocessor": header_text(4),
+        "authoring_tool": header_text(5),
+        "file_size": len(mm),
+        "approx_entities": approx_entities,
+        "has_quantity_sets": has_quantity_sets,
+        "sample_types": dict(types.most_common(SAMPLE_TOP_TYPES)),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
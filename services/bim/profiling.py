@@ -0,0 +1,199 @@
+"""On-demand profiling of individual uploads.
+
+A slow model can only be diagnosed with the customer's file, so the upload
+itself records the evidence. Profiling is opt-in per request (the
+``X-Profile`` header) or applied to a random fraction of uploads
+(``BIM_PROFILE_SAMPLE_RATE``). A profiled parse is sampled in its worker
+process: a background thread records the parsing thread's Python stack every
+``BIM_PROFILE_INTERVAL_MS`` and leaves two things behind:
+
+* the sampled stacks in collapsed ("folded") form beside the project's other
+  artefacts, for ``flamegraph.pl`` or speedscope;
+* a summary stored on the project: the hottest functions and the time spent
+  per IFC entity type in scanning, classification and measurement.
+
+Sampling costs the parse next to nothing, unlike a deterministic profiler
+that hooks every Python call. Each sample is weighted by the wall time since
+the previous one: ifcopenshell calls that hold the GIL delay the sampler,
+and their time is charged to the frame running when it next gets the GIL,
+normally the caller.
+
+Code outside this module reports entity timings through ``record_entity``,
+which is a no-op when no profile is being captured.
+"""
+import io
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+# Header that enables ("1", "true") or suppresses ("0", "false") profiling
+PROFILE_HEADER = "X-Profile"
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+
+# Entity types and functions kept in a profile summary
+TOP_ENTRIES = 20
+
+# Seconds between stack samples
+DEFAULT_INTERVAL = 0.005
+
+
+class ProfileSession:
+    """Timings collected while one parse is being profiled."""
+
+    def __init__(self):
+        # (entity type) -> {stage: seconds}, and instances seen per type
+        self.entity_seconds: Dict[str, Dict[str, float]] = {}
+        self.entity_counts: Dict[str, int] = {}
+        self.seconds = 0.0
+        self.functions = []
+
+    def record(self, stage: str, entity_type: str, seconds: float, count: int) -> None:
+        stages = self.entity_seconds.setdefault(entity_type, {})
+        stages[stage] = stages.get(stage, 0.0) + seconds
+        self.entity_counts[entity_type] = max(self.entity_counts.get(entity_type, 0), count)
+
+    def summary(self) -> Dict:
+        entity_types = sorted(
+            self.entity_seconds.items(), key=lambda item: sum(item[1].values()), reverse=True
+        )[:TOP_ENTRIES]
+        return {
+            "seconds": round(self.seconds, 4),
+            "entity_types": [
+                {
+                    "entity_type": entity_type,
+                    "count": self.entity_counts[entity_type],
+                    "seconds": round(sum(stages.values()), 6),
+                    "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()},
+                }
+                for entity_type, stages in entity_types
+            ],
+            "functions": self.functions,
+        }
+
+
+_session: Optional[ProfileSession] = None
+
+
+def active() -> bool:
+    """Whether a profile is being captured, for callers whose timing has a cost"""
+    return _session is not None
+
+
+def record_entity(stage: str, entity_type: str, seconds: float, count: int) -> None:
+    """Attribute ``seconds`` of ``stage`` work to ``entity_type`` in the active profile"""
+    if _session is not None:
+        _session.record(stage, entity_type, seconds, count)
+
+
+def should_profile(header_value: Optional[str], sample_rate: float) -> bool:
+    """Whether to profile a request given its X-Profile header and the sampling rate"""
+    if header_value is not None:
+        value = header_value.strip().lower()
+        if value in _TRUE:
+            return True
+        if value in _FALSE:
+            return False
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack, weighting each by elapsed wall time"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        # Stack (outermost frame first) -> sampled seconds
+        self.stacks: Dict[Tuple[str, ...], float] = {}
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        last = time.perf_counter()
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            key = tuple(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0.0) + now - last
+            last = now
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+def _function_times(stacks: Dict[Tuple[str, ...], float]):
+    self_seconds: Dict[str, float] = {}
+    total_seconds: Dict[str, float] = {}
+    samples: Dict[str, int] = {}
+    for stack, seconds in stacks.items():
+        self_seconds[stack[-1]] = self_seconds.get(stack[-1], 0.0) + seconds
+        # Recursive frames count once towards a stack's total
+        for function in set(stack):
+            total_seconds[function] = total_seconds.get(function, 0.0) + seconds
+            samples[function] = samples.get(function, 0) + 1
+    return [
+        {
+            "function": function,
+            "stacks": samples[function],
+            "self_s": round(self_seconds.get(function, 0.0), 6),
+            "cumulative_s": round(total_seconds[function], 6),
+        }
+        for function in total_seconds
+    ]
+
+
+@contextmanager
+def capture(profile_path: Path, interval: float = DEFAULT_INTERVAL) -> Iterator[ProfileSession]:
+    """Sample the ``with`` block, writing folded stacks to ``profile_path``"""
+    global _session
+    session = _session = ProfileSession()
+    sampler = _StackSampler(threading.get_ident(), interval)
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        yield session
+    finally:
+        sampler.stop()
+        _session = None
+        session.seconds = time.perf_counter() - started
+        session.functions = sorted(
+            _function_times(sampler.stacks), key=lambda entry: entry["self_s"], reverse=True
+        )[:TOP_ENTRIES]
+        profile_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = profile_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # One "outer;...;inner microseconds" line per distinct stack
+            for stack, seconds in sorted(sampler.stacks.items()):
+                f.write(f"{';'.join(stack)} {max(1, round(seconds * 1e6))}\n")
+        os.replace(tmp_path, profile_path)
+
+
+def render_text(profile_path: Path, limit: int = 60) -> str:
+    """Human-readable report of a folded profile, by cumulative time"""
+    stacks: Dict[Tuple[str, ...], float] = {}
+    with open(profile_path, encoding="utf-8") as f:
+        for line in f:
+            stack, _, microseconds = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[tuple(stack.split(";"))] = int(microseconds) / 1e6
+    functions = sorted(_function_times(stacks), key=lambda entry: entry["cumulative_s"], reverse=True)
+    out = io.StringIO()
+    out.write(f"{sum(stacks.values()):.3f} s sampled in {len(stacks)} distinct stacks\n\n")
+    out.write(f"{'cumulative_s':>12} {'self_s':>10}  function\n")
+    for entry in functions[:limit]:
+        out.write(f"{entry['cumulative_s']:>12.4f} {entry['self_s']:>10.4f}  {entry['function']}\n")
+    return out.getvalue()
@@ -0,0 +1,552 @@
+"""Project persistence for the BIM service.
+
+Project records used to live in a module-level dict, so a restart, the
+``--reload`` dev server or a second uvicorn worker lost or split them.
+``ProjectStore`` is the storage interface the API uses instead:
+
+* ``SQLiteProjectStore`` (default) - durable, shared by every worker on the
+  host through WAL mode, with the list-view fields in indexed columns and
+  the heavy ``quantities`` payload in a separate table that is only read
+  when a full record is requested.
+* ``MemoryProjectStore`` - the previous behaviour, for tests and one-off runs.
+
+Both also keep every processed project's unrounded per-type measures (count,
+area, length) as flat rows (``quantity_rows``) and write re-priced costs back
+in bulk (``update_costs``); that is what the columnar cost engine re-prices
+from.
+"""
+import base64
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Fields stored in their own columns; anything else goes to the "extra" JSON
+_COLUMNS = (
+    "id", "filename", "file_path", "file_size", "file_hash", "project_name",
+    "status", "progress", "uploaded_at", "processed_at", "total_cost", "element_count",
+)
+# Fields only present on the full record
+_LARGE_FIELDS = ("quantities",)
+# Unrounded per-type count/area/length; only read back through quantity_rows
+_MEASURES_FIELD = "measures"
+
+# Fields a listing can return; the default set matches the original /projects
+LIST_FIELDS = (
+    "id", "filename", "project_name", "uploaded_at", "processed_at", "status",
+    "total_cost", "element_count", "file_size",
+)
+DEFAULT_LIST_FIELDS = ("id", "filename", "project_name", "uploaded_at", "status", "total_cost")
+
+# Sort key -> SQL expression. Nullable columns are coalesced so keyset
+# comparisons work for queued projects; the indexes below use the same
+# expressions.
+SORT_KEYS = {
+    "uploaded_at": "uploaded_at",
+    "total_cost": "IFNULL(total_cost, -1)",
+    "project_name": "IFNULL(project_name, '')",
+}
+
+
+class InvalidQueryError(ValueError):
+    """Raised for unknown sort keys or fields and for malformed cursors."""
+
+
+@dataclass
+class ProjectQuery:
+    """Filters, ordering and page position for a project listing."""
+    limit: int = 100
+    cursor: Optional[str] = None
+    sort: str = "uploaded_at"
+    order: str = "asc"
+    project_name: Optional[str] = None
+    status: Optional[str] = None
+    uploaded_from: Optional[str] = None
+    uploaded_to: Optional[str] = None
+    min_cost: Optional[float] = None
+    max_cost: Optional[float] = None
+    fields: Tuple[str, ...] = field(default=DEFAULT_LIST_FIELDS)
+
+    def validate(self) -> None:
+        if self.sort not in SORT_KEYS:
+            raise InvalidQueryError(f"Unknown sort key '{self.sort}', expected one of {sorted(SORT_KEYS)}")
+        if self.order not in ("asc", "desc"):
+            raise InvalidQueryError("order must be 'asc' or 'desc'")
+        unknown = [f for f in self.fields if f not in LIST_FIELDS]
+        if unknown:
+            raise InvalidQueryError(f"Unknown fields {unknown}, expected a subset of {list(LIST_FIELDS)}")
+
+    def encode_cursor(self, sort_value: Any, project_id: str) -> str:
+        payload = json.dumps([self.sort, self.order, sort_value, project_id])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self) -> Optional[Tuple[Any, str]]:
+        if not self.cursor:
+            return None
+        try:
+            padded = self.cursor + "=" * (-len(self.cursor) % 4)
+            sort, order, sort_value, project_id = json.loads(base64.urlsafe_b64decode(padded))
+        except (ValueError, TypeError):
+            raise InvalidQueryError("Malformed cursor")
+        if sort != self.sort or order != self.order:
+            raise InvalidQueryError("Cursor was issued for a different sort order")
+        return sort_value, project_id
+
+
+def _sort_value(record: Dict[str, Any], sort: str) -> Any:
+    """Python equivalent of the SORT_KEYS expressions."""
+    if sort == "total_cost":
+        value = record.get("total_cost")
+        return -1 if value is None else value
+    if sort == "project_name":
+        return record.get("project_name") or ""
+    return record.get(sort)
+
+
+# (project index, element type, count, area, length)
+QuantityRow = Tuple[int, str, int, float, float]
+
+
+def _measure_rows(record: Dict[str, Any]) -> List[Tuple[str, int, float, float]]:
+    """``(element type, count, area, length)`` rows of a record.
+
+    Records written before measures were kept fall back to the rounded
+    quantities.
+    """
+    measures = record.get(_MEASURES_FIELD)
+    if measures is not None:
+        return [(t, m["count"], m["area"], m["length"]) for t, m in measures.items()]
+    return [
+        (t, q.get("count", 0), q.get("total_area", 0.0), q.get("total_length", 0.0))
+        for t, q in (record.get("quantities") or {}).items()
+    ]
+
+
+def _list_view(record: Dict[str, Any]) -> Dict[str, Any]:
+    summary = record.get("summary") or {}
+    view = {name: record.get(name) for name in LIST_FIELDS}
+    view["total_cost"] = summary.get("total_cost")
+    view["element_count"] = summary.get("element_count")
+    return view
+
+
+class ProjectStore(ABC):
+    """Storage interface for project records (plain dicts)."""
+
+    @abstractmethod
+    def create(self, record: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, project_id: str, include_quantities: bool = True) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update(self, project_id: str, fields: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, project_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def list_projects(self, query: ProjectQuery) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of list-view records and the cursor for the next page."""
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def quantity_rows(self) -> Tuple[List[str], List[QuantityRow]]:
+        """Project ids with quantities, and one row per (project, element type)."""
+
+    @abstractmethod
+    def update_costs(self, updates: List[Tuple[str, Dict[str, Any], Dict[str, Any]]], cost_version: str) -> None:
+        """Replace ``(project id, quantities, summary)`` for many projects at once.
+
+        ``cost_version`` is recorded as the projects' ``cost_database_version``.
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryProjectStore(ProjectStore):
+    def __init__(self):
+        self._projects: Dict[str, Dict[str, Any]] = {}
+
+    def create(self, record: Dict[str, Any]) -> None:
+        self._projects[record["id"]] = dict(record)
+
+    def get(self, project_id: str, include_quantities: bool = True) -> Optional[Dict[str, Any]]:
+        record = self._projects.get(project_id)
+        if record is None:
+            return None
+        record = dict(record)
+        record.pop(_MEASURES_FIELD, None)
+        if not include_quantities:
+            for name in _LARGE_FIELDS:
+                record.pop(name, None)
+        return record
+
+    def update(self, project_id: str, fields: Dict[str, Any]) -> None:
+        if project_id in self._projects:
+            self._projects[project_id].update(fields)
+
+    def delete(self, project_id: str) -> None:
+        self._projects.pop(project_id, None)
+
+    def list_projects(self, query: ProjectQuery) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        query.validate()
+        rows = [_list_view(p) for p in self._projects.values()]
+        name = query.project_name.lower() if query.project_name else None
+        rows = [
+            r for r in rows
+            if (name is None or name in (r["project_name"] or "").lower())
+            and (query.status is None or r["status"] == query.status)
+            and (query.uploaded_from is None or r["uploaded_at"] >= query.uploaded_from)
+            and (query.uploaded_to is None or r["uploaded_at"] <= query.uploaded_to)
+            and (query.min_cost is None or (r["total_cost"] is not None and r["total_cost"] >= query.min_cost))
+            and (query.max_cost is None or (r["total_cost"] is not None and r["total_cost"] <= query.max_cost))
+        ]
+        descending = query.order == "desc"
+        key = lambda r: (_sort_value(r, query.sort), r["id"])  # noqa: E731
+        rows.sort(key=key, reverse=descending)
+        after = query.decode_cursor()
+        if after is not None:
+            after = tuple(after)
+            rows = [r for r in rows if (key(r) < after if descending else key(r) > after)]
+        page = rows[:query.limit]
+        next_cursor = None
+        if len(rows) > query.limit:
+            last = page[-1]
+            next_cursor = query.encode_cursor(_sort_value(last, query.sort), last["id"])
+        return [{f: r[f] for f in query.fields} for r in page], next_cursor
+
+    def count(self) -> int:
+        return len(self._projects)
+
+    def quantity_rows(self) -> Tuple[List[str], List[QuantityRow]]:
+        project_ids, rows = [], []
+        for project_id, record in self._projects.items():
+            measures = _measure_rows(record)
+            if not measures:
+                continue
+            index = len(project_ids)
+            project_ids.append(project_id)
+            rows.extend((index, *measure) for measure in measures)
+        return project_ids, rows
+
+    def update_costs(self, updates: List[Tuple[str, Dict[str, Any], Dict[str, Any]]], cost_version: str) -> None:
+        for project_id, quantities, summary in updates:
+            self.update(project_id, {
+                "quantities": quantities, "summary": summary, "cost_database_version": cost_version,
+            })
+
+
+class SQLiteProjectStore(ProjectStore):
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS projects (
+        id TEXT PRIMARY KEY,
+        filename TEXT,
+        file_path TEXT,
+        file_size INTEGER,
+        file_hash TEXT,
+        project_name TEXT,
+        status TEXT NOT NULL,
+        progress INTEGER,
+        uploaded_at TEXT NOT NULL,
+        processed_at TEXT,
+        total_cost REAL,
+        element_count INTEGER,
+        summary TEXT,
+        extra TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_projects_uploaded_at ON projects (uploaded_at, id);
+    CREATE INDEX IF NOT EXISTS idx_projects_total_cost ON projects (IFNULL(total_cost, -1), id);
+    CREATE INDEX IF NOT EXISTS idx_projects_project_name ON projects (IFNULL(project_name, ''), id);
+    CREATE INDEX IF NOT EXISTS idx_projects_file_hash ON projects (file_hash);
+    CREATE TABLE IF NOT EXISTS project_quantities (
+        project_id TEXT PRIMARY KEY REFERENCES projects (id) ON DELETE CASCADE,
+        quantities TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS project_measures (
+        project_id TEXT NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+        element_type TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        area REAL NOT NULL,
+        length REAL NOT NULL,
+        PRIMARY KEY (project_id, element_type)
+    ) WITHOUT ROWID;
+    """
+
+    # Stored in PRAGMA user_version; 2 added project_measures
+    SCHEMA_VERSION = 2
+
+    # Backfills measures from the (rounded) quantities of older databases
+    MEASURES_INSERT = """
+    INSERT INTO project_measures (project_id, element_type, count, area, length)
+    SELECT q.project_id, j.key, IFNULL(json_extract(j.value, '$.count'), 0),
+           IFNULL(json_extract(j.value, '$.total_area'), 0.0),
+           IFNULL(json_extract(j.value, '$.total_length'), 0.0)
+    FROM project_quantities q, json_each(q.quantities) j
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        # WAL lets every uvicorn worker read while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        # Every API worker and every spawned parse worker opens the store;
+        # only the first to see an old schema version migrates it
+        if self._schema_version() < self.SCHEMA_VERSION:
+            self._migrate()
+
+    def _schema_version(self) -> int:
+        return self._conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def _migrate(self) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._schema_version()
+                if version < self.SCHEMA_VERSION:
+                    for statement in self.SCHEMA.split(";"):
+                        if statement.strip():
+                            self._conn.execute(statement)
+                    if version < 2:
+                        # Databases created before project_measures existed
+                        self._conn.execute(
+                            self.MEASURES_INSERT
+                            + " WHERE q.project_id NOT IN (SELECT project_id FROM project_measures)"
+                        )
+                    self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _split(record: Dict[str, Any]):
+        """Split a record into column values, summary, extra fields and quantities."""
+        columns = {name: record.get(name) for name in _COLUMNS if name in record}
+        summary = record.get("summary")
+        if summary is not None:
+            columns["total_cost"] = summary.get("total_cost")
+            columns["element_count"] = summary.get("element_count")
+        extra = {
+            key: value for key, value in record.items()
+            if key not in _COLUMNS and key not in _LARGE_FIELDS and key not in ("summary", _MEASURES_FIELD)
+        }
+        return columns, summary, extra, record.get("quantities")
+
+    def create(self, record: Dict[str, Any]) -> None:
+        columns, summary, extra, quantities = self._split(record)
+        columns["summary"] = json.dumps(summary) if summary is not None else None
+        columns["extra"] = json.dumps(extra)
+        names = ", ".join(columns)
+        placeholders = ", ".join("?" for _ in columns)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO projects ({names}) VALUES ({placeholders})",
+                    tuple(columns.values()),
+                )
+                if quantities is not None:
+                    self._write_quantities(record["id"], quantities, _measure_rows(record))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _write_quantities(
+        self, project_id: str, quantities: Dict[str, Any], measures: List[Tuple[str, int, float, float]]
+    ) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO project_quantities (project_id, quantities) VALUES (?, ?)",
+            (project_id, json.dumps(quantities)),
+        )
+        self._conn.execute("DELETE FROM project_measures WHERE project_id = ?", (project_id,))
+        self._conn.executemany(
+            "INSERT INTO project_measures (project_id, element_type, count, area, length) VALUES (?, ?, ?, ?, ?)",
+            ((project_id, *measure) for measure in measures),
+        )
+
+    def _row_to_record(self, row: sqlite3.Row) -> Dict[str, Any]:
+        record = {name: row[name] for name in _COLUMNS if row[name] is not None}
+        record.pop("total_cost", None)
+        record.pop("element_count", None)
+        if row["summary"] is not None:
+            record["summary"] = json.loads(row["summary"])
+        if row["extra"]:
+            record.update(json.loads(row["extra"]))
+        return record
+
+    def get(self, project_id: str, include_quantities: bool = True) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
+            if row is None:
+                return None
+            quantities = None
+            if include_quantities:
+                q_row = self._conn.execute(
+                    "SELECT quantities FROM project_quantities WHERE project_id = ?", (project_id,)
+                ).fetchone()
+                quantities = q_row["quantities"] if q_row else None
+        record = self._row_to_record(row)
+        if quantities is not None:
+            record["quantities"] = json.loads(quantities)
+        return record
+
+    def update(self, project_id: str, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT extra FROM projects WHERE id = ?", (project_id,)).fetchone()
+                if row is None:
+                    self._conn.execute("ROLLBACK")
+                    return
+                columns, summary, extra, quantities = self._split(fields)
+                columns.pop("id", None)
+                if summary is not None:
+                    columns["summary"] = json.dumps(summary)
+                if extra:
+                    merged = json.loads(row["extra"] or "{}")
+                    merged.update(extra)
+                    columns["extra"] = json.dumps(merged)
+                if columns:
+                    assignments = ", ".join(f"{name} = ?" for name in columns)
+                    self._conn.execute(
+                        f"UPDATE projects SET {assignments} WHERE id = ?",
+                        (*columns.values(), project_id),
+                    )
+                if quantities is not None:
+                    self._write_quantities(project_id, quantities, _measure_rows(fields))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, project_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+
+    def list_projects(self, query: ProjectQuery) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Keyset pagination over the (sort expression, id) indexes: each page
+        # is an index range scan, however deep into the listing it is.
+        query.validate()
+        sort_expr = SORT_KEYS[query.sort]
+        conditions, params = [], []
+        if query.project_name:
+            conditions.append("project_name LIKE ? ESCAPE '\\'")
+            escaped = query.project_name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        if query.status:
+            conditions.append("status = ?")
+            params.append(query.status)
+        if query.uploaded_from:
+            conditions.append("uploaded_at >= ?")
+            params.append(query.uploaded_from)
+        if query.uploaded_to:
+            conditions.append("uploaded_at <= ?")
+            params.append(query.uploaded_to)
+        if query.min_cost is not None:
+            conditions.append("total_cost >= ?")
+            params.append(query.min_cost)
+        if query.max_cost is not None:
+            conditions.append("total_cost <= ?")
+            params.append(query.max_cost)
+        after = query.decode_cursor()
+        if after is not None:
+            # Spelled out rather than as a row-value comparison so SQLite can
+            # seek the expression indexes instead of scanning them.
+            comparison = "<" if query.order == "desc" else ">"
+            conditions.append(f"{sort_expr} {comparison}= ? AND ({sort_expr} {comparison} ? OR id {comparison} ?)")
+            params.extend((after[0], after[0], after[1]))
+
+        columns = ", ".join(dict.fromkeys(("id", *query.fields)))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "DESC" if query.order == "desc" else "ASC"
+        sql = (
+            f"SELECT {columns}, {sort_expr} AS _sort_value FROM projects {where} "
+            f"ORDER BY {sort_expr} {direction}, id {direction} LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, query.limit + 1)).fetchall()
+
+        next_cursor = None
+        if len(rows) > query.limit:
+            rows = rows[:query.limit]
+            next_cursor = query.encode_cursor(rows[-1]["_sort_value"], rows[-1]["id"])
+        return [{f: row[f] for f in query.fields} for row in rows], next_cursor
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+
+    def quantity_rows(self) -> Tuple[List[str], List[QuantityRow]]:
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT project_id, element_type, count, area, length FROM project_measures ORDER BY project_id"
+            )
+            # Plain tuples are much cheaper than sqlite3.Row for a full scan
+            cursor.row_factory = None
+            measures = cursor.fetchall()
+        project_ids: List[str] = []
+        rows: List[QuantityRow] = []
+        last = None
+        for project_id, element_type, count, area, length in measures:
+            if project_id != last:
+                project_ids.append(project_id)
+                last = project_id
+            rows.append((len(project_ids) - 1, element_type, count, area, length))
+        return project_ids, rows
+
+    def update_costs(self, updates: List[Tuple[str, Dict[str, Any], Dict[str, Any]]], cost_version: str) -> None:
+        # Costs change but quantities do not, so project_measures stays as is
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "UPDATE projects SET summary = ?, total_cost = ?, element_count = ?, "
+                    "extra = json_set(IFNULL(extra, '{}'), '$.cost_database_version', ?) WHERE id = ?",
+                    (
+                        (
+                            json.dumps(summary), summary.get("total_cost"), summary.get("element_count"),
+                            cost_version, project_id,
+                        )
+                        for project_id, _, summary in updates
+                    ),
+                )
+                self._conn.executemany(
+                    "UPDATE project_quantities SET quantities = ? WHERE project_id = ?",
+                    ((json.dumps(quantities), project_id) for project_id, quantities, _ in updates),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+def create_project_store(backend: str, db_path: Optional[Path] = None) -> ProjectStore:
+    """Build the store backend selected by configuration."""
+    if backend == "memory":
+        return MemoryProjectStore()
+    if backend != "sqlite":
+        raise ValueError(f"Unknown project store backend: {backend}")
+    return SQLiteProjectStore(db_path)
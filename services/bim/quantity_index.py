@@ -0,0 +1,141 @@
+"""Element -> quantity index built in one pass over a model's quantity sets.
+
+Looking up an element's area or length through ``element.IsDefinedBy``
+follows inverse attributes and type-checks every relationship and quantity,
+per element. ``QuantityIndex`` instead walks every
+``IfcRelDefinesByProperties`` once and records the first area, length,
+volume and count quantity attached to each element, so later lookups are a
+dict access.
+
+The index can be saved keyed by GlobalId, letting other endpoints answer
+element queries for a processed project without reopening its IFC file.
+"""
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from atomic_file import atomic_write
+
+# IfcQuantity* class -> (index field, attribute holding the value)
+QUANTITY_FIELDS = {
+    "IfcQuantityArea": ("area", "AreaValue"),
+    "IfcQuantityLength": ("length", "LengthValue"),
+    "IfcQuantityVolume": ("volume", "VolumeValue"),
+    "IfcQuantityCount": ("count", "CountValue"),
+}
+
+
+class QuantityIndex:
+    def __init__(self, entries: Optional[Dict] = None, global_ids: Optional[Dict[int, str]] = None):
+        # element key (entity id in a live model, GlobalId once persisted) -> quantities
+        self.entries: Dict = entries or {}
+        # entity id -> GlobalId, only for indexes built from a model
+        self.global_ids: Dict[int, str] = global_ids or {}
+
+    @classmethod
+    def from_model(cls, ifc_file) -> "QuantityIndex":
+        entries: Dict[int, Dict[str, float]] = {}
+        global_ids: Dict[int, str] = {}
+        # Quantity sets are often shared (e.g. by every instance of a type),
+        # so each one is read only once.
+        set_values: Dict[int, Dict[str, float]] = {}
+
+        for rel in ifc_file.by_type("IfcRelDefinesByProperties"):
+            definitions = rel.RelatingPropertyDefinition
+            # IFC4 allows an IfcPropertySetDefinitionSet (a plain list) here
+            if not isinstance(definitions, (list, tuple)):
+                definitions = (definitions,)
+
+            values: Dict[str, float] = {}
+            for definition in definitions:
+                if definition is None:
+                    continue
+                quantities = set_values.get(definition.id())
+                if quantities is None:
+                    quantities = set_values[definition.id()] = cls._read_quantity_set(definition)
+                for name, value in quantities.items():
+                    values.setdefault(name, value)
+            if not values:
+                continue
+
+            for element in rel.RelatedObjects or ():
+                entry = entries.setdefault(element.id(), {})
+                for name, value in values.items():
+                    # First quantity set wins, matching the IsDefinedBy walk
+                    entry.setdefault(name, value)
+                if element.id() not in global_ids:
+                    global_ids[element.id()] = getattr(element, "GlobalId", None)
+
+        return cls(entries, global_ids)
+
+    @classmethod
+    def from_relations(
+        cls,
+        relations: Iterable[Tuple[Iterable[int], Iterable[int]]],
+        set_values: Dict[int, Dict[str, float]],
+        global_ids: Dict[int, str],
+    ) -> "QuantityIndex":
+        """Build an index from pre-extracted records (the streaming reader path).
+
+        ``relations`` holds ``(related element ids, definition ids)`` per
+        IfcRelDefinesByProperties in file order, ``set_values`` the quantities
+        of each IfcElementQuantity, and ``global_ids`` the elements of
+        interest; relations to other objects are ignored.
+        """
+        entries: Dict[int, Dict[str, float]] = {}
+        for related, definitions in relations:
+            values: Dict[str, float] = {}
+            for definition in definitions:
+                for name, value in set_values.get(definition, {}).items():
+                    values.setdefault(name, value)
+            if not values:
+                continue
+            for element_id in related:
+                if element_id not in global_ids:
+                    continue
+                entry = entries.setdefault(element_id, {})
+                for name, value in values.items():
+                    entry.setdefault(name, value)
+        return cls(entries, {k: global_ids[k] for k in entries})
+
+    @staticmethod
+    def _read_quantity_set(definition) -> Dict[str, float]:
+        values: Dict[str, float] = {}
+        if not definition.is_a("IfcElementQuantity"):
+            return values
+        for quantity in definition.Quantities or ():
+            field = QUANTITY_FIELDS.get(quantity.is_a())
+            if field is not None and field[0] not in values:
+                value = getattr(quantity, field[1])
+                if value is not None:
+                    values[field[0]] = float(value)
+        return values
+
+    def get(self, key) -> Optional[Dict[str, float]]:
+        return self.entries.get(key)
+
+    def value(self, key, field: str) -> Optional[float]:
+        entry = self.entries.get(key)
+        return entry.get(field) if entry else None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def by_global_id(self) -> Dict[str, Dict[str, float]]:
+        """Re-key a model-built index by GlobalId for persistence."""
+        return {
+            self.global_ids[key]: entry
+            for key, entry in self.entries.items()
+            if self.global_ids.get(key)
+        }
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path) as f:
+            json.dump(self.by_global_id(), f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: Path) -> "QuantityIndex":
+        """Load a persisted index; keys are GlobalIds."""
+        with open(path, "r") as f:
+            return cls(json.load(f))
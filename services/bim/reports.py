@@ -0,0 +1,139 @@
+"""Content-addressed, deduplicated PDF report rendering.
+
+Reports are stored under a digest of the project data they are rendered
+from, so a repeat download is a static file serve and the digest doubles as
+the HTTP ETag. Rendering runs in a worker pool, and concurrent requests for
+the same report share a single render. Stored reports are bounded by total
+size and evicted least-recently-used first, like cached parse results.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from worker_pool import ParseWorkerPool, PoolSaturatedError
+
+logger = logging.getLogger(__name__)
+
+# Bump when the report layout changes so stored reports are re-rendered
+REPORT_FORMAT_VERSION = 1
+
+# Project fields that appear in the report
+REPORT_FIELDS = ("project_name", "processed_at", "summary", "quantities")
+
+RenderFn = Callable[[str, Dict[str, Any], str], str]
+
+# The renderer falls back to a text report when ReportLab is missing
+REPORT_SUFFIXES = (".pdf", ".txt")
+
+
+def report_digest(data: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"version": REPORT_FORMAT_VERSION, **{k: data.get(k) for k in REPORT_FIELDS}},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class ReportCache:
+    def __init__(
+        self, reports_dir: Path, pool: ParseWorkerPool, render: RenderFn, max_disk_bytes: int = 512 * 1024 * 1024
+    ):
+        self.reports_dir = reports_dir
+        self.pool = pool
+        self.render = render
+        self.max_disk_bytes = max_disk_bytes
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._disk_bytes = sum(size for size, _, _ in self._stored())
+        self._stats = {"hits": 0, "renders": 0, "deduplicated": 0, "evictions": 0}
+
+    def _stored(self):
+        """``(size, mtime, path)`` of every stored report"""
+        for path in self.reports_dir.iterdir():
+            if path.suffix in REPORT_SUFFIXES:
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                yield stat.st_size, stat.st_mtime, path
+
+    def _existing(self, digest: str) -> Optional[Path]:
+        for suffix in REPORT_SUFFIXES:
+            path = self.reports_dir / f"{digest}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def _evict(self, keep: Path) -> None:
+        """Remove least recently used reports, never ``keep``, until under the limit"""
+        with self._lock:
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+            for size, _, path in sorted(self._stored(), key=lambda entry: entry[1]):
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+                self._disk_bytes -= size
+                self._stats["evictions"] += 1
+
+    async def get(self, project_id: str, data: Dict[str, Any]) -> Tuple[Path, str]:
+        """Return ``(path, digest)`` of the report for ``data``, rendering it if needed."""
+        digest = report_digest(data)
+        path = self._existing(digest)
+        if path is not None:
+            try:
+                os.utime(path)  # mark as recently used for eviction
+            except FileNotFoundError:
+                pass
+            else:
+                self._stats["hits"] += 1
+                return path, digest
+
+        pending = self._in_flight.get(digest)
+        if pending is not None:
+            self._stats["deduplicated"] += 1
+            return Path(await asyncio.shield(pending)), digest
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[digest] = future
+        try:
+            report_data = {k: data.get(k) for k in REPORT_FIELDS}
+            target = str(self.reports_dir / f"{digest}.pdf")
+            while True:
+                try:
+                    rendered = await self.pool.run(self.render, project_id, report_data, target)
+                    break
+                except PoolSaturatedError:
+                    await asyncio.sleep(0.5)
+            self._stats["renders"] += 1
+            with self._lock:
+                self._disk_bytes += Path(rendered).stat().st_size
+            await asyncio.to_thread(self._evict, Path(rendered))
+            future.set_result(rendered)
+            return Path(rendered), digest
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters receive the exception; avoid "never retrieved" warnings
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[digest]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self._stats,
+            "rendering": len(self._in_flight),
+            "disk_bytes": self._disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+        }
@@ -0,0 +1,137 @@
+"""Content-addressed cache of parse_ifc results.
+
+Results are keyed by the SHA-256 of the uploaded file plus the version of
+the cost database they were priced with, so re-uploading an unchanged model
+skips ``ifcopenshell.open`` entirely while a rate change still forces a
+re-parse. Two tiers are kept:
+
+* an in-memory LRU of the most recent results, bounded by entry count;
+* JSON files under ``DATA_DIR/cache``, bounded by total size and evicted
+  least-recently-used first.
+"""
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from atomic_file import atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+class ParseResultCache:
+    def __init__(self, cache_dir: Path, memory_entries: int = 256, max_disk_bytes: int = 1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*.json"))
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    @staticmethod
+    def make_key(file_hash: str, cost_version: str) -> str:
+        return f"{file_hash}-{cost_version}"
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            os.utime(path)  # mark as recently used for eviction
+        except FileNotFoundError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            self._remove_file(path)
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: Dict) -> None:
+        path = self._path(key)
+        payload = json.dumps(data, separators=(",", ":"))
+        with atomic_write(path) as f:
+            f.write(payload)
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+
+        with self._lock:
+            self._stats["stores"] += 1
+            self._disk_bytes += len(payload) - replaced
+            self._remember(key, data)
+        self._evict_disk()
+
+    def _remember(self, key: str, data: Dict) -> None:
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _remove_file(self, path: Path) -> int:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return 0
+        with self._lock:
+            self._disk_bytes -= size
+        return size
+
+    def _evict_disk(self) -> None:
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        for _, path in sorted(entries):
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            if self._remove_file(path):
+                with self._lock:
+                    self._stats["evictions"] += 1
+                    self._memory.pop(path.stem, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+            }
@@ -0,0 +1,140 @@
+"""Quantities and costs per building, storey, space and zone.
+
+Schedulers ask for costs by location, and answering from the model means
+walking every element's containment on each request. The spatial index is
+computed once, when a model is processed, from its takeoff table: each row
+already carries its building, storey and space, so every level is a
+``bincount`` over (location code, category code). Zones group spaces, so a
+zone's totals are the sum of its spaces' totals.
+
+Groups are keyed by the location's GlobalId, so two storeys both called
+"Level 1" are totalled apart. Each group carries its display ``name``, its
+totals and a per-category breakdown using the same keys as the project
+``quantities`` payload. Elements without a location at some level (an
+element contained directly in a storey has no space) are totalled under
+that level's ``unassigned`` entry, so every level except ``zone`` adds up
+to the project total. A space can belong to several zones,
+so zone totals may overlap.
+"""
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from atomic_file import atomic_write
+from takeoff import LOCATION_COLUMNS, TakeoffTable
+
+LEVELS = LOCATION_COLUMNS + ("zone",)
+
+_MEASURES = ("total_area", "total_length", "material_cost", "labor_cost", "total_cost")
+# Columns of flattened rows: one per group and category
+ROW_COLUMNS = ("level", "id", "name", "category", "count") + _MEASURES
+
+
+def _entry(counts: np.ndarray, sums: Dict[str, np.ndarray], categories: List[str]) -> Dict:
+    """Totals and per-category breakdown of one group from its matrix rows"""
+    by_category = {}
+    for code in np.flatnonzero(counts):
+        by_category[categories[code]] = {
+            "count": int(counts[code]),
+            **{measure: round(float(sums[measure][code]), 2) for measure in _MEASURES},
+        }
+    return {
+        "element_count": int(counts.sum()),
+        **{measure: round(float(sums[measure].sum()), 2) for measure in _MEASURES},
+        "by_category": by_category,
+    }
+
+
+class SpatialIndex:
+    def __init__(self, levels: Dict[str, Dict[str, Dict]], unassigned: Dict[str, Dict], meta: Optional[Dict] = None):
+        self.levels = levels
+        self.unassigned = unassigned
+        self.meta = meta or {}
+
+    @classmethod
+    def from_takeoff(cls, table: TakeoffTable) -> "SpatialIndex":
+        categories = table.vocabularies["category"]
+        category_codes = table.column("category").astype(np.int64)
+        material = np.asarray(table.column("material_cost"))
+        labor = np.asarray(table.column("labor_cost"))
+        weights = {
+            "total_area": np.asarray(table.column("area")),
+            "total_length": np.asarray(table.column("length")),
+            "material_cost": material,
+            "labor_cost": labor,
+            "total_cost": material + labor,
+        }
+
+        levels: Dict[str, Dict[str, Dict]] = {}
+        unassigned: Dict[str, Dict] = {}
+        matrices = {}
+        for level in LOCATION_COLUMNS:
+            vocabulary = table.vocabularies[level]
+            shape = (len(vocabulary), len(categories))
+            keys = table.column(level).astype(np.int64) * len(categories) + category_codes
+            counts = np.bincount(keys, minlength=shape[0] * shape[1]).reshape(shape)
+            sums = {
+                measure: np.bincount(keys, weights=values, minlength=shape[0] * shape[1]).reshape(shape)
+                for measure, values in weights.items()
+            }
+            matrices[level] = (vocabulary, counts, sums)
+            groups = {}
+            for code, key in enumerate(vocabulary):
+                entry = _entry(counts[code], {m: s[code] for m, s in sums.items()}, categories)
+                if key:
+                    groups[key] = {"name": table.label(key), **entry}
+                else:
+                    unassigned[level] = entry
+            levels[level] = groups
+
+        # Zones: sum the rows of their spaces
+        space_keys, space_counts, space_sums = matrices["space"]
+        space_codes = {key: code for code, key in enumerate(space_keys)}
+        zone_spaces: Dict[str, List[int]] = {}
+        for space, zones in table.meta.get("zones", {}).items():
+            if space in space_codes:
+                for zone in zones:
+                    zone_spaces.setdefault(zone, []).append(space_codes[space])
+        levels["zone"] = {
+            zone: {
+                "name": table.label(zone),
+                **_entry(
+                    space_counts[codes].sum(axis=0), {m: s[codes].sum(axis=0) for m, s in space_sums.items()}, categories
+                ),
+            }
+            for zone, codes in sorted(zone_spaces.items(), key=lambda item: (table.label(item[0]), item[0]))
+        }
+
+        meta = {key: value for key, value in table.meta.items() if key not in ("zones", "names")}
+        return cls(levels, unassigned, meta)
+
+    def groups(self, level: str) -> Dict[str, Dict]:
+        if level not in self.levels:
+            raise ValueError(f"Unknown level '{level}'; levels: {', '.join(LEVELS)}")
+        return self.levels[level]
+
+    def find(self, level: str, name: Optional[str] = None, group_id: Optional[str] = None) -> Dict[str, Dict]:
+        """Groups of ``level`` with the given id and/or display name"""
+        return {
+            key: entry for key, entry in self.groups(level).items()
+            if (group_id is None or key == group_id) and (name is None or entry.get("name", key) == name)
+        }
+
+    def rows(self, level: str, name: Optional[str] = None, group_id: Optional[str] = None) -> Iterator[Dict]:
+        """One flat record per group and category, for tabular exports"""
+        for key, entry in self.find(level, name, group_id).items():
+            for category, values in entry["by_category"].items():
+                yield {"level": level, "id": key, "name": entry.get("name", key), "category": category, **values}
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path) as f:
+            json.dump({"levels": self.levels, "unassigned": self.unassigned, "meta": self.meta}, f)
+
+    @classmethod
+    def load(cls, path: Path) -> "SpatialIndex":
+        with open(path, "r") as f:
+            data = json.load(f)
+        return cls(data["levels"], data["unassigned"], data["meta"])
@@ -0,0 +1,211 @@
+"""Memory-mapped streaming reader for IFC STEP (ISO 10303-21) files.
+
+``ifcopenshell.open`` materialises the whole entity graph, which does not
+fit in memory for multi-GB federated models. ``StepStreamReader`` instead
+memory-maps the file, walks the entity records with regular expressions and
+only decodes the arguments of records whose type the caller asked for.
+Everything else is skipped without being copied out of the page cache, so
+resident memory grows with the number of relevant entities, not with the
+file size. Skipped records are stepped over up to their terminating ``;``,
+honouring string literals and ``/* ... */`` comments, so record-like text
+inside either is never taken for a record.
+"""
+import mmap
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Whitespace and comments between records
+_GAP = re.compile(rb"(?:\s++|/\*.*?\*/)*+", re.DOTALL)
+# One whole record; group 3 is its arguments up to the closing ";". Strings
+# ('' escapes read as two adjacent strings) and comments may contain ";".
+_RECORD = re.compile(
+    rb"\s*#(\d+)\s*=\s*([A-Za-z0-9_]+)\s*(\((?:[^';/]++|'[^']*+'|/\*.*?\*/|/(?!\*))*+);", re.DOTALL
+)
+_STRING_OR_COMMENT = re.compile(rb"'[^']*+'|/\*.*?\*/", re.DOTALL)
+_FILE_SCHEMA = re.compile(rb"FILE_SCHEMA\s*\(\s*\(\s*'([^']*)'", re.IGNORECASE)
+_DATA_SECTION = re.compile(rb"\bDATA\s*(\([^;]*\))?\s*;")
+_HEADER_SECTION = re.compile(rb"\bHEADER\s*;")
+_HEADER_RECORD = re.compile(rb"\b(FILE_[A-Za-z_]+)\s*\(")
+_END_SECTION = re.compile(rb"\bENDSEC\s*;")
+
+# The HEADER section is looked for in this many leading bytes
+HEADER_SCAN_BYTES = 64 * 1024
+_NUMBER = re.compile(rb"[-+0-9.Ee]+")
+_ENUM = re.compile(rb"\.([A-Za-z0-9_]+)\.")
+_KEYWORD = re.compile(rb"[A-Za-z0-9_]+")
+
+
+class StepSyntaxError(ValueError):
+    """Raised when a record cannot be decoded."""
+
+
+class Ref(int):
+    """An entity instance reference (``#123``)."""
+
+    def __repr__(self) -> str:
+        return f"#{int(self)}"
+
+
+def _parse_string(data, pos: int) -> Tuple[str, int]:
+    # pos is at the opening quote; '' is an escaped quote
+    pos += 1
+    chunks = []
+    while True:
+        end = data.find(b"'", pos)
+        if end < 0:
+            raise StepSyntaxError("Unterminated string")
+        chunks.append(data[pos:end])
+        if data[end + 1:end + 2] == b"'":
+            chunks.append(b"'")
+            pos = end + 2
+            continue
+        return b"".join(chunks).decode("latin-1"), end + 1
+
+
+def _skip_ws(data, pos: int) -> int:
+    while data[pos:pos + 1] in (b" ", b"\n", b"\r", b"\t"):
+        pos += 1
+    return pos
+
+
+def _parse_value(data, pos: int):
+    pos = _skip_ws(data, pos)
+    c = data[pos:pos + 1]
+    if c == b"$" or c == b"*":
+        return None, pos + 1
+    if c == b"#":
+        match = _NUMBER.match(data, pos + 1)
+        return Ref(int(match.group())), match.end()
+    if c == b"'":
+        return _parse_string(data, pos)
+    if c == b"(":
+        return _parse_list(data, pos)
+    if c == b".":
+        match = _ENUM.match(data, pos)
+        if match is None:
+            raise StepSyntaxError(f"Bad enumeration at offset {pos}")
+        value = match.group(1).decode()
+        if value in ("T", "F"):
+            return value == "T", match.end()
+        return value, match.end()
+    if c == b'"':
+        end = data.find(b'"', pos + 1)
+        return data[pos + 1:end].decode("ascii"), end + 1
+    if c.isalpha():
+        # Typed value such as IFCLABEL('x') or IFCAREAMEASURE(1.5)
+        match = _KEYWORD.match(data, pos)
+        inner, end = _parse_list(data, _skip_ws(data, match.end()))
+        return (inner[0] if inner else None), end
+    match = _NUMBER.match(data, pos)
+    if match is None:
+        raise StepSyntaxError(f"Unexpected character {c!r} at offset {pos}")
+    text = match.group()
+    try:
+        return int(text), match.end()
+    except ValueError:
+        return float(text), match.end()
+
+
+def _parse_list(data, pos: int) -> Tuple[list, int]:
+    # pos is at "("
+    items = []
+    pos = _skip_ws(data, pos + 1)
+    if data[pos:pos + 1] == b")":
+        return items, pos + 1
+    while True:
+        value, pos = _parse_value(data, pos)
+        items.append(value)
+        pos = _skip_ws(data, pos)
+        c = data[pos:pos + 1]
+        if c == b",":
+            pos += 1
+        elif c == b")":
+            return items, pos + 1
+        else:
+            raise StepSyntaxError(f"Expected ',' or ')' at offset {pos}")
+
+
+def _strip_comments(record: bytes) -> bytes:
+    return _STRING_OR_COMMENT.sub(lambda m: m.group() if m.group().startswith(b"'") else b" ", record)
+
+
+def read_header(data, limit: int = HEADER_SCAN_BYTES) -> Dict[str, list]:
+    """Decoded arguments of the HEADER section's records, by record name.
+
+    ``data`` is the start of a STEP file (bytes or an mmap). Typically
+    returns FILE_DESCRIPTION, FILE_NAME and FILE_SCHEMA.
+    """
+    end = min(len(data), limit)
+    start = _HEADER_SECTION.search(data, 0, end)
+    if start is None:
+        raise StepSyntaxError("No HEADER section found")
+    section_end = _END_SECTION.search(data, start.end(), end)
+    if section_end is None:
+        raise StepSyntaxError("HEADER section is not terminated")
+    records = {}
+    pos = start.end()
+    while True:
+        match = _HEADER_RECORD.search(data, pos, section_end.start())
+        if match is None:
+            return records
+        args, pos = _parse_list(data, match.end() - 1)
+        records[match.group(1).decode("ascii").upper()] = args
+
+
+class StepStreamReader:
+    """Iterate selected entity records of a STEP file without loading it."""
+
+    def __init__(self, file_path: Path):
+        self.file_path = Path(file_path)
+        self._file = open(self.file_path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.schema = self._read_schema()
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "StepStreamReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _read_schema(self) -> Optional[str]:
+        match = _FILE_SCHEMA.search(self._mm, 0, min(len(self._mm), 64 * 1024))
+        return match.group(1).decode("ascii").upper() if match else None
+
+    def records(self, types: Optional[Iterable[str]] = None) -> Iterator[Tuple[int, str, List]]:
+        """Yield ``(id, TYPE, arguments)`` for records of the given types.
+
+        Type names are matched case-insensitively; with ``types=None`` every
+        record is decoded.
+        """
+        wanted: Optional[Set[bytes]] = (
+            {t.upper().encode("ascii") for t in types} if types is not None else None
+        )
+        mm = self._mm
+        data_match = _DATA_SECTION.search(mm)
+        if data_match is None:
+            raise StepSyntaxError("No DATA section found")
+        pos = data_match.end()
+
+        while True:
+            match = _RECORD.match(mm, pos)
+            if match is None:
+                pos = _GAP.match(mm, pos).end()
+                match = _RECORD.match(mm, pos)
+                if match is None:
+                    if _END_SECTION.match(mm, pos) or pos >= len(mm):
+                        return
+                    raise StepSyntaxError(f"Malformed or unterminated entity record at offset {pos}")
+            pos = match.end()
+            type_name = match.group(2).upper()
+            if wanted is not None and type_name not in wanted:
+                continue
+            record = match.group(3)
+            if b"/*" in record:
+                record = _strip_comments(record)
+            args, _ = _parse_list(record, 0)
+            yield int(match.group(1)), type_name.decode("ascii"), args
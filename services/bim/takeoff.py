@@ -0,0 +1,404 @@
+"""Per-element takeoff tables in a compressed columnar file.
+
+``parse_ifc`` measures every priced element but only returned per-type
+totals. The takeoff table keeps one row per element - GlobalId, IFC class,
+cost category, building, storey and space, area, length and material/labor
+cost - so element-level drill-downs read a file instead of re-parsing the
+model. Location columns hold the GlobalId of the building, storey or space,
+so same-named storeys in different buildings stay apart; the header maps
+those ids to display names and records which zones each space belongs to,
+so ``spatial_index`` can derive per-zone totals from the table alone.
+
+File layout (one file per model, written atomically)::
+
+    b"BIMTAKE2" | header length (8 bytes, little endian) | JSON header | blocks
+
+Each column is cut into blocks of ``BLOCK_ROWS`` rows, and every block is a
+zlib-compressed little-endian array; the header lists each column's dtype
+and the byte offset and length of its blocks. A reader inflates only the
+blocks covering the rows and columns it returns. GlobalIds are fixed-width
+ASCII; class, category and the location columns are dictionary-encoded as
+small integer codes with the vocabulary in the header, so they compress to
+a few bytes per block run. Tables written as ``b"BIMTAKE1"`` hold
+uncompressed, 64-byte aligned columns and are memory-mapped instead.
+"""
+import json
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import cost_engine
+from atomic_file import atomic_write
+
+MAGIC = b"BIMTAKE2"
+# Uncompressed, memory-mapped layout of older tables
+_MAGIC_V1 = b"BIMTAKE1"
+_ALIGNMENT = 64
+
+# Spatial structure an element is located in, outermost first
+LOCATION_COLUMNS = ("building", "storey", "space")
+# Dictionary-encoded text columns
+CODED_COLUMNS = ("ifc_class", "category") + LOCATION_COLUMNS
+NUMBER_COLUMNS = ("area", "length", "material_cost", "labor_cost")
+COLUMNS = ("global_id",) + CODED_COLUMNS + NUMBER_COLUMNS
+
+# Rows converted to Python objects at a time when streaming
+CHUNK_ROWS = 10_000
+# Rows per compressed column block; a streamed chunk inflates one block per column
+BLOCK_ROWS = CHUNK_ROWS
+_COMPRESSION_LEVEL = 6
+
+
+# Spatial structure class -> location column it fills
+_LOCATION_CLASSES = {"IfcBuilding": "building", "IfcBuildingStorey": "storey", "IfcSpace": "space"}
+
+Location = Tuple[Optional[str], Optional[str], Optional[str]]
+# Spatial structure id -> (IFC class, GlobalId, name)
+Spatial = Dict[int, Tuple[str, Optional[str], Optional[str]]]
+# IfcZone id -> (GlobalId, name)
+Zones = Dict[int, Tuple[Optional[str], Optional[str]]]
+
+
+def _key(global_id: Optional[str], node: int) -> str:
+    return global_id or f"#{node}"
+
+
+def _location_key(spatial: Spatial, node: int) -> str:
+    return _key(spatial[node][1] if node in spatial else None, node)
+
+
+def location_names(spatial: Spatial, zones: Zones) -> Dict[str, str]:
+    """Display name of every spatial structure and zone, by location key.
+
+    Unnamed ones are labelled with their entity id.
+    """
+    names = {_key(global_id, node): name or f"#{node}" for node, (_, global_id, name) in spatial.items()}
+    names.update((_key(global_id, node), name or f"#{node}") for node, (global_id, name) in zones.items())
+    return names
+
+
+def resolve_locations(
+    spatial: Spatial,
+    contained: Iterable[Tuple[int, Sequence[int]]],
+    aggregates: Iterable[Tuple[int, Sequence[int]]],
+) -> Dict[int, Location]:
+    """``(building, storey, space)`` keys of every contained element.
+
+    A location key is the structure's GlobalId, or ``#<id>`` without one;
+    ``location_names`` labels them. ``spatial`` maps spatial structure ids to
+    ``(IFC class, GlobalId, name)``;
+    ``contained`` holds ``(structure id, element ids)`` from
+    IfcRelContainedInSpatialStructure and ``aggregates`` ``(whole id, part
+    ids)`` from IfcRelAggregates. An element's location is read off the
+    aggregation chain above its container, so elements in a space also get
+    the space's storey and building. Elements contained outside any storey
+    take their container as storey; parts of an aggregate (roof
+    slabs, stair flights) take the location of their whole.
+    """
+    aggregates = list(aggregates)
+    parent = {part: whole for whole, parts in aggregates for part in parts}
+    resolved: Dict[int, Location] = {}
+
+    def location(structure_id: int) -> Location:
+        if structure_id not in resolved:
+            found: Dict[str, str] = {}
+            node, seen = structure_id, set()
+            while node is not None and node in spatial and node not in seen:
+                seen.add(node)
+                column = _LOCATION_CLASSES.get(spatial[node][0])
+                if column is not None:
+                    found.setdefault(column, _location_key(spatial, node))
+                node = parent.get(node)
+            found.setdefault("storey", _location_key(spatial, structure_id))
+            resolved[structure_id] = tuple(found.get(column) for column in LOCATION_COLUMNS)
+        return resolved[structure_id]
+
+    locations: Dict[int, Location] = {}
+    for structure_id, element_ids in contained:
+        found = location(structure_id)
+        for element_id in element_ids:
+            locations[element_id] = found
+    for whole, parts in aggregates:
+        if whole in locations:
+            for part in parts:
+                locations.setdefault(part, locations[whole])
+    return locations
+
+
+def resolve_zones(
+    spatial: Spatial,
+    zones: Zones,
+    groups: Iterable[Tuple[int, Sequence[int]]],
+) -> Dict[str, List[str]]:
+    """Zone keys of every space, keyed by the space's location key.
+
+    ``zones`` maps IfcZone ids to ``(GlobalId, name)`` and ``groups`` holds ``(group id,
+    member ids)`` from IfcRelAssignsToGroup. Zones may group other zones; a
+    space belongs to every zone above it.
+    """
+    members: Dict[int, List[int]] = {}
+    for group_id, member_ids in groups:
+        if group_id in zones:
+            members.setdefault(group_id, []).extend(member_ids)
+
+    space_zones: Dict[str, List[str]] = {}
+    for zone_id in members:
+        zone_key = _key(zones[zone_id][0], zone_id)
+        stack, seen = [zone_id], set()
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            for member in members.get(node, ()):
+                if member in zones:
+                    stack.append(member)
+                elif spatial.get(member, (None,))[0] == "IfcSpace":
+                    space = space_zones.setdefault(_location_key(spatial, member), [])
+                    if zone_key not in space:
+                        space.append(zone_key)
+    return space_zones
+
+
+def model_locations(ifc_file) -> Tuple[Dict[int, Location], Dict[str, List[str]], Dict[str, str]]:
+    """``resolve_locations``, ``resolve_zones`` and ``location_names`` for an opened model"""
+    spatial = {
+        structure.id(): (structure.is_a(), structure.GlobalId, structure.Name)
+        for structure in ifc_file.by_type("IfcSpatialStructureElement")
+    }
+    contained = [
+        (rel.RelatingStructure.id(), [element.id() for element in rel.RelatedElements])
+        for rel in ifc_file.by_type("IfcRelContainedInSpatialStructure")
+    ]
+    aggregates = [
+        (rel.RelatingObject.id(), [part.id() for part in rel.RelatedObjects])
+        for rel in ifc_file.by_type("IfcRelAggregates")
+    ]
+    zones = {zone.id(): (zone.GlobalId, zone.Name) for zone in ifc_file.by_type("IfcZone")}
+    groups = [
+        (rel.RelatingGroup.id(), [member.id() for member in rel.RelatedObjects])
+        for rel in ifc_file.by_type("IfcRelAssignsToGroup")
+        if rel.RelatingGroup is not None and rel.RelatingGroup.id() in zones
+    ]
+    return (
+        resolve_locations(spatial, contained, aggregates),
+        resolve_zones(spatial, zones, groups),
+        location_names(spatial, zones),
+    )
+
+
+class TakeoffBuilder:
+    """Collects element rows during a parse and writes the takeoff file."""
+
+    def __init__(self, zones: Optional[Dict[str, List[str]]] = None, names: Optional[Dict[str, str]] = None):
+        # Space key -> zone keys, from resolve_zones; location key -> name
+        self.zones = zones or {}
+        self.names = names or {}
+        self.global_ids: List[str] = []
+        self.coded: Dict[str, List[str]] = {column: [] for column in CODED_COLUMNS}
+        self.areas: List[float] = []
+        self.lengths: List[float] = []
+
+    def add(
+        self, global_id: str, ifc_class: str, category: str, location: Optional[Location], area: float, length: float
+    ) -> None:
+        self.global_ids.append(global_id)
+        self.coded["ifc_class"].append(ifc_class)
+        self.coded["category"].append(category)
+        for column, key in zip(LOCATION_COLUMNS, location or (None,) * len(LOCATION_COLUMNS)):
+            self.coded[column].append(key or "")
+        self.areas.append(area)
+        self.lengths.append(length)
+
+    def __len__(self) -> int:
+        return len(self.global_ids)
+
+    def save(self, path: Path, rates: cost_engine.RateTable, meta: Optional[Dict] = None) -> None:
+        """Price the rows with ``rates`` and write the file"""
+        rows = len(self.global_ids)
+        areas = np.array(self.areas, dtype=np.float64)
+        lengths = np.array(self.lengths, dtype=np.float64)
+        material, labor, _ = cost_engine.price(
+            rates, rates.encode(self.coded["category"]), np.ones(rows, dtype=np.int64), areas, lengths
+        )
+        arrays = {
+            "global_id": np.array(self.global_ids, dtype=f"S{max(map(len, self.global_ids), default=1)}"),
+            "area": areas,
+            "length": lengths,
+            "material_cost": material,
+            "labor_cost": labor,
+        }
+        vocabularies = {}
+        for column, values in self.coded.items():
+            vocabulary, codes = np.unique(np.array(values, dtype=object).astype(str), return_inverse=True)
+            vocabularies[column] = vocabulary.tolist()
+            arrays[column] = codes.astype(np.uint16 if len(vocabulary) < 2 ** 16 else np.uint32)
+        write_table(
+            path, rows, {name: arrays[name] for name in COLUMNS}, vocabularies,
+            {**(meta or {}), "zones": self.zones, "names": self.names}
+        )
+
+
+def write_table(path: Path, rows: int, arrays: Dict[str, np.ndarray], vocabularies: Dict[str, List[str]], meta: Dict) -> None:
+    columns = {}
+    blocks = []
+    offset = 0
+    for name, array in arrays.items():
+        dtype = np.dtype(array.dtype).newbyteorder("<")
+        array = np.ascontiguousarray(array, dtype=dtype)
+        spans = []
+        for start in range(0, rows, BLOCK_ROWS):
+            block = zlib.compress(array[start:start + BLOCK_ROWS].tobytes(), _COMPRESSION_LEVEL)
+            spans.append([offset, len(block)])
+            blocks.append(block)
+            offset += len(block)
+        columns[name] = {"dtype": dtype.str, "blocks": spans}
+    header = json.dumps({
+        "rows": rows, "block_rows": BLOCK_ROWS, "columns": columns, "vocabularies": vocabularies, "meta": meta
+    }).encode()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Block offsets are relative to the first byte after the header
+    with atomic_write(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for block in blocks:
+            f.write(block)
+
+
+def reprice(path: Path, rates: cost_engine.RateTable, meta: Optional[Dict] = None) -> "TakeoffTable":
+    """Rewrite the cost columns of the takeoff file at ``path`` with ``rates``
+
+    The measured columns are kept, so no model is re-parsed; ``meta`` is
+    merged into the header. Returns the rewritten table.
+    """
+    table = TakeoffTable(path)
+    arrays = {name: np.asarray(table.column(name)) for name in COLUMNS}
+    codes = rates.encode(table.vocabularies["category"])
+    arrays["material_cost"], arrays["labor_cost"], _ = cost_engine.price(
+        rates,
+        codes[arrays["category"]] if len(codes) else np.zeros(0, dtype=np.int32),
+        np.ones(table.rows, dtype=np.int64),
+        arrays["area"],
+        arrays["length"],
+    )
+    write_table(path, table.rows, arrays, table.vocabularies, {**table.meta, **(meta or {})})
+    return TakeoffTable(path)
+
+
+class TakeoffTable:
+    """Read side of a takeoff file; column blocks are inflated on demand."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            magic = f.read(len(MAGIC))
+            if magic not in (MAGIC, _MAGIC_V1):
+                raise ValueError(f"{self.path.name} is not a takeoff table")
+            header_length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_length))
+        self.rows: int = header["rows"]
+        self.meta: Dict = header["meta"]
+        self.vocabularies: Dict[str, List[str]] = header["vocabularies"]
+        # Location key -> display name; tables written before locations were
+        # keyed by GlobalId hold names in the location columns
+        self.names: Dict[str, str] = self.meta.get("names", {})
+        self._columns = header["columns"]
+        self._compressed = magic == MAGIC
+        self._block_rows: int = header.get("block_rows", BLOCK_ROWS)
+        data_start = len(MAGIC) + 8 + header_length
+        self._data_start = data_start if self._compressed else -(-data_start // _ALIGNMENT) * _ALIGNMENT
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _read_blocks(self, name: str, numbers: Iterable[int]) -> List[np.ndarray]:
+        spec = self._columns[name]
+        blocks = []
+        with open(self.path, "rb") as f:
+            for number in numbers:
+                offset, length = spec["blocks"][number]
+                f.seek(self._data_start + offset)
+                blocks.append(np.frombuffer(zlib.decompress(f.read(length)), dtype=spec["dtype"]))
+        return blocks
+
+    def column(self, name: str) -> np.ndarray:
+        """Every row of column ``name``, kept for later calls"""
+        if name not in self._arrays:
+            spec = self._columns[name]
+            if self.rows == 0:
+                self._arrays[name] = np.zeros(0, dtype=spec["dtype"])
+            elif self._compressed:
+                self._arrays[name] = np.concatenate(self._read_blocks(name, range(len(spec["blocks"]))))
+            else:
+                self._arrays[name] = np.memmap(
+                    self.path, dtype=spec["dtype"], mode="r",
+                    offset=self._data_start + spec["offset"], shape=(self.rows,)
+                )
+        return self._arrays[name]
+
+    def take(self, name: str, rows: np.ndarray) -> np.ndarray:
+        """Values of column ``name`` at ``rows``, inflating only the blocks holding them"""
+        if name in self._arrays or not self._compressed or len(rows) == 0:
+            return self.column(name)[rows]
+        rows = np.asarray(rows)
+        numbers = np.unique(rows // self._block_rows)
+        blocks = self._read_blocks(name, numbers.tolist())
+        # Row positions within the inflated blocks laid end to end
+        starts = np.zeros(len(numbers), dtype=np.int64)
+        starts[1:] = np.cumsum([len(block) for block in blocks[:-1]])
+        index = np.searchsorted(numbers, rows // self._block_rows)
+        return np.concatenate(blocks)[starts[index] + rows % self._block_rows]
+
+    def label(self, key: str) -> str:
+        """Display name of a location key"""
+        return self.names.get(key, key)
+
+    def select(self, filters: Optional[Dict[str, Sequence[str]]] = None) -> np.ndarray:
+        """Row numbers whose coded columns match any of the given values
+
+        Locations match by key or by name; a name matches every location
+        carrying it.
+        """
+        mask = None
+        for name, values in (filters or {}).items():
+            if name not in CODED_COLUMNS:
+                raise ValueError(f"Cannot filter on '{name}'; filterable columns: {', '.join(CODED_COLUMNS)}")
+            vocabulary = self.vocabularies[name]
+            wanted = set(values)
+            if name in LOCATION_COLUMNS:
+                codes = [code for code, key in enumerate(vocabulary) if key and (key in wanted or self.label(key) in wanted)]
+            else:
+                codes = [code for code, value in enumerate(vocabulary) if value in wanted]
+            matches = np.isin(self.column(name), codes)
+            mask = matches if mask is None else mask & matches
+        return np.arange(self.rows) if mask is None else np.flatnonzero(mask)
+
+    def iter_rows(self, rows: np.ndarray, columns: Sequence[str] = COLUMNS, chunk_rows: int = CHUNK_ROWS) -> Iterator[List[tuple]]:
+        """Yield the selected rows as tuples of ``columns``, a chunk at a time
+
+        Locations come back as their names, empty ones as None.
+        """
+        for name in columns:
+            if name not in self._columns:
+                raise ValueError(f"Unknown column '{name}'; columns: {', '.join(COLUMNS)}")
+        for start in range(0, len(rows), chunk_rows):
+            chunk = rows[start:start + chunk_rows]
+            values = []
+            for name in columns:
+                column = self.take(name, chunk)
+                if name == "global_id":
+                    values.append([value.decode("ascii") for value in column.tolist()])
+                elif name in LOCATION_COLUMNS:
+                    labels = [self.label(key) if key else None for key in self.vocabularies[name]]
+                    values.append([labels[code] for code in column.tolist()])
+                elif name in CODED_COLUMNS:
+                    vocabulary = self.vocabularies[name]
+                    values.append([vocabulary[code] or None for code in column.tolist()])
+                else:
+                    values.append(column.tolist())
+            yield list(zip(*values))
@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVICE_DIR))
+
+from benchmarks.synthetic_ifc import write_synthetic_ifc  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def synthetic_model(tmp_path_factory) -> Path:
+    """A small synthetic model with quantity sets on most elements"""
+    path = tmp_path_factory.mktemp("models") / "synthetic.ifc"
+    write_synthetic_ifc(path, 2000, storeys=4, seed=7)
+    return path
+
+
+@pytest.fixture(scope="session")
+def main_module(tmp_path_factory):
+    """The service module, run with its data directory in a temporary folder"""
+    data_root = tmp_path_factory.mktemp("service")
+    previous = os.getcwd()
+    os.environ.setdefault("BIM_PROJECT_STORE", "memory")
+    # The API tests upload more models than one client's default burst
+    os.environ.setdefault("BIM_CLIENT_BURST", "1000")
+    # The service's paths are relative to the working directory
+    os.chdir(data_root)
+    try:
+        import main
+        yield main
+    finally:
+        os.chdir(previous)
+
+
+@pytest.fixture(scope="session")
+def client(main_module):
+    """HTTP client for the service, with its worker pools and job queue running"""
+    from fastapi.testclient import TestClient
+
+    with TestClient(main_module.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def upload(client):
+    """``upload(path, filename="model.ifc", **params)`` POSTs a model to /upload"""
+    def upload(path: Path, filename: str = "model.ifc", **params):
+        with open(path, "rb") as f:
+            return client.post("/upload", params=params, files={"file": (filename, f, "application/octet-stream")})
+    return upload
+
+
+@pytest.fixture(scope="session")
+def project_id(upload, synthetic_model) -> str:
+    """A processed upload of the synthetic model"""
+    response = upload(synthetic_model)
+    assert response.status_code == 200, response.text
+    return response.json()["project_id"]
+
+
+@pytest.fixture
+def edit_catalogue(main_module, tmp_path):
+    """``edit_catalogue(version, **material_costs)`` swaps in an edited copy of
+    the cost catalogue; the original rates are restored, and stored projects
+    re-priced with them, afterwards"""
+    processor = main_module.bim_processor
+    original_path = processor.catalogue_path
+
+    def edit(version: str, **material_costs: float) -> Path:
+        catalogue = json.loads(original_path.read_text())
+        catalogue["version"] = version
+        for rate in catalogue["rates"]:
+            rate["material_cost"] = material_costs.get(rate["ifc_class"], rate["material_cost"])
+        path = tmp_path / f"catalogue-{version}.json"
+        path.write_text(json.dumps(catalogue))
+        processor.catalogue_path = path
+        return path
+
+    yield edit
+    processor.catalogue_path = original_path
+    processor.refresh_catalogue(force=True)
+    processor.reprice_projects(main_module.project_store, main_module._reprice_takeoffs)
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_a_burst_then_refills():
+    clock = FakeClock()
+    admission = AdmissionController(1024, client_rate_per_minute=60, client_burst=2, clock=clock)
+
+    for _ in range(2):
+        with admission.client("a"):
+            pass
+    with pytest.raises(AdmissionError) as rejected:
+        with admission.client("a"):
+            pass
+    assert rejected.value.status_code == 429
+    assert rejected.value.reason == "rate"
+    assert rejected.value.retry_after == pytest.approx(1.0)
+
+    # Other clients have their own bucket
+    with admission.client("b"):
+        pass
+
+    clock.now += 1.0
+    with admission.client("a"):
+        pass
+    assert admission.stats()["rejected"]["rate"] == 1
+
+
+def test_bucket_never_holds_more_than_the_burst():
+    clock = FakeClock()
+    admission = AdmissionController(1024, client_rate_per_minute=60, client_burst=2, clock=clock)
+    clock.now += 3600
+
+    for _ in range(2):
+        with admission.client("a"):
+            pass
+    with pytest.raises(AdmissionError):
+        with admission.client("a"):
+            pass
+
+
+def test_concurrent_requests_per_client_are_capped():
+    admission = AdmissionController(1024, client_concurrency=2)
+
+    with admission.client("a"), admission.client("a"):
+        with pytest.raises(AdmissionError) as rejected:
+            with admission.client("a"):
+                pass
+        assert rejected.value.status_code == 429
+        assert rejected.value.reason == "concurrency"
+        with admission.client("b"):
+            assert admission.stats()["clients_in_flight"] == 3
+    assert admission.stats()["clients_in_flight"] == 0
+    with admission.client("a"):
+        pass
+
+
+def test_reservations_beyond_the_budget_are_rejected():
+    async def run():
+        admission = AdmissionController(100, retry_after=7)
+        async with admission.reserve(60):
+            with pytest.raises(AdmissionError) as rejected:
+                async with admission.reserve(50):
+                    pass
+            assert rejected.value.status_code == 503
+            assert rejected.value.retry_after == 7
+            async with admission.reserve(40):
+                assert admission.saturated
+        assert admission.reserved_bytes == 0
+        assert not admission.saturated
+
+    asyncio.run(run())
+
+
+def test_a_model_larger_than_the_budget_runs_alone():
+    async def run():
+        admission = AdmissionController(100)
+        async with admission.reserve(500):
+            assert admission.saturated
+            with pytest.raises(AdmissionError):
+                async with admission.reserve(1):
+                    pass
+
+    asyncio.run(run())
+
+
+def test_waiting_reservation_starts_when_memory_is_released():
+    async def run():
+        admission = AdmissionController(100)
+        order = []
+
+        async def first():
+            async with admission.reserve(80):
+                order.append("first")
+                await asyncio.sleep(0.01)
+
+        async def second():
+            await asyncio.sleep(0)
+            async with admission.reserve(80, wait=True):
+                order.append("second")
+                assert admission.reserved_bytes == 80
+
+        await asyncio.gather(first(), second())
+        assert order == ["first", "second"]
+        assert admission.stats()["waiting"] == 0
+
+    asyncio.run(run())
+
+
+def test_memory_held_outside_parses_counts_against_the_budget():
+    held = [0]
+
+    async def run():
+        admission = AdmissionController(100, held_bytes=lambda: held[0])
+        async with admission.reserve(40):
+            held[0] = 50
+            with pytest.raises(AdmissionError):
+                async with admission.reserve(20):
+                    pass
+            held[0] = 60
+            assert admission.saturated
+            assert admission.stats()["held_bytes"] == 60
+
+    asyncio.run(run())
@@ -0,0 +1,42 @@
+import uuid
+
+
+def _post_upload(client, client_id, filename="notes.txt"):
+    return client.post("/upload", files={"file": (filename, b"not a model")}, headers={"X-Client-Id": client_id})
+
+
+def test_liveness(client):
+    assert client.get("/health/live").json() == {"status": "alive"}
+
+
+def test_clients_over_their_rate_are_turned_away(main_module, client, monkeypatch):
+    monkeypatch.setattr(main_module.admission, "client_burst", 2)
+    monkeypatch.setattr(main_module.admission, "client_rate", 1 / 60)
+    greedy, other = f"greedy-{uuid.uuid4()}", f"other-{uuid.uuid4()}"
+
+    statuses = [_post_upload(client, greedy).status_code for _ in range(2)]
+    refused = _post_upload(client, greedy)
+
+    assert statuses == [400, 400]
+    assert refused.status_code == 429
+    assert 0 < int(refused.headers["retry-after"]) <= 60
+    assert _post_upload(client, other).status_code == 400
+    # Only parse requests are limited
+    assert client.get("/projects", headers={"X-Client-Id": greedy}).status_code == 200
+
+
+def test_saturated_service_sheds_parses_and_reports_not_ready(main_module, client, monkeypatch):
+    admission = main_module.admission
+    monkeypatch.setattr(admission, "reservations", 1)
+    monkeypatch.setattr(admission, "reserved_bytes", admission.memory_budget)
+
+    health = client.get("/health")
+    refused = _post_upload(client, f"client-{uuid.uuid4()}", "model.ifc")
+
+    assert health.status_code == 503
+    assert health.json()["status"] == "saturated"
+    assert "parse memory budget in use" in health.json()["reasons"]
+    assert "retry-after" in health.headers
+    assert refused.status_code == 503
+    assert "retry-after" in refused.headers
+    assert client.get("/health/live").status_code == 200
@@ -0,0 +1,68 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from benchmarks.synthetic_ifc import write_synthetic_ifc
+
+
+@pytest.fixture(scope="module")
+def models(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("batch")
+    paths = []
+    for seed in (41, 42, 43):
+        path = directory / f"model{seed}.ifc"
+        write_synthetic_ifc(path, 1200, storeys=2, seed=seed)
+        paths.append(path)
+    return paths
+
+
+def _zip(paths):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for path in paths:
+            archive.write(path, f"nested/{path.name}")
+    return buffer.getvalue()
+
+
+def test_batch_streams_one_line_per_file_then_a_summary(client, models):
+    files = [("files", (models[0].name, models[0].read_bytes())), ("files", ("models.zip", _zip(models[1:])))]
+
+    response = client.post("/upload/batch", files=files)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["type"] for line in lines] == ["file"] * 3 + ["summary"]
+    assert sorted(line["filename"] for line in lines[:3]) == sorted(path.name for path in models)
+    assert all(line["status"] == "processed" for line in lines[:3])
+    summary = lines[-1]
+    assert (summary["files"], summary["processed"], summary["failed"]) == (3, 3, 0)
+    assert summary["summary"]["element_count"] == sum(line["summary"]["element_count"] for line in lines[:3])
+    for line in lines[:3]:
+        assert client.get(f"/projects/{line['project_id']}").json()["batch_id"] == summary["batch_id"]
+
+
+def test_batch_without_streaming_returns_one_document(client, models):
+    response = client.post("/upload/batch", params={"stream": False}, files=[("files", (models[0].name, models[0].read_bytes()))])
+
+    body = response.json()
+    assert body["success"] is True
+    assert len(body["files"]) == 1
+    assert body["summary"]["processed"] == 1
+
+
+def test_invalid_batches_are_rejected(main_module, client, models, monkeypatch):
+    def post(*files):
+        return client.post("/upload/batch", files=[("files", file) for file in files])
+
+    assert post(("notes.txt", b"hello")).status_code == 400
+    assert post(("empty.zip", _zip([]))).status_code == 400
+    assert post(("broken.zip", b"PK not really")).status_code == 400
+
+    monkeypatch.setattr(main_module, "BATCH_MAX_FILES", 2)
+    assert post(("models.zip", _zip(models))).status_code == 413
+    monkeypatch.setattr(main_module, "MAX_BATCH_BYTES", 1024)
+    assert post((models[0].name, models[0].read_bytes())).status_code == 413
+    assert not list(main_module.UPLOADS_DIR.glob("*.zip"))
@@ -0,0 +1,31 @@
+def test_catalogue_reports_the_rates_in_effect(client):
+    catalogue = client.get("/cost-catalogue").json()
+
+    assert catalogue["version"] == "1"
+    assert catalogue["source"].endswith("cost_catalogue.json")
+    assert catalogue["rates"]["IfcWall"]["unit"] == "m²"
+    assert catalogue["cost_database_version"] == client.get("/cache/stats").json()["cost_database_version"]
+
+
+def test_edited_catalogues_are_reloaded(client, edit_catalogue):
+    before = client.get("/cost-catalogue").json()
+
+    path = edit_catalogue("2", IfcWall=99.0)
+    reloaded = client.post("/cost-catalogue/reload").json()
+
+    assert reloaded["changed"] is True
+    assert reloaded["version"] == "2"
+    assert reloaded["cost_database_version"] != before["cost_database_version"]
+    catalogue = client.get("/cost-catalogue").json()
+    assert catalogue["rates"]["IfcWall"]["material_cost"] == 99.0
+    assert catalogue["source"] == str(path)
+    assert client.post("/cost-catalogue/reload").json()["changed"] is False
+
+
+def test_broken_catalogues_keep_the_current_rates(client, edit_catalogue):
+    before = client.get("/cost-catalogue").json()
+
+    edit_catalogue("3").write_text("{not json")
+
+    assert client.post("/cost-catalogue/reload").json()["changed"] is False
+    assert client.get("/cost-catalogue").json()["cost_database_version"] == before["cost_database_version"]
@@ -0,0 +1,26 @@
+import ifcopenshell
+
+
+def test_element_details_come_from_the_cached_model(main_module, client, project_id, synthetic_model):
+    model = ifcopenshell.open(str(synthetic_model))
+    wall = model.by_type("IfcWall")[0]
+    before = main_module.model_cache.stats()
+
+    response = client.get(f"/projects/{project_id}/elements/{wall.GlobalId}")
+    again = client.get(f"/projects/{project_id}/elements/{wall.GlobalId}")
+
+    assert response.status_code == 200
+    details = response.json()
+    assert details["ifc_class"] == "IfcWall"
+    assert details["name"] == wall.Name
+    assert details["container"]["ifc_class"] == "IfcBuildingStorey"
+    assert details["quantity_sets"]
+    assert again.json() == details
+    stats = main_module.model_cache.stats()
+    assert stats["hits"] + stats["misses"] == before["hits"] + before["misses"] + 2
+    assert stats["hits"] >= before["hits"] + 1
+
+
+def test_unknown_elements_are_not_found(client, project_id):
+    assert client.get(f"/projects/{project_id}/elements/0000000000000000000000").status_code == 404
+    assert client.get("/projects/nope/elements/0000000000000000000000").status_code == 404
@@ -0,0 +1,25 @@
+import ifcopenshell
+import ifcopenshell.util.element
+import pytest
+
+
+def test_element_quantities_match_the_model(client, project_id, synthetic_model):
+    model = ifcopenshell.open(str(synthetic_model))
+    wall = model.by_type("IfcWall")[0]
+    expected = {
+        name: value
+        for quantity_set in ifcopenshell.util.element.get_psets(wall, qtos_only=True).values()
+        for name, value in quantity_set.items() if name != "id"
+    }
+
+    response = client.get(f"/projects/{project_id}/elements/{wall.GlobalId}/quantities")
+
+    assert response.status_code == 200
+    quantities = response.json()["quantities"]
+    assert quantities["area"] == pytest.approx(next(v for k, v in expected.items() if "Area" in k))
+    assert quantities["length"] == pytest.approx(next(v for k, v in expected.items() if "Length" in k))
+
+
+def test_unknown_elements_are_not_found(client, project_id):
+    assert client.get(f"/projects/{project_id}/elements/0000000000000000000000/quantities").status_code == 404
+    assert client.get("/projects/nope/elements/0000000000000000000000/quantities").status_code == 404
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+
+import pytest
+
+
+def test_pages_cover_every_element_once(client, project_id):
+    count = client.get(f"/projects/{project_id}").json()["summary"]["element_count"]
+
+    seen, offset = [], 0
+    while offset is not None:
+        page = client.get(f"/projects/{project_id}/elements", params={"limit": 70, "offset": offset}).json()
+        seen.extend(element["global_id"] for element in page["elements"])
+        offset = page["next_offset"]
+
+    assert page["total"] == count
+    assert len(seen) == len(set(seen)) == count
+
+
+def test_rows_add_up_to_the_project(client, project_id):
+    project = client.get(f"/projects/{project_id}").json()
+
+    response = client.get(f"/projects/{project_id}/elements", params={"format": "ndjson"})
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["x-total-count"] == str(len(rows))
+    assert sum(row["material_cost"] + row["labor_cost"] for row in rows) == pytest.approx(
+        project["summary"]["total_cost"], abs=1.0
+    )
+    assert {row["storey"] for row in rows} <= {f"Level {n}" for n in range(1, 5)}
+
+
+def test_filters_and_column_projection(client, project_id):
+    response = client.get(f"/projects/{project_id}/elements", params=[
+        ("format", "csv"), ("columns", "global_id,category"), ("category", "IfcDoor"), ("category", "IfcWindow"),
+    ])
+
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["global_id", "category"]
+    assert {row[1] for row in rows[1:]} == {"IfcDoor", "IfcWindow"}
+    assert response.headers["x-total-count"] == str(len(rows) - 1)
+    quantities = client.get(f"/projects/{project_id}").json()["quantities"]
+    assert len(rows) - 1 == quantities["IfcDoor"]["count"] + quantities["IfcWindow"]["count"]
+    assert client.get(f"/projects/{project_id}/elements", params={"storey": "Nowhere"}).json()["total"] == 0
+
+
+def test_missing_takeoffs_are_rebuilt(main_module, client, project_id):
+    project = main_module.project_store.get(project_id, include_quantities=False)
+    main_module._takeoff_path(project["file_hash"]).unlink()
+
+    response = client.get(f"/projects/{project_id}/elements", params={"limit": 1})
+
+    assert response.status_code == 200
+    assert response.json()["total"] == project["summary"]["element_count"]
+
+
+def test_invalid_requests_are_rejected(client, project_id):
+    assert client.get(f"/projects/{project_id}/elements", params={"columns": "global_id,secret"}).status_code == 400
+    assert client.get(f"/projects/{project_id}/elements", params={"limit": 20000}).status_code == 400
+    assert client.get("/projects/nope/elements").status_code == 404
@@ -0,0 +1,45 @@
+import pytest
+
+from benchmarks.synthetic_ifc import write_synthetic_ifc
+
+
+@pytest.fixture(scope="module")
+def other_project(upload, tmp_path_factory):
+    path = tmp_path_factory.mktemp("federation") / "other.ifc"
+    write_synthetic_ifc(path, 1500, storeys=2, seed=51)
+    return upload(path, "other.ifc").json()["project_id"]
+
+
+def _count(client, project_id):
+    return client.get(f"/projects/{project_id}").json()["summary"]["element_count"]
+
+
+def test_federation_lifecycle(client, upload, synthetic_model, project_id, other_project):
+    copy_id = upload(synthetic_model, "copy.ifc").json()["project_id"]
+
+    created = client.post("/federations", json={"name": "Site", "project_ids": [project_id, other_project, copy_id]})
+
+    assert created.status_code == 200
+    federation = created.json()
+    assert federation["name"] == "Site"
+    # The copy shares every GlobalId with the first model, so adds nothing
+    assert federation["summary"]["element_count"] == _count(client, project_id) + _count(client, other_project)
+    fetched = client.get(f"/federations/{federation['id']}").json()
+    assert fetched["summary"] == federation["summary"]
+
+    updated = client.put(f"/federations/{federation['id']}", json={"project_ids": [copy_id]}).json()
+    assert updated["name"] == "Site"
+    assert updated["project_ids"] == [copy_id]
+    assert updated["summary"]["element_count"] == _count(client, project_id)
+    assert updated["created_at"] == federation["created_at"]
+
+    assert client.delete(f"/federations/{federation['id']}").json() == {"success": True, "id": federation["id"]}
+    assert client.get(f"/federations/{federation['id']}").status_code == 404
+    assert client.get(f"/projects/{copy_id}").status_code == 200
+
+
+def test_invalid_federations_are_rejected(client, project_id):
+    assert client.post("/federations", json={"project_ids": []}).status_code == 400
+    assert client.post("/federations", json={"project_ids": [project_id, "nope"]}).status_code == 404
+    assert client.put("/federations/nope", json={"project_ids": [project_id]}).status_code == 404
+    assert client.delete("/federations/nope").status_code == 404
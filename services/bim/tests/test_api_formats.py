@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+
+
+def test_project_as_ndjson_and_csv(client, project_id):
+    project = client.get(f"/projects/{project_id}").json()
+
+    ndjson = client.get(f"/projects/{project_id}", params={"format": "ndjson"})
+    lines = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert lines[0]["id"] == project_id
+    assert "quantities" not in lines[0]
+    assert {line["element_type"]: line["count"] for line in lines[1:]} == {
+        name: entry["count"] for name, entry in project["quantities"].items()
+    }
+
+    response = client.get(f"/projects/{project_id}", params={"format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert response.headers["content-type"].startswith("text/csv")
+    assert f"{project_id}_quantities.csv" in response.headers["content-disposition"]
+    assert {row["element_type"]: int(row["count"]) for row in rows} == {
+        name: entry["count"] for name, entry in project["quantities"].items()
+    }
+
+
+def test_quantities_as_csv(client, project_id):
+    quantities = client.get(f"/projects/{project_id}/quantities").json()["quantities"]
+
+    response = client.get(f"/projects/{project_id}/quantities", params={"format": "csv"})
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == [
+        "element_type", "count", "total_area", "total_length", "unit", "material_cost", "labor_cost", "total_cost"
+    ]
+    wall = next(row for row in rows if row["element_type"] == "IfcWall")
+    assert float(wall["total_cost"]) == quantities["IfcWall"]["total_cost"]
+
+
+def test_listing_streams_every_page(client, project_id):
+    listed = client.get("/projects", params={"limit": 1000, "fields": "id,project_name"}).json()["projects"]
+
+    response = client.get("/projects", params={"format": "ndjson", "limit": 1, "fields": "id,project_name"})
+    streamed = [json.loads(line) for line in response.text.splitlines()]
+    assert streamed == listed
+
+    rows = list(csv.reader(io.StringIO(client.get("/projects", params={"format": "csv", "fields": "id"}).text)))
+    assert rows[0] == ["id"]
+    assert [row[0] for row in rows[1:]] == [project["id"] for project in listed]
+
+
+def test_unknown_formats_are_rejected(client, project_id):
+    for path in (f"/projects/{project_id}", f"/projects/{project_id}/quantities", "/projects"):
+        assert client.get(path, params={"format": "xml"}).status_code == 400
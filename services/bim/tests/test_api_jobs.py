@@ -0,0 +1,67 @@
+import time
+
+from benchmarks.synthetic_ifc import write_synthetic_ifc
+from jobs import QueueFullError
+
+
+def _wait_for(client, project_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        project = client.get(f"/projects/{project_id}").json()
+        if project["status"] not in ("queued", "parsing") or time.monotonic() > deadline:
+            return project
+        time.sleep(0.1)
+
+
+def test_async_upload_is_queued_and_polled(client, upload, tmp_path):
+    path = tmp_path / "queued.ifc"
+    write_synthetic_ifc(path, 1500, storeys=2, seed=21)
+
+    response = upload(path, "queued.ifc", async_mode=True)
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["status"] == "queued"
+    assert body["status_url"] == f"/projects/{body['project_id']}"
+    project = _wait_for(client, body["project_id"])
+    assert project["status"] == "processed"
+    assert project["progress"] == 100
+    assert project["summary"]["element_count"] > 0
+
+
+def test_known_models_are_answered_from_the_cache(upload, synthetic_model, project_id):
+    response = upload(synthetic_model, async_mode=True)
+
+    assert response.status_code == 200
+    assert response.json()["cached"] is True
+    assert response.json()["status"] == "processed"
+
+
+def test_full_queue_turns_uploads_away(main_module, client, upload, tmp_path, monkeypatch):
+    path = tmp_path / "refused.ifc"
+    write_synthetic_ifc(path, 1500, storeys=2, seed=22)
+
+    async def full(job):
+        raise QueueFullError("Job queue is full")
+
+    monkeypatch.setattr(main_module.job_queue, "enqueue", full)
+    response = upload(path, "refused.ifc", async_mode=True)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
+    assert client.get("/projects", params={"project_name": "refused"}).json()["projects"] == []
+    assert not list(main_module.UPLOADS_DIR.glob("*_refused.ifc"))
+
+
+def test_results_wait_for_the_job(main_module, client):
+    main_module.project_store.create({
+        "id": "waiting", "filename": "waiting.ifc", "uploaded_at": "2026-01-01T00:00:00",
+        "status": "parsing", "progress": 10,
+    })
+    try:
+        assert client.get("/projects/waiting").json()["progress"] == 10
+        response = client.get("/projects/waiting/quantities")
+        assert response.status_code == 409
+        assert "parsing" in response.json()["detail"]
+    finally:
+        main_module.project_store.delete("waiting")
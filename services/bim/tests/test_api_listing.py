@@ -0,0 +1,41 @@
+def _all_pages(client, **params):
+    projects, cursor = [], None
+    while True:
+        page = client.get("/projects", params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        projects.extend(page["projects"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return projects
+
+
+def test_cursor_pages_cover_the_listing_once(client, project_id):
+    everything = client.get("/projects", params={"limit": 1000, "sort": "total_cost", "order": "desc"}).json()
+
+    paged = _all_pages(client, limit=2, sort="total_cost", order="desc")
+
+    assert everything["next_cursor"] is None
+    assert [p["id"] for p in paged] == [p["id"] for p in everything["projects"]]
+    assert project_id in {p["id"] for p in paged}
+    costs = [p["total_cost"] for p in paged if p.get("total_cost") is not None]
+    assert costs == sorted(costs, reverse=True)
+
+
+def test_filters_and_fields(client, project_id):
+    project = client.get(f"/projects/{project_id}").json()
+    cost = project["summary"]["total_cost"]
+
+    matching = client.get("/projects", params={
+        "status": "processed", "min_cost": cost, "max_cost": cost, "fields": "id,total_cost", "limit": 1000,
+    }).json()["projects"]
+
+    assert project_id in {p["id"] for p in matching}
+    assert all(set(p) == {"id", "total_cost"} and p["total_cost"] == cost for p in matching)
+    named = client.get("/projects", params={"project_name": project["project_name"][1:4].upper()}).json()
+    assert project_id in {p["id"] for p in named["projects"]}
+
+
+def test_invalid_queries_are_rejected(client):
+    assert client.get("/projects", params={"sort": "nope"}).status_code == 400
+    assert client.get("/projects", params={"cursor": "garbage"}).status_code == 400
+    assert client.get("/projects", params={"fields": "id,secret"}).status_code == 400
+    assert client.get("/projects", params={"limit": 0}).status_code == 422
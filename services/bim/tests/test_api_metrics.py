@@ -0,0 +1,31 @@
+def _samples(text):
+    return {
+        line.rpartition(" ")[0]: float(line.rpartition(" ")[2])
+        for line in text.splitlines() if line and not line.startswith("#")
+    }
+
+
+def test_metrics_exposition(client, project_id):
+    client.get(f"/projects/{project_id}")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = _samples(response.text)
+    route = 'method="GET",route="/projects/{project_id}",status="200"'
+    assert samples[f"bim_http_request_seconds_count{{{route}}}"] >= 1
+    assert samples['bim_stage_seconds_count{operation="upload",stage="parse"}'] >= 1
+    assert samples['bim_pool_workers{pool="parse"}'] >= 1
+    assert samples["bim_projects"] >= 1
+    assert "# TYPE bim_parse_cache_lookups_total counter" in response.text
+
+
+def test_unmatched_routes_share_one_series(client):
+    client.get("/no/such/route/1")
+    client.get("/no/such/route/2")
+
+    samples = _samples(client.get("/metrics").text)
+
+    assert samples['bim_http_request_seconds_count{method="GET",route="unmatched",status="404"}'] >= 2
+    assert not any("/no/such/route" in name for name in samples)
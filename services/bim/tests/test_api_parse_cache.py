@@ -0,0 +1,18 @@
+def _hits(stats):
+    return stats["parse_cache"]["memory_hits"] + stats["parse_cache"]["disk_hits"]
+
+
+def test_repeat_uploads_reuse_the_cached_result(client, upload, synthetic_model, project_id):
+    before = client.get("/cache/stats").json()
+
+    response = upload(synthetic_model, "again.ifc")
+
+    after = client.get("/cache/stats").json()
+    assert response.status_code == 200
+    assert _hits(after) == _hits(before) + 1
+    assert after["parse_cache"]["misses"] == before["parse_cache"]["misses"]
+    assert after["cost_database_version"] == before["cost_database_version"]
+    first = client.get(f"/projects/{project_id}").json()
+    again = client.get(f"/projects/{response.json()['project_id']}").json()
+    assert again["summary"] == first["summary"]
+    assert again["file_hash"] == first["file_hash"]
@@ -0,0 +1,38 @@
+import pytest
+
+_HEADER = (
+    "ISO-10303-21;\nHEADER;\nFILE_DESCRIPTION((''),'2;1');\n"
+    "FILE_NAME('model.ifc','2024-01-01T00:00:00',(''),(''),'','','');\nFILE_SCHEMA(('IFC4'));\nENDSEC;\n"
+)
+
+
+def _samples(client, reason):
+    prefix = f'bim_prescans_total{{result="{reason}"}} '
+    lines = [line for line in client.get("/metrics").text.splitlines() if line.startswith(prefix)]
+    return int(lines[0][len(prefix):]) if lines else 0
+
+
+@pytest.mark.parametrize("name, text, reason", [
+    ("html.ifc", "<html>not a model</html>", "not_step"),
+    ("truncated.ifc", _HEADER + "DATA;\n#1=IFCWALL('x',$,$,$,$,$,$,$,$);\n", "truncated"),
+    ("empty-data.ifc", _HEADER + "DATA;\nENDSEC;\nEND-ISO-10303-21;\n", "no_entities"),
+])
+def test_malformed_uploads_are_rejected_without_a_parse(main_module, client, upload, tmp_path, name, text, reason):
+    path = tmp_path / name
+    path.write_text(text)
+    before = _samples(client, reason), client.get("/health").json()["workers"]["completed"]
+
+    response = upload(path, name)
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid IFC file")
+    assert (_samples(client, reason), client.get("/health").json()["workers"]["completed"]) == (before[0] + 1, before[1])
+    assert not list(main_module.UPLOADS_DIR.glob(f"*_{name}"))
+
+
+def test_accepted_uploads_keep_their_prescan(client, project_id):
+    summary = client.get(f"/projects/{project_id}").json()["prescan"]
+
+    assert summary["schema"] == "IFC4"
+    assert summary["has_quantity_sets"] is True
+    assert summary["approx_entities"] > 1000
@@ -0,0 +1,26 @@
+from benchmarks.synthetic_ifc import write_synthetic_ifc
+
+
+def test_profiled_uploads_keep_their_profile(client, tmp_path):
+    path = tmp_path / "profiled.ifc"
+    write_synthetic_ifc(path, 3000, storeys=2, seed=71)
+    with open(path, "rb") as f:
+        response = client.post("/upload", files={"file": ("profiled.ifc", f)}, headers={"X-Profile": "1"})
+    project_id = response.json()["project_id"]
+
+    project = client.get(f"/projects/{project_id}").json()
+    assert project["profile"]["seconds"] > 0
+    assert project["profile"]["entity_types"]
+
+    folded = client.get(f"/projects/{project_id}/profile")
+    assert folded.status_code == 200
+    assert all(line.rpartition(" ")[2].isdigit() for line in folded.text.splitlines())
+    text = client.get(f"/projects/{project_id}/profile", params={"format": "text"})
+    assert "cumulative_s" in text.text
+    assert client.get(f"/projects/{project_id}/profile", params={"format": "svg"}).status_code == 400
+
+
+def test_profiles_are_only_kept_when_asked_for(client, project_id):
+    assert "profile" not in client.get(f"/projects/{project_id}").json()
+    assert client.get(f"/projects/{project_id}/profile").status_code == 404
+    assert client.get("/projects/nope/profile").status_code == 404
@@ -0,0 +1,23 @@
+def test_reports_are_served_with_etags(client, project_id):
+    first = client.get(f"/projects/{project_id}/report")
+
+    assert first.status_code == 200
+    assert first.headers["content-type"] in ("application/pdf", "text/plain; charset=utf-8")
+    assert first.content
+    etag = first.headers["etag"]
+
+    again = client.get(f"/projects/{project_id}/report")
+    assert again.headers["etag"] == etag
+    assert again.content == first.content
+
+    unchanged = client.get(f"/projects/{project_id}/report", headers={"If-None-Match": f'"other", {etag}'})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+    assert not unchanged.content
+
+    assert client.get(f"/projects/{project_id}/report", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert client.get("/health").json()["reports"]["hits"] >= 1
+
+
+def test_reports_of_unknown_projects_are_not_found(client):
+    assert client.get("/projects/nope/report").status_code == 404
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+
+def test_reprice_updates_projects_and_takeoffs(client, project_id, edit_catalogue):
+    project = client.get(f"/projects/{project_id}").json()
+    wall = project["quantities"]["IfcWall"]
+    elements = client.get(f"/projects/{project_id}/elements", params={"format": "ndjson", "category": "IfcWall"})
+    wall_costs = sum(json.loads(line)["material_cost"] for line in elements.text.splitlines())
+
+    edit_catalogue("2", IfcWall=50.0)
+    client.post("/cost-catalogue/reload")
+    result = client.post("/projects/reprice").json()
+
+    assert result["projects"] >= 1
+    assert result["takeoffs_repriced"] >= 1
+    assert result["cost_database_version"] == client.get("/cost-catalogue").json()["cost_database_version"]
+    repriced = client.get(f"/projects/{project_id}").json()
+    assert repriced["quantities"]["IfcWall"]["material_cost"] == pytest.approx(2 * wall["material_cost"], abs=0.05)
+    assert repriced["quantities"]["IfcWall"]["total_area"] == wall["total_area"]
+    assert repriced["quantities"]["IfcSlab"] == project["quantities"]["IfcSlab"]
+    assert repriced["summary"]["total_cost"] == pytest.approx(
+        project["summary"]["total_cost"] + wall["material_cost"], abs=0.05
+    )
+    elements = client.get(f"/projects/{project_id}/elements", params={"format": "ndjson", "category": "IfcWall"})
+    assert elements.headers["x-cost-database-version"] == result["cost_database_version"]
+    repriced_costs = sum(json.loads(line)["material_cost"] for line in elements.text.splitlines())
+    assert repriced_costs == pytest.approx(2 * wall_costs, abs=0.5)
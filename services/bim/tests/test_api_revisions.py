@@ -0,0 +1,47 @@
+import pytest
+
+from benchmarks.synthetic_ifc import write_synthetic_ifc
+
+
+def _post_revision(client, project_id, path, filename="revision.ifc"):
+    with open(path, "rb") as f:
+        return client.post(f"/projects/{project_id}/revisions", files={"file": (filename, f)})
+
+
+def test_revisions_are_diffed_by_global_id(client, upload, tmp_path):
+    base = tmp_path / "base.ifc"
+    write_synthetic_ifc(base, 1500, storeys=2, seed=61)
+    project_id = upload(base, "base.ifc").json()["project_id"]
+    count = client.get(f"/projects/{project_id}").json()["summary"]["element_count"]
+
+    # The same elements in a file with another hash
+    same = tmp_path / "same.ifc"
+    same.write_bytes(base.read_bytes().replace(b"HEADER;", b"HEADER;\n/* r2 */", 1))
+    response = _post_revision(client, project_id, same)
+
+    assert response.status_code == 200, response.text
+    revision = response.json()
+    assert revision["revision"] == 2
+    assert revision["diff"] == {"added": 0, "changed": 0, "removed": 0, "unchanged": count}
+    assert revision["summary"]["total_cost"] == revision["previous_summary"]["total_cost"]
+
+    assert _post_revision(client, project_id, same).status_code == 409
+
+    # A different model: every element is new
+    other = tmp_path / "other.ifc"
+    write_synthetic_ifc(other, 1000, storeys=2, seed=62)
+    revision = _post_revision(client, project_id, other).json()
+
+    assert revision["revision"] == 3
+    assert revision["diff"]["removed"] == count
+    assert revision["diff"]["unchanged"] == 0
+    assert revision["diff"]["added"] == revision["summary"]["element_count"]
+    assert len(revision["elements"]["removed"]) == min(count, 100)
+    project = client.get(f"/projects/{project_id}").json()
+    assert [entry["revision"] for entry in project["revisions"]] == [1, 2, 3]
+    assert project["summary"] == revision["summary"]
+    assert project["revisions"][-1]["total_cost"] == pytest.approx(revision["summary"]["total_cost"])
+
+
+def test_revisions_need_a_processed_project(client, synthetic_model):
+    assert _post_revision(client, "nope", synthetic_model).status_code == 404
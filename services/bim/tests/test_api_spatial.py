@@ -0,0 +1,43 @@
+import csv
+import io
+
+import pytest
+
+
+def test_storeys_add_up_to_the_project(client, project_id):
+    summary = client.get(f"/projects/{project_id}").json()["summary"]
+
+    response = client.get(f"/projects/{project_id}/spatial")
+
+    body = response.json()
+    assert body["level"] == "storey"
+    assert sorted(group["name"] for group in body["groups"].values()) == [f"Level {n}" for n in range(1, 5)]
+    assert sum(group["element_count"] for group in body["groups"].values()) == summary["element_count"]
+    assert sum(group["total_cost"] for group in body["groups"].values()) == pytest.approx(summary["total_cost"], abs=1.0)
+    assert body["unassigned"] is None
+    assert response.headers["x-cost-database-version"]
+
+    buildings = client.get(f"/projects/{project_id}/spatial", params={"level": "building"}).json()["groups"]
+    assert len(buildings) == 1
+    spaces = client.get(f"/projects/{project_id}/spatial", params={"level": "space"}).json()
+    assert spaces["groups"] == {}
+    assert spaces["unassigned"]["element_count"] == summary["element_count"]
+
+
+def test_groups_by_name_and_id(client, project_id):
+    by_name = client.get(f"/projects/{project_id}/spatial", params={"name": "Level 2"}).json()["groups"]
+    assert len(by_name) == 1
+    (storey_id, storey), = by_name.items()
+
+    by_id = client.get(f"/projects/{project_id}/spatial", params={"id": storey_id, "format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(by_id.text)))
+    assert {row["id"] for row in rows} == {storey_id}
+    assert {row["category"] for row in rows} == set(storey["by_category"])
+    assert sum(int(row["count"]) for row in rows) == storey["element_count"]
+
+
+def test_invalid_requests_are_rejected(client, project_id):
+    assert client.get(f"/projects/{project_id}/spatial", params={"level": "floor"}).status_code == 400
+    assert client.get(f"/projects/{project_id}/spatial", params={"name": "Basement"}).status_code == 404
+    assert client.get(f"/projects/{project_id}/spatial", params={"id": "nope"}).status_code == 404
+    assert client.get("/projects/nope/spatial").status_code == 404
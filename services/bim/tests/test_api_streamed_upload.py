@@ -0,0 +1,51 @@
+def _multipart(filename, data, field="file", boundary="testboundary"):
+    return (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+
+
+def _headers(boundary="testboundary"):
+    return {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+def _stored(main_module, name):
+    return list(main_module.UPLOADS_DIR.glob(f"*_{name}"))
+
+
+def test_oversized_uploads_are_refused_while_streaming(main_module, upload, synthetic_model, monkeypatch):
+    monkeypatch.setattr(main_module, "MAX_UPLOAD_BYTES", 64 * 1024)
+
+    response = upload(synthetic_model, "oversized.ifc")
+
+    assert response.status_code == 413
+    assert not _stored(main_module, "oversized.ifc")
+
+
+def test_chunked_bodies_are_held_to_the_limit(main_module, client, synthetic_model, monkeypatch):
+    monkeypatch.setattr(main_module, "MAX_UPLOAD_BYTES", 64 * 1024)
+    monkeypatch.setattr(main_module, "UPLOAD_CHUNK_BYTES", 16 * 1024)
+    body = _multipart("chunked.ifc", synthetic_model.read_bytes())
+
+    def chunks():
+        for start in range(0, len(body), 8192):
+            yield body[start:start + 8192]
+
+    response = client.post("/upload", content=chunks(), headers=_headers())
+
+    assert response.status_code == 413
+    assert not _stored(main_module, "chunked.ifc")
+
+
+def test_malformed_forms_are_rejected(client, synthetic_model):
+    data = synthetic_model.read_bytes()[:4096]
+
+    not_ifc = client.post("/upload", content=_multipart("model.txt", data), headers=_headers())
+    assert not_ifc.status_code == 400
+    assert "IFC" in not_ifc.json()["detail"]
+
+    wrong_field = client.post("/upload", content=_multipart("model.ifc", data, field="upload"), headers=_headers())
+    assert wrong_field.status_code == 400
+
+    not_multipart = client.post("/upload", content=data, headers={"Content-Type": "application/octet-stream"})
+    assert not_multipart.status_code == 400
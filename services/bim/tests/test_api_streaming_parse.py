@@ -0,0 +1,31 @@
+import pytest
+
+import metrics
+from benchmarks.synthetic_ifc import write_synthetic_ifc
+
+
+def _parses(parser):
+    prefix = f'bim_parses_total{{parser="{parser}",outcome="success"}} '
+    lines = [line for line in metrics.REGISTRY.render().splitlines() if line.startswith(prefix)]
+    return int(lines[0][len(prefix):]) if lines else 0
+
+
+def test_streaming_parse_matches_the_full_parse(upload, tmp_path):
+    streamed_path = tmp_path / "streamed.ifc"
+    write_synthetic_ifc(streamed_path, 3000, storeys=3, seed=31)
+    # Same model under another file hash, so neither upload is a cache hit
+    full_path = tmp_path / "full.ifc"
+    full_path.write_bytes(streamed_path.read_bytes().replace(b"HEADER;", b"HEADER;\n/* copy */", 1))
+    before = _parses("streaming"), _parses("ifcopenshell")
+
+    streamed = upload(streamed_path, "streamed.ifc", streaming=True)
+    full = upload(full_path, "full.ifc", streaming=False)
+
+    assert streamed.status_code == full.status_code == 200
+    assert (_parses("streaming"), _parses("ifcopenshell")) == (before[0] + 1, before[1] + 1)
+    streamed, full = streamed.json()["data"], full.json()["data"]
+    assert streamed["summary"]["element_count"] == full["summary"]["element_count"]
+    assert streamed["summary"]["total_cost"] == pytest.approx(full["summary"]["total_cost"], abs=0.05)
+    assert {k: v["count"] for k, v in streamed["quantities"].items()} == {
+        k: v["count"] for k, v in full["quantities"].items()
+    }
@@ -0,0 +1,37 @@
+import pytest
+
+
+def test_upload_is_parsed_in_a_worker(client, project_id):
+    project = client.get(f"/projects/{project_id}").json()
+
+    assert project["status"] == "processed"
+    assert project["filename"] == "model.ifc"
+    assert project["summary"]["element_count"] > 0
+    assert sum(entry["count"] for entry in project["quantities"].values()) == project["summary"]["element_count"]
+    assert client.get("/health").json()["workers"]["completed"] >= 1
+
+
+def test_quantities_and_estimate(client, project_id):
+    quantities = client.get(f"/projects/{project_id}/quantities").json()
+    assert quantities["project_id"] == project_id
+    total = quantities["summary"]["total_cost"]
+    assert total == pytest.approx(sum(entry["total_cost"] for entry in quantities["quantities"].values()), abs=0.05)
+
+    estimate = client.post(f"/projects/{project_id}/estimate").json()
+    assert estimate["base_cost"] == total
+    assert estimate["final_cost"] == pytest.approx(total + estimate["overhead"] + estimate["profit"], abs=0.01)
+    assert client.get(f"/projects/{project_id}").json()["estimate"] == estimate
+
+
+def test_unknown_projects_are_not_found(client):
+    assert client.get("/projects/nope").status_code == 404
+    assert client.get("/projects/nope/quantities").status_code == 404
+    assert client.post("/projects/nope/estimate").status_code == 404
+
+
+def test_health(client):
+    health = client.get("/health").json()
+
+    assert health["status"] == "healthy"
+    assert health["ready"] is True
+    assert health["projects"]["backend"] == "memory"
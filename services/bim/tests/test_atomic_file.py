@@ -0,0 +1,27 @@
+import pytest
+
+from atomic_file import atomic_write
+
+
+def test_replaces_the_destination_on_success(tmp_path):
+    path = tmp_path / "table.json"
+    path.write_text("old")
+
+    with atomic_write(path) as f:
+        f.write("new")
+
+    assert path.read_text() == "new"
+    assert [p.name for p in tmp_path.iterdir()] == ["table.json"]
+
+
+def test_failed_write_keeps_the_destination_and_removes_the_temporary(tmp_path):
+    path = tmp_path / "table.json"
+    path.write_text("old")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as f:
+            f.write("partial")
+            raise RuntimeError("boom")
+
+    assert path.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["table.json"]
@@ -0,0 +1,139 @@
+import random
+
+import pytest
+
+from federation import ElementTable, Federation, accumulate
+
+
+def _table(rows):
+    return ElementTable({global_id: (category, area, 0.0) for global_id, category, area in rows})
+
+
+def _fresh_totals(members, tables):
+    """Totals of a merge built from scratch: first member in order wins"""
+    seen = {}
+    for project_id, version in members:
+        for global_id, row in tables[project_id, version].rows.items():
+            seen.setdefault(global_id, row)
+    return accumulate(seen.values())
+
+
+def _sync(federation, members, tables):
+    return federation.sync(members, lambda project_id, version: tables[project_id, version])
+
+
+def _assert_totals(actual, expected):
+    assert actual.keys() == expected.keys()
+    for category, entry in expected.items():
+        assert actual[category]["count"] == entry["count"]
+        assert actual[category]["area"] == pytest.approx(entry["area"])
+
+
+def test_shared_elements_are_counted_once_from_the_first_member():
+    tables = {
+        ("arch", "v1"): _table([("w1", "IfcWall", 10.0), ("s1", "IfcSlab", 50.0)]),
+        ("struct", "v1"): _table([("s1", "IfcSlab", 55.0), ("b1", "IfcBeam", 0.0)]),
+    }
+    federation = Federation()
+
+    result = _sync(federation, [("arch", "v1"), ("struct", "v1")], tables)
+
+    assert result == {"reused": 0, "applied": 2}
+    assert federation.owners["s1"][0] == "arch"
+    assert federation.category_totals()["IfcSlab"] == {"count": 1, "area": 50.0, "length": 0.0}
+    assert federation.contributed == {"arch": 2, "struct": 1}
+
+
+def test_reordering_members_moves_ownership():
+    tables = {
+        ("arch", "v1"): _table([("s1", "IfcSlab", 50.0)]),
+        ("struct", "v1"): _table([("s1", "IfcSlab", 55.0)]),
+    }
+    federation = Federation()
+    _sync(federation, [("arch", "v1"), ("struct", "v1")], tables)
+
+    result = _sync(federation, [("struct", "v1"), ("arch", "v1")], tables)
+
+    assert result == {"reused": 2, "applied": 0}
+    assert federation.owners["s1"][0] == "struct"
+    assert federation.category_totals()["IfcSlab"]["area"] == 55.0
+    assert list(federation.members) == ["struct", "arch"]
+
+
+def test_removing_the_owner_hands_shared_elements_to_the_next_member():
+    tables = {
+        ("arch", "v1"): _table([("s1", "IfcSlab", 50.0), ("w1", "IfcWall", 10.0)]),
+        ("struct", "v1"): _table([("s1", "IfcSlab", 55.0)]),
+    }
+    federation = Federation()
+    _sync(federation, [("arch", "v1"), ("struct", "v1")], tables)
+
+    _sync(federation, [("struct", "v1")], tables)
+
+    assert federation.owners == {"s1": ("struct", ("IfcSlab", 55.0, 0.0))}
+    assert federation.contributed == {"struct": 1}
+    _assert_totals(federation.category_totals(), _fresh_totals([("struct", "v1")], tables))
+
+
+def test_only_changed_members_are_reloaded():
+    tables = {
+        ("arch", "v1"): _table([("w1", "IfcWall", 10.0)]),
+        ("arch", "v2"): _table([("w1", "IfcWall", 12.0), ("w2", "IfcWall", 3.0)]),
+        ("struct", "v1"): _table([("b1", "IfcBeam", 0.0)]),
+    }
+    loaded = []
+    federation = Federation()
+
+    def load(project_id, version):
+        loaded.append((project_id, version))
+        return tables[project_id, version]
+
+    federation.sync([("arch", "v1"), ("struct", "v1")], load)
+    federation.sync([("arch", "v2"), ("struct", "v1")], load)
+
+    assert loaded == [("arch", "v1"), ("struct", "v1"), ("arch", "v2")]
+    assert federation.category_totals()["IfcWall"] == {"count": 2, "area": 15.0, "length": 0.0}
+
+
+def test_incremental_syncs_match_a_fresh_merge():
+    rng = random.Random(3)
+    categories = ["IfcWall", "IfcSlab", "IfcBeam"]
+    global_ids = [f"g{i}" for i in range(40)]
+    tables = {}
+    for project_id in ("a", "b", "c", "d"):
+        for version in ("v1", "v2"):
+            tables[project_id, version] = _table(
+                (global_id, rng.choice(categories), float(rng.randint(1, 20)))
+                for global_id in rng.sample(global_ids, 15)
+            )
+    federation = Federation()
+
+    for _ in range(200):
+        project_ids = rng.sample(["a", "b", "c", "d"], rng.randint(1, 4))
+        members = [(project_id, rng.choice(["v1", "v2"])) for project_id in project_ids]
+        _sync(federation, members, tables)
+
+        _assert_totals(federation.category_totals(), _fresh_totals(members, tables))
+        owned = {}
+        for global_id, (owner, _) in federation.owners.items():
+            owned[owner] = owned.get(owner, 0) + 1
+        assert {p: n for p, n in federation.contributed.items() if n} == owned
+
+
+def test_element_table_diff_and_round_trip(tmp_path):
+    before = _table([("w1", "IfcWall", 10.0), ("w2", "IfcWall", 5.0), ("s1", "IfcSlab", 20.0)])
+    after = _table([("w1", "IfcWall", 10.0), ("w2", "IfcWall", 6.0), ("b1", "IfcBeam", 0.0)])
+
+    assert before.diff(after) == (["b1"], ["w2"], ["s1"])
+    before.save(tmp_path / "table.json")
+    assert ElementTable.load(tmp_path / "table.json").rows == before.rows
+
+
+def test_element_tables_saved_without_measurement_sources_still_load(tmp_path):
+    (tmp_path / "table.json").write_text('{"w1": ["IfcWall", 10.0, 0.0]}')
+
+    table = ElementTable.load(tmp_path / "table.json")
+
+    assert table.rows == {"w1": ("IfcWall", 10.0, 0.0)}
+    assert table.geometry_fallback is False
+    assert table.shapes == {}
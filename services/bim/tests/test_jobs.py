@@ -0,0 +1,103 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+import jobs
+from jobs import JOB_FAILED, JOB_QUEUED, JobOwner, LocalJobQueue, QueueFullError, create_job_queue
+
+
+def test_local_queue_runs_jobs_through_the_handler():
+    async def scenario():
+        queue = LocalJobQueue(concurrency=2)
+        seen = []
+        done = asyncio.Event()
+
+        async def handler(job):
+            seen.append(job["id"])
+            if len(seen) == 3:
+                done.set()
+
+        await queue.start(handler)
+        for job_id in ("a", "b", "c"):
+            await queue.enqueue({"id": job_id})
+        await asyncio.wait_for(done.wait(), 5)
+        await queue.stop()
+        return seen
+
+    assert sorted(asyncio.run(scenario())) == ["a", "b", "c"]
+
+
+def test_local_queue_refuses_jobs_beyond_its_size():
+    async def scenario():
+        queue = LocalJobQueue(max_size=1)
+        await queue.enqueue({"id": "a"})
+        with pytest.raises(QueueFullError):
+            await queue.enqueue({"id": "b"})
+        return await queue.depth(), await queue.get_status("a")
+
+    depth, status = asyncio.run(scenario())
+    assert depth == 1
+    assert status["status"] == JOB_QUEUED
+
+
+def test_finished_jobs_are_dropped_from_local_status():
+    async def scenario():
+        queue = LocalJobQueue()
+        await queue.set_status("a", JOB_FAILED, 100, error="boom")
+        return await queue.get_status("a")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_job_queue("kafka", 1, 0)
+    with pytest.raises(ValueError):
+        create_job_queue("redis", 1, 0)
+
+
+def test_owner_is_alive_only_while_its_process_runs(tmp_path):
+    owner = JobOwner(tmp_path)
+    script = "import sys; sys.path.insert(0, sys.argv[1]); from pathlib import Path; from jobs import JobOwner; " \
+             "owner = JobOwner(Path(sys.argv[2])); print(owner.id, flush=True); sys.stdin.read()"
+    child = subprocess.Popen(
+        [sys.executable, "-c", script, os.path.dirname(jobs.__file__), str(tmp_path)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    other = child.stdout.readline().strip()
+
+    assert owner.is_alive(owner.id)
+    assert owner.is_alive(other)
+    assert not owner.is_alive(None)
+
+    child.kill()
+    child.wait()
+    assert not owner.is_alive(other)
+    owner.prune()
+    assert [p.name for p in tmp_path.glob("*.lock")] == [f"{owner.id}.lock"]
+    owner.close()
+
+
+def test_startup_requeues_jobs_of_exited_owners(main_module, monkeypatch, tmp_path):
+    queue = LocalJobQueue()
+    monkeypatch.setattr(main_module, "job_queue", queue)
+    model = tmp_path / "model.ifc"
+    model.write_text("ISO-10303-21;")
+    store = main_module.project_store
+    base = {"filename": "m.ifc", "uploaded_at": "2024-01-01T00:00:00", "progress": 0}
+    store.create({**base, "id": "lost", "file_path": str(model), "status": JOB_QUEUED, "worker": "gone"})
+    store.create({**base, "id": "missing", "file_path": str(tmp_path / "x.ifc"), "status": "parsing", "worker": "gone"})
+    store.create({**base, "id": "live", "file_path": str(model), "status": JOB_QUEUED,
+                  "worker": main_module.job_owner.id})
+
+    asyncio.run(main_module._recover_jobs())
+
+    assert asyncio.run(queue.depth()) == 1
+    assert store.get("lost")["worker"] == main_module.job_owner.id
+    assert store.get("missing")["status"] == JOB_FAILED
+    assert "lost" in store.get("missing")["error"]
+    for project_id in ("lost", "missing", "live"):
+        store.delete(project_id)
@@ -0,0 +1,94 @@
+import pytest
+
+import metrics
+from metrics import Counter, Family, Histogram, Registry
+
+
+def test_counter_renders_per_label_set():
+    registry = Registry()
+    counter = Counter("test_jobs_total", "Jobs", ("outcome",), registry=registry)
+    counter.inc(outcome="ok")
+    counter.inc(2, outcome="ok")
+    counter.inc(outcome='bad "quoted"\n')
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP test_jobs_total Jobs", "# TYPE test_jobs_total counter"]
+    assert 'test_jobs_total{outcome="ok"} 3' in lines
+    assert 'test_jobs_total{outcome="bad \\"quoted\\"\\n"} 1' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = Histogram("test_seconds", "Durations", buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    lines = registry.render().splitlines()
+
+    assert lines[2:] == [
+        'test_seconds_bucket{le="0.1"} 2',
+        'test_seconds_bucket{le="1"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        "test_seconds_sum 3.65",
+        "test_seconds_count 4",
+    ]
+
+
+def test_histogram_times_blocks_that_raise():
+    registry = Registry()
+    histogram = Histogram("test_stage_seconds", "Stages", ("stage",), registry=registry)
+    with pytest.raises(KeyError):
+        with histogram.time(stage="open"):
+            raise KeyError("missing")
+
+    assert 'test_stage_seconds_count{stage="open"} 1' in registry.render()
+
+
+def test_labels_and_names_are_checked():
+    registry = Registry()
+    counter = Counter("test_labelled_total", "Labelled", ("kind",), registry=registry)
+    with pytest.raises(ValueError):
+        counter.inc()
+    with pytest.raises(ValueError):
+        counter.inc(kind="a", other="b")
+    with pytest.raises(ValueError):
+        Counter("test_labelled_total", "Again", registry=registry)
+
+
+def test_captured_samples_are_replayed_not_recorded():
+    before = metrics.REGISTRY.render()
+
+    result, samples = metrics.run_captured(lambda: metrics.PARSES.inc(parser="test", outcome="ok") or 42)
+
+    assert result == 42
+    assert metrics.REGISTRY.render() == before
+    assert samples == [("counter", "bim_parses_total", ("test", "ok"), 1.0)]
+    metrics.REGISTRY.replay(samples)
+    assert 'bim_parses_total{parser="test",outcome="ok"} 1' in metrics.REGISTRY.render()
+
+
+def test_samples_travel_on_raised_errors():
+    def fail():
+        metrics.PRESCANS.inc(result="test-failure")
+        raise ValueError("bad model")
+
+    with pytest.raises(ValueError) as raised:
+        metrics.run_captured(fail)
+
+    assert metrics.raised_samples(raised.value) == [("counter", "bim_prescans_total", ("test-failure",), 1.0)]
+    assert metrics.raised_samples(ValueError()) == []
+
+
+def test_families_are_rendered_after_metrics():
+    registry = Registry()
+    Counter("test_first_total", "First", registry=registry).inc()
+    family = Family("test_queue_depth", "gauge", "Queued jobs", [({"queue": "parse"}, 3.0)])
+
+    lines = registry.render([family]).splitlines()
+
+    assert lines[-3:] == [
+        "# HELP test_queue_depth Queued jobs",
+        "# TYPE test_queue_depth gauge",
+        'test_queue_depth{queue="parse"} 3',
+    ]
@@ -0,0 +1,169 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionError
+from model_cache import ModelCache
+
+
+def _model_file(tmp_path, name="model.ifc", size=100):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_opening_a_model_holds_a_budget_reservation(tmp_path):
+    path = _model_file(tmp_path)
+    seen = []
+
+    async def scenario():
+        cache = None
+        admission = AdmissionController(10_000, held_bytes=lambda: cache.loaded_bytes)
+
+        def opener(file_path):
+            seen.append((admission.reserved_bytes, cache.loaded_bytes))
+            return file_path
+
+        cache = ModelCache(10_000, memory_factor=10, opener=opener, reserve=admission.reserve)
+        await cache.run("p", path, lambda model: None)
+        return admission.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert seen == [(1000, 0)]
+    assert stats["reserved_bytes"] == 0
+    assert stats["held_bytes"] == 1000
+
+
+def test_open_refused_by_the_budget_is_not_cached(tmp_path):
+    path = _model_file(tmp_path)
+
+    async def scenario():
+        admission = AdmissionController(1500)
+        cache = ModelCache(10_000, memory_factor=10, opener=str, reserve=admission.reserve)
+        async with admission.reserve(1000):
+            with pytest.raises(AdmissionError):
+                await cache.run("p", path, lambda model: None)
+        assert cache.stats()["models"] == 0
+        return await cache.run("p", path, lambda model: model)
+
+    assert asyncio.run(scenario()) == str(path)
+
+
+class _Opener:
+    def __init__(self, delay=0.0):
+        self.opened = []
+        self.delay = delay
+
+    def __call__(self, file_path):
+        time.sleep(self.delay)
+        self.opened.append(file_path)
+        return {"path": file_path}
+
+
+def test_concurrent_queries_share_one_open(tmp_path):
+    path = _model_file(tmp_path)
+    opener = _Opener(delay=0.05)
+
+    async def scenario():
+        cache = ModelCache(10_000, opener=opener)
+        results = await asyncio.gather(*(cache.run("p", path, lambda model: model["path"]) for _ in range(4)))
+        await cache.run("p", path, lambda model: None)
+        return results, cache.stats()
+
+    results, stats = asyncio.run(scenario())
+
+    assert results == [str(path)] * 4
+    assert opener.opened == [str(path)]
+    assert stats["misses"] == 1
+    assert stats["hits"] == 4
+    assert stats["pinned"] == 0
+
+
+def test_least_recently_used_models_are_evicted(tmp_path):
+    paths = {key: _model_file(tmp_path, f"{key}.ifc") for key in "abc"}
+    opener = _Opener()
+
+    async def scenario():
+        cache = ModelCache(2000, memory_factor=10, opener=opener)
+        for key in "aba":
+            await cache.run(key, paths[key], lambda model: None)
+        await cache.run("c", paths["c"], lambda model: None)
+        await cache.run("a", paths["a"], lambda model: None)
+        return cache.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert [path.rsplit("/", 1)[1] for path in opener.opened] == ["a.ifc", "b.ifc", "c.ifc"]
+    assert stats["evictions"] == 1
+    assert stats["models"] == 2
+
+
+def test_pinned_models_are_not_evicted(tmp_path):
+    big = _model_file(tmp_path, "big.ifc", size=300)
+    small = _model_file(tmp_path, "small.ifc")
+
+    async def scenario():
+        cache = ModelCache(2000, memory_factor=10, opener=_Opener())
+        # A model larger than the budget is used, then dropped
+        await cache.run("big", big, lambda model: None)
+        assert cache.stats()["models"] == 0
+
+        # "small" stays pinned while "big" pushes the cache over budget
+        query = asyncio.ensure_future(cache.run("small", small, lambda model: time.sleep(0.1)))
+        await asyncio.sleep(0.02)
+        await cache.run("big", big, lambda model: None)
+        assert cache.stats()["models"] == 1
+        await query
+        return cache.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["models"] == 1
+    assert stats["pinned"] == 0
+
+
+def test_new_revision_reopens_and_failures_are_not_cached(tmp_path):
+    first = _model_file(tmp_path, "r1.ifc")
+    second = _model_file(tmp_path, "r2.ifc")
+    opener = _Opener()
+    failing = [True]
+
+    def flaky(file_path):
+        if failing:
+            failing.pop()
+            raise RuntimeError("not a model")
+        return opener(file_path)
+
+    async def scenario():
+        cache = ModelCache(10_000, opener=flaky)
+        with pytest.raises(RuntimeError):
+            await cache.run("p", first, lambda model: None)
+        assert cache.stats()["models"] == 0
+        await cache.run("p", first, lambda model: None)
+        return await cache.run("p", second, lambda model: model["path"])
+
+    assert asyncio.run(scenario()) == str(second)
+    assert opener.opened == [str(first), str(second)]
+
+
+def test_warm_opens_models_that_fit(tmp_path):
+    small = _model_file(tmp_path, "small.ifc")
+    big = _model_file(tmp_path, "big.ifc", size=10_000)
+    opener = _Opener()
+
+    async def scenario():
+        cache = ModelCache(10_000, opener=opener)
+        cache.warm("small", small)
+        cache.warm("big", big)
+        await asyncio.sleep(0.05)
+        await cache.run("small", small, lambda model: None)
+        stats = cache.stats()
+        await cache.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+
+    assert opener.opened == [str(small)]
+    assert stats["hits"] == 1
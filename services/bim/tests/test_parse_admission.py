@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+
+def _scope(path="/upload/batch", method="POST"):
+    return {
+        "type": "http", "method": method, "path": path, "headers": [(b"x-client-id", b"tester")],
+        "query_string": b"", "client": ("127.0.0.1", 1),
+    }
+
+
+async def _call(main_module, inner, scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await main_module._LimitParseRequests(inner)(scope, receive, send)
+    return sent
+
+
+def _run(main_module, inner, scope):
+    return asyncio.run(_call(main_module, inner, scope))
+
+
+def test_slot_is_held_while_the_response_is_sent(main_module):
+    seen = []
+
+    async def inner(scope, receive, send):
+        seen.append(main_module.admission.stats()["clients_in_flight"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        seen.append(main_module.admission.stats()["clients_in_flight"])
+        await send({"type": "http.response.body", "body": b""})
+
+    _run(main_module, inner, _scope())
+
+    assert seen == [1, 1]
+    assert main_module.admission.stats()["clients_in_flight"] == 0
+
+
+def test_slot_is_released_when_the_request_ends_before_its_body(main_module):
+    async def disconnected(scope, receive, send):
+        await receive()
+        raise OSError("client went away")
+
+    with pytest.raises(OSError):
+        _run(main_module, disconnected, _scope())
+
+    assert main_module.admission.stats()["clients_in_flight"] == 0
+
+
+def test_busy_client_is_refused_without_reaching_the_app(main_module, monkeypatch):
+    monkeypatch.setattr(main_module.admission, "client_concurrency", 1)
+    reached = []
+
+    async def inner(scope, receive, send):
+        reached.append(scope["path"])
+        if scope["path"] == "/upload":
+            nested = await _call(main_module, inner, _scope("/upload/batch"))
+            reached.extend(m["status"] for m in nested if "status" in m)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = _run(main_module, inner, _scope("/upload"))
+
+    assert reached == ["/upload", 429]
+    assert sent[0]["status"] == 200
+    assert main_module.admission.stats()["clients_in_flight"] == 0
+
+
+def test_other_requests_pass_straight_through(main_module):
+    async def inner(scope, receive, send):
+        assert main_module.admission.stats()["clients_in_flight"] == 0
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    assert _run(main_module, inner, _scope("/projects", "GET"))[0]["status"] == 200
@@ -0,0 +1,82 @@
+import pytest
+
+from prescan import PrescanError, check_start, prescan
+
+_HEADER = (
+    "ISO-10303-21;\nHEADER;\n"
+    "FILE_DESCRIPTION(('ViewDefinition [CoordinationView]'),'2;1');\n"
+    "FILE_NAME('model.ifc','2024-01-01T00:00:00',(''),(''),'Exporter 1.0','Authoring Tool','');\n"
+    "FILE_SCHEMA(({schema}));\nENDSEC;\n"
+)
+_DATA = "DATA;\n#1=IFCPROJECT('0YvctVUKr0kugbFTf53O9L',$,'Project',$,$,$,$,$,$);\nENDSEC;\n"
+_END = "END-ISO-10303-21;\n"
+
+
+def _write(tmp_path, text, name="model.ifc"):
+    path = tmp_path / name
+    path.write_bytes(text.encode() if isinstance(text, str) else text)
+    return path
+
+
+def test_summary_of_a_valid_model(synthetic_model):
+    summary = prescan(synthetic_model)
+
+    assert summary["schema"] == "IFC4"
+    assert summary["file_name"] == "synthetic.ifc"
+    assert summary["authoring_tool"] == "InstallSure benchmarks"
+    assert summary["has_quantity_sets"] is True
+    assert summary["approx_entities"] > 1000
+    assert "IFCWALL" in summary["sample_types"]
+
+
+def test_schema_variants_map_to_their_family(tmp_path):
+    path = _write(tmp_path, _HEADER.format(schema="'IFC4X3_ADD2'") + _DATA + _END)
+
+    assert prescan(path)["schema"] == "IFC4X3"
+
+
+@pytest.mark.parametrize("text, reason", [
+    ("", "empty"),
+    ("<html>not a model</html>", "not_step"),
+    ("ISO-10303-21;\nDATA;\n", "bad_header"),
+    (_HEADER.format(schema="") + _DATA + _END, "missing_schema"),
+    (_HEADER.format(schema="'CIS2'") + _DATA + _END, "unsupported_schema"),
+    (_HEADER.format(schema="'IFC4'") + _DATA, "truncated"),
+    (_HEADER.format(schema="'IFC4'") + _END, "no_data"),
+    (_HEADER.format(schema="'IFC4'") + "DATA;\nENDSEC;\n" + _END, "no_entities"),
+])
+def test_rejections(tmp_path, text, reason):
+    with pytest.raises(PrescanError) as rejected:
+        prescan(_write(tmp_path, text))
+    assert rejected.value.reason == reason
+
+
+def test_leading_byte_order_mark_is_accepted(tmp_path):
+    path = _write(tmp_path, b"\xef\xbb\xbf" + (_HEADER.format(schema="'IFC2X3'") + _DATA + _END).encode())
+
+    assert prescan(path)["schema"] == "IFC2X3"
+
+
+def test_check_start_rejects_from_the_first_chunk():
+    with pytest.raises(PrescanError) as rejected:
+        check_start(b"PK\x03\x04 a zip archive")
+    assert rejected.value.reason == "not_step"
+
+    with pytest.raises(PrescanError) as rejected:
+        check_start(_HEADER.format(schema="'CIS2'").encode())
+    assert rejected.value.reason == "unsupported_schema"
+
+
+def test_check_start_waits_for_a_header_cut_short():
+    check_start(_HEADER.format(schema="'IFC4'").encode()[:40])
+    check_start(_HEADER.format(schema="'IFC4'").encode())
+
+
+def test_quantity_sets_are_unknown_when_the_sample_misses_them(tmp_path):
+    filler = "".join(f"#{i}=IFCCARTESIANPOINT((0.,0.,{i}.));\n" for i in range(2, 60000))
+    qset = "#60000=IFCELEMENTQUANTITY('1YvctVUKr0kugbFTf53O9L',$,'Qto',$,$,());\n"
+    big = _HEADER.format(schema="'IFC4'") + _DATA.replace("ENDSEC;\n", filler + qset + "ENDSEC;\n") + _END
+    small = _HEADER.format(schema="'IFC4'") + _DATA + _END
+
+    assert prescan(_write(tmp_path, big))["has_quantity_sets"] is None
+    assert prescan(_write(tmp_path, small, "small.ifc"))["has_quantity_sets"] is False
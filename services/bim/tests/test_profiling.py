@@ -0,0 +1,72 @@
+import time
+
+import profiling
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _outer():
+    _busy(0.2)
+
+
+def test_header_overrides_the_sample_rate():
+    assert profiling.should_profile("1", 0.0)
+    assert profiling.should_profile(" TRUE ", 0.0)
+    assert not profiling.should_profile("off", 1.0)
+    assert profiling.should_profile(None, 1.0)
+    assert not profiling.should_profile(None, 0.0)
+    # Unrecognised values fall back to sampling
+    assert not profiling.should_profile("maybe", 0.0)
+
+
+def test_capture_samples_the_running_thread(tmp_path):
+    path = tmp_path / "profiles" / "upload.folded"
+
+    with profiling.capture(path, interval=0.001) as session:
+        _outer()
+
+    lines = path.read_text().splitlines()
+    assert lines
+    assert any("_outer (test_profiling.py" in line and "_busy (test_profiling.py" in line for line in lines)
+    assert all(int(line.rpartition(" ")[2]) >= 1 for line in lines)
+    assert session.seconds >= 0.2
+    summary = session.summary()
+    busy = next(entry for entry in summary["functions"] if entry["function"].startswith("_busy "))
+    assert busy["self_s"] > 0.1
+    assert busy["cumulative_s"] >= busy["self_s"]
+    assert not list(tmp_path.glob("profiles/*.tmp"))
+
+
+def test_entity_timings_only_recorded_while_capturing(tmp_path):
+    profiling.record_entity("classify", "IfcWall", 1.0, 3)
+    assert not profiling.active()
+
+    with profiling.capture(tmp_path / "p.folded") as session:
+        assert profiling.active()
+        profiling.record_entity("scan", "IfcWall", 0.5, 10)
+        profiling.record_entity("measure", "IfcWall", 0.25, 10)
+        profiling.record_entity("scan", "IfcSlab", 1.0, 2)
+
+    assert not profiling.active()
+    entity_types = session.summary()["entity_types"]
+    assert [entry["entity_type"] for entry in entity_types] == ["IfcSlab", "IfcWall"]
+    assert entity_types[1] == {
+        "entity_type": "IfcWall", "count": 10, "seconds": 0.75, "stages": {"scan": 0.5, "measure": 0.25}
+    }
+
+
+def test_render_text_orders_by_cumulative_time(tmp_path):
+    path = tmp_path / "p.folded"
+    path.write_text("main;parse;open 300000\nmain;parse 100000\nmain;report 50000\n")
+
+    report = profiling.render_text(path)
+
+    lines = report.splitlines()
+    assert lines[0] == "0.450 s sampled in 3 distinct stacks"
+    functions = [line.split()[-1] for line in lines[3:]]
+    assert functions == ["main", "parse", "open", "report"]
+    assert lines[4].split()[:2] == ["0.4000", "0.1000"]
@@ -0,0 +1,143 @@
+import pytest
+
+from project_store import (
+    InvalidQueryError,
+    MemoryProjectStore,
+    ProjectQuery,
+    SQLiteProjectStore,
+    create_project_store,
+)
+
+
+def _record(index: int, cost=None, name=None):
+    record = {
+        "id": f"p{index:03d}",
+        "filename": f"model{index}.ifc",
+        "project_name": name,
+        # Timestamps repeat so that ties are broken by id
+        "uploaded_at": f"2024-01-{1 + index % 5:02d}T00:00:00",
+        "status": "completed" if cost is not None else "queued",
+    }
+    if cost is not None:
+        record["summary"] = {"total_cost": cost, "element_count": index}
+    return record
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def store(request, tmp_path):
+    store = SQLiteProjectStore(tmp_path / "projects.db") if request.param == "sqlite" else MemoryProjectStore()
+    for index in range(23):
+        cost = None if index % 7 == 0 else float(index % 4) * 100
+        name = None if index % 5 == 0 else f"Project {index % 3}"
+        store.create(_record(index, cost, name))
+    yield store
+    store.close()
+
+
+def _walk(store, **query):
+    pages, cursor = [], None
+    while True:
+        page, cursor = store.list_projects(ProjectQuery(cursor=cursor, fields=("id",), **query))
+        pages.append([row["id"] for row in page])
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("sort", ["uploaded_at", "total_cost", "project_name"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_keyset_pages_cover_every_project_once_in_order(store, sort, order):
+    pages = _walk(store, limit=4, sort=sort, order=order)
+    everything, _ = store.list_projects(ProjectQuery(limit=100, sort=sort, order=order, fields=("id",)))
+
+    assert [len(page) for page in pages[:-1]] == [4] * (len(pages) - 1)
+    assert [project_id for page in pages for project_id in page] == [row["id"] for row in everything]
+    assert len(everything) == 23
+
+
+def test_listing_orders_ties_by_id(store):
+    rows, _ = store.list_projects(ProjectQuery(limit=100, sort="total_cost", fields=("id", "total_cost")))
+    keys = [(-1 if row["total_cost"] is None else row["total_cost"], row["id"]) for row in rows]
+    assert keys == sorted(keys)
+
+
+def test_filters_apply_across_pages(store):
+    pages = _walk(store, limit=2, status="completed", min_cost=100)
+    ids = [project_id for page in pages for project_id in page]
+    expected = [f"p{i:03d}" for i in range(23) if i % 7 and i % 4 >= 1]
+    assert sorted(ids) == expected
+
+
+def test_last_page_has_no_cursor(store):
+    page, cursor = store.list_projects(ProjectQuery(limit=23))
+    assert len(page) == 23
+    assert cursor is None
+
+
+def test_cursor_is_bound_to_its_sort_order(store):
+    _, cursor = store.list_projects(ProjectQuery(limit=2, sort="total_cost"))
+    with pytest.raises(InvalidQueryError):
+        store.list_projects(ProjectQuery(limit=2, sort="total_cost", order="desc", cursor=cursor))
+    with pytest.raises(InvalidQueryError):
+        store.list_projects(ProjectQuery(limit=2, sort="uploaded_at", cursor=cursor))
+
+
+def test_malformed_cursor_is_rejected(store):
+    with pytest.raises(InvalidQueryError):
+        store.list_projects(ProjectQuery(cursor="not-a-cursor"))
+
+
+def test_unknown_sort_key_and_fields_are_rejected(store):
+    with pytest.raises(InvalidQueryError):
+        store.list_projects(ProjectQuery(sort="file_path"))
+    with pytest.raises(InvalidQueryError):
+        store.list_projects(ProjectQuery(fields=("id", "file_path")))
+
+
+def test_cursor_round_trips():
+    query = ProjectQuery(sort="total_cost", order="desc")
+    query.cursor = query.encode_cursor(250.0, "p007")
+    assert query.decode_cursor() == (250.0, "p007")
+
+
+def _full_record():
+    record = _record(1, cost=250.0, name="Tower")
+    record["file_hash"] = "abc123"
+    record["quantities"] = {"IfcWall": {"count": 2, "total_area": 30.5, "total_length": 0.0}}
+    record["errors"] = []
+    return record
+
+
+def test_sqlite_store_persists_across_reopen(tmp_path):
+    path = tmp_path / "projects.db"
+    store = SQLiteProjectStore(path)
+    store.create(_full_record())
+    store.update("p001", {"status": "completed", "processed_at": "2024-01-03T00:00:00", "warnings": ["late"]})
+    store.close()
+
+    reopened = SQLiteProjectStore(path)
+    record = reopened.get("p001")
+    assert record["project_name"] == "Tower"
+    assert record["status"] == "completed"
+    assert record["summary"] == {"total_cost": 250.0, "element_count": 1}
+    assert record["quantities"]["IfcWall"]["total_area"] == 30.5
+    assert record["errors"] == [] and record["warnings"] == ["late"]
+    assert "quantities" not in reopened.get("p001", include_quantities=False)
+    assert reopened.count() == 1
+    reopened.close()
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "memory"])
+def test_delete_removes_the_project(tmp_path, backend):
+    store = create_project_store(backend, tmp_path / "projects.db")
+    store.create(_full_record())
+    store.update("missing", {"status": "failed"})
+    store.delete("p001")
+
+    assert store.get("p001") is None
+    assert store.count() == 0
+    store.close()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_project_store("redis")
@@ -0,0 +1,111 @@
+import asyncio
+import os
+
+
+from reports import ReportCache, report_digest
+from worker_pool import PoolSaturatedError
+
+
+def _render(project_id, data, target):
+    with open(target, "w") as f:
+        f.write(f"{project_id} {data['project_name']}".ljust(100))
+    return target
+
+
+class _InlinePool:
+    """Runs jobs in-process, optionally turning the first few away"""
+
+    def __init__(self, saturated=0):
+        self.calls = 0
+        self.saturated = saturated
+
+    async def run(self, fn, *args):
+        if self.saturated:
+            self.saturated -= 1
+            raise PoolSaturatedError("full")
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return fn(*args)
+
+
+def _project(name, **extra):
+    return {"project_name": name, "summary": {"total_cost": 1.0}, "quantities": {}, **extra}
+
+
+def test_digest_covers_only_report_fields():
+    assert report_digest(_project("A")) == report_digest(_project("A", id="other", file_hash="x"))
+    assert report_digest(_project("A")) != report_digest(_project("B"))
+
+
+def test_repeat_requests_are_served_from_disk(tmp_path):
+    pool = _InlinePool()
+    cache = ReportCache(tmp_path, pool, _render)
+
+    async def twice():
+        return await cache.get("p1", _project("A")), await cache.get("p1", _project("A"))
+
+    (first, digest), (second, again) = asyncio.run(twice())
+
+    assert first == second == tmp_path / f"{digest}.pdf"
+    assert digest == again == report_digest(_project("A"))
+    assert pool.calls == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["disk_bytes"] == 100
+
+
+def test_concurrent_requests_share_one_render(tmp_path):
+    pool = _InlinePool(saturated=1)
+    cache = ReportCache(tmp_path, pool, _render)
+
+    async def burst():
+        return await asyncio.gather(*(cache.get("p1", _project("A")) for _ in range(5)))
+
+    results = asyncio.run(burst())
+
+    assert len(set(results)) == 1
+    assert pool.calls == 1
+    assert cache.stats()["renders"] == 1
+    assert cache.stats()["deduplicated"] == 4
+    assert cache.stats()["rendering"] == 0
+
+
+def test_render_errors_reach_every_waiter_and_are_retried(tmp_path):
+    failures = []
+
+    def flaky(project_id, data, target):
+        if not failures:
+            failures.append(project_id)
+            raise RuntimeError("renderer crashed")
+        return _render(project_id, data, target)
+
+    cache = ReportCache(tmp_path, _InlinePool(), flaky)
+
+    async def burst():
+        return await asyncio.gather(*(cache.get("p1", _project("A")) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    path, _ = asyncio.run(cache.get("p1", _project("A")))
+    assert path.exists()
+
+
+def test_least_recently_used_reports_are_evicted(tmp_path):
+    cache = ReportCache(tmp_path, _InlinePool(), _render, max_disk_bytes=250)
+
+    async def render_all():
+        a, _ = await cache.get("p", _project("A"))
+        b, _ = await cache.get("p", _project("B"))
+        os.utime(a, (1, 1))
+        os.utime(b, (2, 2))
+        await cache.get("p", _project("A"))
+        c, _ = await cache.get("p", _project("C"))
+        return a, b, c
+
+    a, b, c = asyncio.run(render_all())
+
+    assert a.exists() and c.exists()
+    assert not b.exists()
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["disk_bytes"] == 200
+    assert ReportCache(tmp_path, _InlinePool(), _render).stats()["disk_bytes"] == 200
@@ -0,0 +1,79 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from result_cache import ParseResultCache
+
+
+def test_results_are_keyed_by_file_and_cost_version(tmp_path):
+    cache = ParseResultCache(tmp_path)
+    cache.put(ParseResultCache.make_key("abc", "v1"), {"total": 1})
+
+    assert cache.get(ParseResultCache.make_key("abc", "v1")) == {"total": 1}
+    assert cache.get(ParseResultCache.make_key("abc", "v2")) is None
+    assert cache.get(ParseResultCache.make_key("def", "v1")) is None
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    ParseResultCache(tmp_path).put("abc-v1", {"total": 1})
+    cache = ParseResultCache(tmp_path, memory_entries=1)
+
+    assert cache.get("abc-v1") == {"total": 1}
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get("abc-v1") == {"total": 1}
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = ParseResultCache(tmp_path, memory_entries=0, max_disk_bytes=250)
+    payload = {"data": "x" * 100}
+    cache.put("first", payload)
+    cache.put("second", payload)
+    os.utime(tmp_path / "first.json", (0, 0))
+    os.utime(tmp_path / "second.json", (1, 1))
+
+    cache.put("third", payload)
+
+    assert cache.get("first") is None
+    assert cache.get("second") == payload
+    assert cache.get("third") == payload
+    assert cache.stats()["evictions"] == 1
+
+
+def test_unreadable_entries_are_discarded(tmp_path):
+    cache = ParseResultCache(tmp_path)
+    (tmp_path / "broken.json").write_text("{not json")
+
+    assert cache.get("broken") is None
+    assert not (tmp_path / "broken.json").exists()
+
+
+def test_geometry_results_are_kept_apart_from_streamed_ones(main_module, monkeypatch):
+    monkeypatch.setattr(main_module, "GEOMETRY_FALLBACK", False)
+    assert main_module._result_cache_key("abc", "v1", streamed=False) == main_module._result_cache_key(
+        "abc", "v1", streamed=True
+    )
+
+    monkeypatch.setattr(main_module, "GEOMETRY_FALLBACK", True)
+    full = main_module._result_cache_key("abc", "v1", streamed=False)
+    streamed = main_module._result_cache_key("abc", "v1", streamed=True)
+    assert full != streamed
+    assert streamed == ParseResultCache.make_key("abc", "v1")
+
+
+def test_concurrent_puts_of_one_key_all_succeed(tmp_path):
+    cache = ParseResultCache(tmp_path, memory_entries=0)
+    payload = {"data": "x" * 10000}
+    barrier = threading.Barrier(8)
+
+    def put():
+        barrier.wait()
+        for _ in range(10):
+            cache.put("same", payload)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for future in [pool.submit(put) for _ in range(8)]:
+            future.result()
+
+    assert cache.get("same") == payload
+    assert [p.name for p in tmp_path.iterdir()] == ["same.json"]
@@ -0,0 +1,90 @@
+import ifcopenshell
+import ifcopenshell.api
+import numpy as np
+import pytest
+
+from federation import ElementTable
+
+
+@pytest.fixture(scope="module")
+def wall_models(tmp_path_factory):
+    """Three walls without quantity sets, and a revision with one wall made taller"""
+    directory = tmp_path_factory.mktemp("walls")
+    model = ifcopenshell.file(schema="IFC4")
+    run = ifcopenshell.api.run
+    project = run("root.create_entity", model, ifc_class="IfcProject", name="Walls")
+    run("unit.assign_unit", model)
+    context = run("context.add_context", model, context_type="Model")
+    body = run(
+        "context.add_context", model, context_type="Model", context_identifier="Body",
+        target_view="MODEL_VIEW", parent=context,
+    )
+    storey = run("root.create_entity", model, ifc_class="IfcBuildingStorey")
+    run("aggregate.assign_object", model, relating_object=project, products=[storey])
+    for i in range(3):
+        wall = run("root.create_entity", model, ifc_class="IfcWall")
+        representation = run(
+            "geometry.add_wall_representation", model, context=body, length=5.0, height=3.0, thickness=0.2
+        )
+        run("geometry.assign_representation", model, product=wall, representation=representation)
+        run("geometry.edit_object_placement", model, product=wall, matrix=np.eye(4))
+        run("spatial.assign_container", model, relating_structure=storey, products=[wall])
+    model.write(str(directory / "r1.ifc"))
+
+    changed = model.by_type("IfcWall")[0]
+    for item in model.traverse(changed.Representation):
+        if item.is_a("IfcExtrudedAreaSolid"):
+            item.Depth *= 1.5
+    model.write(str(directory / "r2.ifc"))
+    return directory, changed.GlobalId
+
+
+def _outputs(directory, name):
+    return {
+        "quantity_index_path": directory / f"{name}.json",
+        "element_table_path": directory / f"{name}.elements.json",
+        "takeoff_path": directory / f"{name}.takeoff",
+        "spatial_index_path": directory / f"{name}.spatial.json",
+    }
+
+
+def _revise(main_module, directory, previous, current):
+    paths = _outputs(directory, current)
+    return main_module._revision_job(
+        str(directory / f"{previous}.elements.json"), str(paths["element_table_path"]), "Walls",
+        str(directory / f"{current}.ifc"), str(paths["quantity_index_path"]), str(paths["takeoff_path"]),
+        str(paths["spatial_index_path"]),
+    )
+
+
+def test_revisions_are_measured_like_the_previous_revision(main_module, wall_models, tmp_path):
+    directory, changed = wall_models
+    processor = main_module.bim_processor
+    # A streamed previous revision keeps the revision streamed
+    processor.parse_ifc_streaming(directory / "r1.ifc", **_outputs(tmp_path, "r1"))
+    (tmp_path / "r2.ifc").write_bytes((directory / "r2.ifc").read_bytes())
+
+    revision = _revise(main_module, tmp_path, "r1", "r2")
+
+    assert revision["geometry_fallback"] is False
+    assert revision["diff"]["changed"] == []
+
+
+def test_only_changed_shapes_are_measured_again(main_module, wall_models, tmp_path):
+    directory, changed = wall_models
+    processor = main_module.bim_processor
+    for name in ("r1", "r2"):
+        (tmp_path / f"{name}.ifc").write_bytes((directory / f"{name}.ifc").read_bytes())
+    # Measure the first revision from geometry, as an upload with geometry fallback would
+    processor.parse_ifc(tmp_path / "r1.ifc", previous=ElementTable(geometry_fallback=True), **_outputs(tmp_path, "r1"))
+    previous = ElementTable.load(tmp_path / "r1.elements.json")
+    assert previous.geometry_fallback and len(previous.shapes) == 3
+
+    revision = _revise(main_module, tmp_path, "r1", "r2")
+
+    assert revision["geometry_fallback"] is True
+    assert revision["diff"]["changed"] == [changed]
+    assert revision["diff"]["unchanged"] == 2
+    assert revision["result"]["geometry"]["unchanged"] == 2
+    current = ElementTable.load(tmp_path / "r2.elements.json")
+    assert current.rows[changed][1] == pytest.approx(previous.rows[changed][1] * 1.5, rel=0.01)
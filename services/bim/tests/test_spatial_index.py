@@ -0,0 +1,117 @@
+import pytest
+
+import cost_engine
+from spatial_index import SpatialIndex
+from takeoff import TakeoffBuilder, TakeoffTable, location_names, resolve_locations, resolve_zones
+
+# Entity id -> (IFC class, GlobalId, name): two buildings with a "Level 1" each
+SPATIAL = {
+    1: ("IfcSite", "site", "Site"),
+    2: ("IfcBuilding", "b-north", "North"),
+    3: ("IfcBuilding", "b-south", "South"),
+    4: ("IfcBuildingStorey", "n-1", "Level 1"),
+    5: ("IfcBuildingStorey", "s-1", "Level 1"),
+    6: ("IfcSpace", "office", "Office"),
+    7: ("IfcSpace", "lobby", None),
+}
+AGGREGATES = [(1, [2, 3]), (2, [4]), (3, [5]), (4, [6, 7])]
+# Zone id -> (GlobalId, name); zone 21 groups zone 20
+ZONES = {20: ("z-work", "Work"), 21: ("z-all", "Everything")}
+GROUPS = [(20, [6]), (21, [20, 7])]
+
+
+def _rates():
+    return cost_engine.RateTable(
+        {
+            "IfcWall": {"unit": "m2", "material_cost": 10.0, "labor_cost": 5.0},
+            "IfcColumn": {"unit": "m", "material_cost": 100.0, "labor_cost": 0.0},
+        },
+        area_based=["IfcWall"],
+        length_based=["IfcColumn"],
+    )
+
+
+def test_locations_follow_the_aggregation_chain():
+    # Walls 100 and 101 sit in spaces, 102 in the southern storey; 103 is a
+    # part of 100; 104 is contained in the site
+    contained = [(6, [100]), (7, [101]), (5, [102]), (1, [104])]
+    locations = resolve_locations(SPATIAL, contained, AGGREGATES + [(100, [103])])
+
+    assert locations[100] == ("b-north", "n-1", "office")
+    assert locations[101] == ("b-north", "n-1", "lobby")
+    assert locations[102] == ("b-south", "s-1", None)
+    assert locations[103] == locations[100]
+    assert locations[104] == (None, "site", None)
+
+    assert resolve_zones(SPATIAL, ZONES, GROUPS) == {"office": ["z-work", "z-all"], "lobby": ["z-all"]}
+    assert location_names(SPATIAL, ZONES)["lobby"] == "#7"
+
+
+@pytest.fixture
+def index(tmp_path):
+    contained = [(6, [100]), (7, [101]), (5, [102, 103])]
+    locations = resolve_locations(SPATIAL, contained, AGGREGATES)
+    builder = TakeoffBuilder(resolve_zones(SPATIAL, ZONES, GROUPS), location_names(SPATIAL, ZONES))
+    builder.add("w100", "IfcWall", "IfcWall", locations[100], 10.0, 0.0)
+    builder.add("w101", "IfcWall", "IfcWall", locations[101], 20.0, 0.0)
+    builder.add("w102", "IfcWall", "IfcWall", locations[102], 30.0, 0.0)
+    builder.add("c103", "IfcColumn", "IfcColumn", locations[103], 0.0, 3.0)
+    path = tmp_path / "model.takeoff"
+    builder.save(path, _rates(), {"cost_database_version": "v1"})
+    return SpatialIndex.from_takeoff(TakeoffTable(path))
+
+
+def test_same_named_storeys_are_totalled_apart(index):
+    storeys = index.groups("storey")
+
+    assert set(storeys) == {"n-1", "s-1"}
+    assert storeys["n-1"]["name"] == storeys["s-1"]["name"] == "Level 1"
+    assert storeys["n-1"]["element_count"] == 2
+    assert storeys["n-1"]["total_cost"] == 450.0
+    assert storeys["s-1"]["by_category"] == {
+        "IfcWall": {
+            "count": 1, "total_area": 30.0, "total_length": 0.0,
+            "material_cost": 300.0, "labor_cost": 150.0, "total_cost": 450.0,
+        },
+        "IfcColumn": {
+            "count": 1, "total_area": 0.0, "total_length": 3.0,
+            "material_cost": 300.0, "labor_cost": 0.0, "total_cost": 300.0,
+        },
+    }
+    assert len(index.find("storey", name="Level 1")) == 2
+    assert list(index.find("storey", name="Level 1", group_id="s-1")) == ["s-1"]
+
+
+def test_levels_add_up_to_the_project_total(index):
+    for level in ("building", "storey", "space"):
+        groups = index.groups(level).values()
+        unassigned = index.unassigned.get(level, {"total_cost": 0.0, "element_count": 0})
+        assert sum(group["total_cost"] for group in groups) + unassigned["total_cost"] == 1200.0
+        assert sum(group["element_count"] for group in groups) + unassigned["element_count"] == 4
+    assert index.unassigned["space"]["element_count"] == 2
+
+
+def test_zones_sum_their_spaces(index):
+    zones = index.groups("zone")
+
+    assert list(zones) == ["z-all", "z-work"]
+    assert zones["z-work"]["name"] == "Work"
+    assert zones["z-work"]["total_cost"] == 150.0
+    assert zones["z-all"]["total_cost"] == 450.0
+    assert zones["z-all"]["element_count"] == 2
+
+
+def test_rows_and_round_trip(index, tmp_path):
+    rows = list(index.rows("building", name="South"))
+    assert [(row["id"], row["category"], row["count"]) for row in rows] == [
+        ("b-south", "IfcColumn", 1), ("b-south", "IfcWall", 1)
+    ]
+    with pytest.raises(ValueError):
+        index.groups("floor")
+
+    path = tmp_path / "model.spatial.json"
+    index.save(path)
+    loaded = SpatialIndex.load(path)
+    assert loaded.levels == index.levels
+    assert loaded.unassigned == index.unassigned
+    assert loaded.meta == {"cost_database_version": "v1"}
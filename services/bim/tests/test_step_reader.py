@@ -0,0 +1,101 @@
+import ifcopenshell
+import pytest
+
+from federation import ElementTable
+from spatial_index import SpatialIndex
+from step_reader import StepStreamReader, StepSyntaxError
+
+_TRICKY = b"""ISO-10303-21;
+HEADER;
+FILE_DESCRIPTION(('ViewDefinition [CoordinationView]'),'2;1');
+FILE_NAME('tricky.ifc','2024-01-01T00:00:00',(''),(''),'','','');
+FILE_SCHEMA(('IFC4'));
+ENDSEC;
+DATA;
+/* #9=IFCWALL('commented out',$,$,$,$,$,$,$,$); */
+#1=IFCPROJECT('0YvctVUKr0kugbFTf53O9L',$,'It''s ;#12=IFCWALL(',$,$,$,$,$,$);
+#2=IFCWALL('1YvctVUKr0kugbFTf53O9L',$,'W/1',/* ; ' */'desc',$,$,$,$,$); /* trailing */
+#3 = IFCSLAB ( '2YvctVUKr0kugbFTf53O9L' , $ , 'S' , $ , $ , $ , $ , $ , $ ) ;
+ENDSEC;
+END-ISO-10303-21;
+"""
+
+
+def _records(path, types=None):
+    with StepStreamReader(path) as reader:
+        return list(reader.records(types))
+
+
+def test_records_match_ifcopenshell(synthetic_model):
+    model = ifcopenshell.open(str(synthetic_model))
+    expected = {entity.id(): entity.is_a().upper() for entity in model}
+
+    records = _records(synthetic_model)
+
+    assert {entity_id: ifc_type for entity_id, ifc_type, _ in records} == expected
+    with StepStreamReader(synthetic_model) as reader:
+        assert reader.schema == "IFC4"
+
+
+def test_only_wanted_types_are_decoded(synthetic_model):
+    model = ifcopenshell.open(str(synthetic_model))
+    walls = {wall.id(): wall.GlobalId for wall in model.by_type("IfcWall", include_subtypes=False)}
+
+    records = _records(synthetic_model, {"IFCWALL"})
+
+    assert {entity_id: args[0] for entity_id, _, args in records} == walls
+
+
+def test_strings_and_comments_are_not_records(tmp_path):
+    path = tmp_path / "tricky.ifc"
+    path.write_bytes(_TRICKY)
+
+    records = _records(path)
+
+    assert [(entity_id, ifc_type) for entity_id, ifc_type, _ in records] == [
+        (1, "IFCPROJECT"), (2, "IFCWALL"), (3, "IFCSLAB")
+    ]
+    assert records[0][2][2] == "It's ;#12=IFCWALL("
+    assert records[1][2][2:4] == ["W/1", "desc"]
+    assert [ifc_type for _, ifc_type, _ in _records(path, {"IFCWALL"})] == ["IFCWALL"]
+
+
+def test_unterminated_record_is_an_error(tmp_path):
+    path = tmp_path / "broken.ifc"
+    path.write_bytes(b"ISO-10303-21;\nHEADER;\nENDSEC;\nDATA;\n#1=IFCWALL('open,$;\nENDSEC;\n")
+
+    with pytest.raises(StepSyntaxError):
+        _records(path)
+
+
+def _parse_outputs(parse, model, directory):
+    result = parse(
+        model,
+        element_table_path=directory / "elements.json",
+        takeoff_path=directory / "takeoff",
+        spatial_index_path=directory / "spatial.json",
+    )
+    return result, ElementTable.load(directory / "elements.json"), SpatialIndex.load(directory / "spatial.json")
+
+
+def test_streaming_parse_matches_full_parse(main_module, synthetic_model, tmp_path):
+    processor = main_module.bim_processor
+    (tmp_path / "full").mkdir()
+    (tmp_path / "streamed").mkdir()
+
+    full, full_elements, full_index = _parse_outputs(processor.parse_ifc, synthetic_model, tmp_path / "full")
+    streamed, streamed_elements, streamed_index = _parse_outputs(
+        processor.parse_ifc_streaming, synthetic_model, tmp_path / "streamed"
+    )
+
+    assert streamed["project_name"] == full["project_name"]
+    assert streamed["quantities"] == full["quantities"]
+    assert streamed["summary"] == full["summary"]
+    assert streamed_elements.rows == full_elements.rows
+    # Rows are summed in a different order, so rounded totals may differ by a cent
+    for level, groups in full_index.levels.items():
+        assert streamed_index.levels[level].keys() == groups.keys()
+        for key, entry in groups.items():
+            other = streamed_index.levels[level][key]
+            assert (other["name"], other["element_count"]) == (entry["name"], entry["element_count"])
+            assert other["total_cost"] == pytest.approx(entry["total_cost"], abs=0.02)
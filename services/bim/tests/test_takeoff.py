@@ -0,0 +1,144 @@
+import json
+
+import numpy as np
+import pytest
+
+import cost_engine
+import takeoff
+from takeoff import COLUMNS, TakeoffBuilder, TakeoffTable, reprice
+
+
+def _rates(wall_material=10.0):
+    return cost_engine.RateTable(
+        {
+            "IfcWall": {"unit": "m2", "material_cost": wall_material, "labor_cost": 5.0},
+            "IfcBeam": {"unit": "m", "material_cost": 20.0, "labor_cost": 2.0},
+        },
+        area_based=["IfcWall"],
+        length_based=["IfcBeam"],
+    )
+
+
+def _build(rows):
+    builder = TakeoffBuilder(zones={"sp1": ["z1"]}, names={"b1": "Main", "st1": "Level 1", "sp1": "Office"})
+    for number in range(rows):
+        wall = number % 3 != 0
+        builder.add(
+            f"GID{number:08d}",
+            "IfcWall" if wall else "IfcBeam",
+            "IfcWall" if wall else "IfcBeam",
+            ("b1", "st1", "sp1" if number % 2 else None),
+            12.5 if wall else 0.0,
+            0.0 if wall else 4.0,
+        )
+    return builder
+
+
+def test_round_trip_with_rows_spanning_several_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(takeoff, "BLOCK_ROWS", 7)
+    path = tmp_path / "model.takeoff"
+    _build(50).save(path, _rates(), {"cost_database_version": "v1"})
+
+    table = TakeoffTable(path)
+    assert len(table) == 50
+    assert table.meta["cost_database_version"] == "v1"
+    assert table.meta["zones"] == {"sp1": ["z1"]}
+
+    rows = list(table.iter_rows(table.select(), COLUMNS, chunk_rows=9))
+    records = [dict(zip(COLUMNS, row)) for chunk in rows for row in chunk]
+    assert [record["global_id"] for record in records] == [f"GID{n:08d}" for n in range(50)]
+    assert records[1] == {
+        "global_id": "GID00000001", "ifc_class": "IfcWall", "category": "IfcWall",
+        "building": "Main", "storey": "Level 1", "space": "Office",
+        "area": 12.5, "length": 0.0, "material_cost": 125.0, "labor_cost": 62.5,
+    }
+    assert records[0]["space"] is None
+    assert records[0]["material_cost"] == 80.0
+
+
+def test_select_filters_and_take_reads_scattered_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(takeoff, "BLOCK_ROWS", 4)
+    path = tmp_path / "model.takeoff"
+    _build(30).save(path, _rates(), {})
+    table = TakeoffTable(path)
+
+    beams = table.select({"ifc_class": ["IfcBeam"]})
+    assert beams.tolist() == list(range(0, 30, 3))
+    in_office = table.select({"space": ["Office"], "category": ["IfcWall"]})
+    assert all(n % 2 and n % 3 for n in in_office.tolist())
+
+    scattered = np.array([29, 0, 13, 14, 3])
+    fresh = TakeoffTable(path)
+    assert fresh.take("global_id", scattered).tolist() == [f"GID{n:08d}".encode() for n in scattered]
+    assert fresh.take("length", scattered).tolist() == table.column("length")[scattered].tolist()
+
+    with pytest.raises(ValueError):
+        table.select({"area": ["1"]})
+    with pytest.raises(ValueError):
+        next(table.iter_rows(beams, ["volume"]))
+
+
+def test_columns_are_compressed(tmp_path):
+    path = tmp_path / "model.takeoff"
+    _build(20_000).save(path, _rates(), {})
+
+    table = TakeoffTable(path)
+    raw = sum(table.column(name).nbytes for name in COLUMNS)
+    assert path.stat().st_size < raw / 4
+
+
+def test_empty_table(tmp_path):
+    path = tmp_path / "model.takeoff"
+    _build(0).save(path, _rates(), {})
+
+    table = TakeoffTable(path)
+    assert len(table) == 0
+    assert table.select({"ifc_class": ["IfcWall"]}).tolist() == []
+    assert list(table.iter_rows(table.select())) == []
+
+
+def test_reprice_keeps_measurements(tmp_path):
+    path = tmp_path / "model.takeoff"
+    _build(10).save(path, _rates(), {"cost_database_version": "v1"})
+
+    table = reprice(path, _rates(wall_material=30.0), {"cost_database_version": "v2"})
+    assert table.meta["cost_database_version"] == "v2"
+    assert table.meta["names"]["sp1"] == "Office"
+    assert table.column("area")[1] == 12.5
+    assert table.column("material_cost")[1] == 375.0
+    assert table.column("material_cost")[0] == 80.0
+
+
+def test_reads_uncompressed_tables(tmp_path):
+    """Tables written before compression are memory-mapped as they are"""
+    global_ids = np.array([b"A1", b"B2"], dtype="S2")
+    codes = np.array([0, 1], dtype="<u2")
+    areas = np.array([1.5, 2.5], dtype="<f8")
+    arrays = {"global_id": global_ids, "ifc_class": codes, "area": areas}
+    columns, offset = {}, 0
+    for name, array in arrays.items():
+        columns[name] = {"dtype": array.dtype.str, "offset": offset}
+        offset += -(-array.nbytes // 64) * 64
+    header = json.dumps({
+        "rows": 2, "columns": columns, "vocabularies": {"ifc_class": ["IfcBeam", "IfcWall"]}, "meta": {}
+    }).encode()
+    data_start = -(-(16 + len(header)) // 64) * 64
+    path = tmp_path / "legacy.takeoff"
+    with open(path, "wb") as f:
+        f.write(b"BIMTAKE1" + len(header).to_bytes(8, "little") + header)
+        for name, array in arrays.items():
+            f.seek(data_start + columns[name]["offset"])
+            f.write(array.tobytes())
+
+    table = TakeoffTable(path)
+    assert table.select({"ifc_class": ["IfcWall"]}).tolist() == [1]
+    assert list(table.iter_rows(np.arange(2), ["global_id", "ifc_class", "area"])) == [
+        [("A1", "IfcBeam", 1.5), ("B2", "IfcWall", 2.5)]
+    ]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "model.takeoff"
+    path.write_bytes(b"not a table")
+    with pytest.raises(ValueError):
+        TakeoffTable(path)
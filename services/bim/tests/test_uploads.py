@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import zipfile
+
+import pytest
+
+from uploads import (
+    UploadFormError, UploadTooLargeError, check_content_length, extract_ifc_archive, receive_upload, receive_uploads,
+)
+
+BOUNDARY = "b0undary"
+HEADERS = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+
+def _part(field, filename, data):
+    return (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n\r\n"
+    ).encode() + data + b"\r\n"
+
+
+def _form(*parts):
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def _chunks(body, size=1000):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def _receive(body, dest_dir, max_bytes=0, **kwargs):
+    return asyncio.run(receive_upload(HEADERS, _chunks(body), lambda name: dest_dir / name, max_bytes, **kwargs))
+
+
+def test_file_field_is_stored_and_hashed(tmp_path):
+    data = b"ISO-10303-21;" + bytes(range(256)) * 40
+    body = _form(b"--" + BOUNDARY.encode() + b"\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhi\r\n",
+                 _part("file", "model.ifc", data))
+
+    name, stored = _receive(body, tmp_path, chunk_size=512)
+
+    assert name == "model.ifc"
+    assert stored.path.read_bytes() == data
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert stored.size == len(data)
+
+
+def test_oversized_file_leaves_nothing_behind(tmp_path):
+    with pytest.raises(UploadTooLargeError):
+        _receive(_form(_part("file", "model.ifc", b"x" * 5000)), tmp_path, max_bytes=4000)
+
+    assert not (tmp_path / "model.ifc").exists()
+    assert list((tmp_path / ".incoming").iterdir()) == []
+
+
+def test_start_check_refuses_a_file_before_it_is_written(tmp_path):
+    def check_start(chunk):
+        raise ValueError("not a model")
+
+    with pytest.raises(ValueError):
+        _receive(_form(_part("file", "model.ifc", b"junk")), tmp_path, check_start=check_start)
+    assert list((tmp_path / ".incoming").iterdir()) == []
+
+
+@pytest.mark.parametrize("headers, body", [
+    ({"content-type": "application/json"}, b"{}"),
+    (HEADERS, _form(_part("other", "model.ifc", b"data"))),
+])
+def test_bodies_without_the_file_are_form_errors(tmp_path, headers, body):
+    with pytest.raises(UploadFormError):
+        asyncio.run(receive_upload(headers, _chunks(body), lambda name: tmp_path / name, 0))
+
+
+def test_declared_length_is_checked_against_the_limit():
+    check_content_length({"content-length": "100"}, 1)
+    with pytest.raises(UploadTooLargeError):
+        check_content_length({"content-length": str(10 ** 9)}, 1024)
+
+
+def test_batch_stores_every_file_in_order(tmp_path):
+    body = _form(_part("files", "a.ifc", b"a" * 3000), _part("files", "b.ifc", b"b" * 10))
+
+    received = asyncio.run(receive_uploads(HEADERS, _chunks(body), lambda name: tmp_path / name, 0, 0))
+
+    assert [(name, stored.path.read_bytes()[:1], stored.size) for name, stored in received] == [
+        ("a.ifc", b"a", 3000), ("b.ifc", b"b", 10)
+    ]
+
+
+def test_batch_over_its_total_removes_the_files_already_stored(tmp_path):
+    body = _form(*(_part("files", f"{i}.ifc", b"x" * 3000) for i in range(4)))
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(receive_uploads(HEADERS, _chunks(body), lambda name: tmp_path / name, 4000, 10000))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".incoming"]
+    assert list((tmp_path / ".incoming").iterdir()) == []
+
+
+def test_archive_members_are_limited_by_their_decompressed_size(tmp_path):
+    archive = tmp_path / "models.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("a/small.ifc", b"s" * 10)
+        z.writestr("notes.txt", b"ignored")
+        z.writestr("large.ifc", b"\0" * 100000)
+    out = tmp_path / "out"
+    out.mkdir()
+
+    with pytest.raises(UploadTooLargeError):
+        extract_ifc_archive(archive, lambda name: out / name, 50000, 10)
+    assert sorted(p.name for p in out.iterdir()) == [".incoming"]
+
+    members = extract_ifc_archive(archive, lambda name: out / name, 0, 10)
+    assert [(name, stored.size) for name, stored in members] == [("small.ifc", 10), ("large.ifc", 100000)]
+    with pytest.raises(UploadTooLargeError):
+        extract_ifc_archive(archive, lambda name: out / name, 0, 1)
@@ -0,0 +1,69 @@
+import asyncio
+import operator
+import os
+import time
+
+import pytest
+
+import metrics
+from worker_pool import ParseWorkerPool, PoolSaturatedError
+
+
+def _timed_sleep(seconds):
+    with metrics.stage("worker-pool-test", "sleep"):
+        time.sleep(seconds)
+    return os.getpid()
+
+
+def _stage_count():
+    rendered = metrics.REGISTRY.render()
+    prefix = 'bim_stage_seconds_count{operation="worker-pool-test",stage="sleep"} '
+    for line in rendered.splitlines():
+        if line.startswith(prefix):
+            return int(line[len(prefix):])
+    return 0
+
+
+@pytest.fixture
+def pool():
+    pool = ParseWorkerPool(max_workers=1, max_queue_depth=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_jobs_in_another_process_and_keeps_their_metrics(pool):
+    before = _stage_count()
+
+    pid = asyncio.run(pool.run(_timed_sleep, 0))
+
+    assert pid != os.getpid()
+    assert _stage_count() == before + 1
+    assert pool.stats()["completed"] == 1
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_job_errors_are_raised_to_the_caller(pool):
+    with pytest.raises(ZeroDivisionError):
+        asyncio.run(pool.run(operator.truediv, 1, 0))
+
+    assert pool.stats()["failed"] == 1
+
+
+def test_rejects_jobs_beyond_the_queue_depth(pool):
+    async def burst():
+        return await asyncio.gather(*(pool.run(_timed_sleep, 0.5) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+
+    assert sum(isinstance(result, PoolSaturatedError) for result in results) == 1
+    assert sum(isinstance(result, int) for result in results) == 2
+    assert pool.stats()["rejected"] == 1
+
+
+def test_replaces_a_pool_whose_worker_died(pool):
+    with pytest.raises(RuntimeError):
+        asyncio.run(pool.run(os._exit, 1))
+
+    assert asyncio.run(pool.run(_timed_sleep, 0)) != os.getpid()
+    assert pool.stats()["failed"] == 1
+    assert pool.stats()["completed"] == 1
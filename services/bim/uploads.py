@@ -0,0 +1,345 @@
+"""Chunked, size-limited persistence of uploaded IFC files.
+
+Uploads are copied to disk through a fixed-size buffer while being hashed, so
+peak memory per upload is one chunk regardless of model size. The data is
+written to a temporary file next to the destination and renamed into place
+only once it is complete, so readers never see a partial model.
+
+``receive_upload`` reads a multipart body straight from the request stream
+instead of letting Starlette spool the whole form to a temporary file first,
+so the size limit and ``check_start`` act while the bytes arrive, chunked
+transfer encoding included; ``receive_uploads`` does the same for every file
+of a batch form, with a limit on the batch as a whole. ``check_content_length`` rejects a request
+whose declared length is already too large before any of it is read.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Callable, List, Mapping, Optional, Tuple, Union
+
+from fastapi import UploadFile
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+# Allowance for multipart boundaries and part headers around the file data
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured maximum size."""
+
+
+class UploadFormError(ValueError):
+    """Raised for a request body that is not a multipart form with the file."""
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    sha256: str
+    size: int
+
+
+def _write_chunk(fh, hasher, chunk: bytes) -> None:
+    fh.write(chunk)
+    hasher.update(chunk)
+
+
+def _too_large(max_bytes: int, name: str = "File") -> UploadTooLargeError:
+    return UploadTooLargeError(f"{name} exceeds the maximum upload size of {max_bytes // (1024 * 1024)} MB")
+
+
+class _IncomingFile:
+    """A temporary file beside ``dest_path``, size-limited and hashed as it is written"""
+
+    def __init__(self, dest_path: Path, max_bytes: int, check_start: Optional[Callable[[bytes], None]] = None):
+        self.dest_path = dest_path
+        self.max_bytes = max_bytes
+        self.check_start = check_start
+        incoming_dir = dest_path.parent / ".incoming"
+        incoming_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = incoming_dir / f"{uuid.uuid4().hex}.part"
+        self.fh = open(self.tmp_path, "wb")
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    async def write(self, chunk: bytes) -> None:
+        if self.size == 0 and self.check_start is not None:
+            self.check_start(chunk)
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise _too_large(self.max_bytes)
+        # Disk writes and hashing run off the event loop.
+        await asyncio.to_thread(_write_chunk, self.fh, self.hasher, chunk)
+
+    async def commit(self) -> StoredUpload:
+        await asyncio.to_thread(os.fsync, self.fh.fileno())
+        self.fh.close()
+        os.replace(self.tmp_path, self.dest_path)
+        return StoredUpload(path=self.dest_path, sha256=self.hasher.hexdigest(), size=self.size)
+
+    def discard(self) -> None:
+        self.fh.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+async def save_upload(
+    file: UploadFile,
+    dest_path: Path,
+    max_bytes: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    check_start: Optional[Callable[[bytes], None]] = None,
+) -> StoredUpload:
+    """Stream ``file`` to ``dest_path`` and return its size and SHA-256.
+
+    Raises ``UploadTooLargeError`` (leaving nothing on disk) once more than
+    ``max_bytes`` have been received. ``check_start`` is called with the
+    first chunk before anything is written; whatever it raises aborts the
+    upload the same way.
+    """
+    incoming = _IncomingFile(dest_path, max_bytes, check_start)
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            await incoming.write(chunk)
+        return await incoming.commit()
+    except BaseException:
+        incoming.discard()
+        raise
+
+
+def check_content_length(headers: Mapping[str, str], max_bytes: int) -> None:
+    """Reject a body whose declared length cannot fit ``max_bytes`` of file data"""
+    declared = headers.get("content-length")
+    if max_bytes and declared and declared.isdigit() and int(declared) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        raise _too_large(max_bytes)
+
+
+class _FilePartReader:
+    """Multipart parser callbacks that queue the file parts of one field
+
+    ``events`` receives, in order, each file's name as its part begins, its
+    data as ``bytes`` and ``None`` when the part ends.
+    """
+
+    def __init__(self, field: str, multiple: bool = False):
+        self.field = field
+        self.multiple = multiple
+        self.files = 0
+        self.events: List[Union[str, bytes, None]] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_field = False
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value_part,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self) -> None:
+        self._disposition = b""
+
+    def _header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _header_value_part(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        # Unless several files are wanted, only the first part of the field is taken
+        self._in_field = name == self.field and b"filename" in options and (self.multiple or not self.files)
+        if self._in_field:
+            self.files += 1
+            self.events.append(options[b"filename"].decode("utf-8", "replace"))
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self.events.append(data[start:end])
+
+    def _part_end(self) -> None:
+        if self._in_field:
+            self._in_field = False
+            self.events.append(None)
+
+
+async def _receive_files(
+    headers: Mapping[str, str],
+    body: AsyncIterator[bytes],
+    dest_path_for: Callable[[str], Path],
+    max_bytes: int,
+    max_total_bytes: int,
+    field: str,
+    multiple: bool,
+    chunk_size: int,
+    check_start: Optional[Callable[[bytes], None]],
+) -> List[Tuple[str, StoredUpload]]:
+    check_content_length(headers, max_total_bytes or max_bytes)
+    content_type, params = parse_options_header(headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadFormError("Expected a multipart/form-data body")
+
+    reader = _FilePartReader(field, multiple)
+    parser = MultipartParser(params[b"boundary"], reader.callbacks())
+    received: List[Tuple[str, StoredUpload]] = []
+    incoming: Optional[_IncomingFile] = None
+    filename = ""
+    buffered = bytearray()
+    total = 0
+    try:
+        async for data in body:
+            try:
+                parser.write(data)
+            except MultipartParseError as e:
+                raise UploadFormError(f"Malformed multipart body: {e}")
+            for event in reader.events:
+                if isinstance(event, str):
+                    filename = event
+                    incoming = _IncomingFile(dest_path_for(filename), max_bytes, check_start)
+                elif event is None:
+                    if buffered:
+                        await incoming.write(bytes(buffered))
+                        buffered.clear()
+                    received.append((filename, await incoming.commit()))
+                    incoming = None
+                else:
+                    total += len(event)
+                    if max_total_bytes and total > max_total_bytes:
+                        raise _too_large(max_total_bytes, "The upload")
+                    buffered += event
+                    if max_bytes and incoming.size + len(buffered) > max_bytes:
+                        raise _too_large(max_bytes)
+                    while len(buffered) >= chunk_size:
+                        await incoming.write(bytes(buffered[:chunk_size]))
+                        del buffered[:chunk_size]
+            reader.events.clear()
+        parser.finalize()
+        if not received:
+            raise UploadFormError(f"The form has no '{field}' file field")
+        return received
+    except BaseException:
+        if incoming is not None:
+            incoming.discard()
+        for _, stored in received:
+            stored.path.unlink(missing_ok=True)
+        raise
+
+
+async def receive_upload(
+    headers: Mapping[str, str],
+    body: AsyncIterator[bytes],
+    dest_path_for: Callable[[str], Path],
+    max_bytes: int,
+    field: str = "file",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    check_start: Optional[Callable[[bytes], None]] = None,
+) -> Tuple[str, StoredUpload]:
+    """Stream the ``field`` file of a multipart ``body`` to disk as it arrives.
+
+    ``dest_path_for`` maps the client's file name to the destination and may
+    raise to refuse it before any data is written. Data is written in
+    ``chunk_size`` blocks with the same limit and ``check_start`` as
+    ``save_upload``; a body declaring more than ``max_bytes`` is refused
+    before it is read. Raises ``UploadFormError`` when the body is not a
+    multipart form or has no such file. Returns the file name and the
+    stored upload.
+    """
+    received = await _receive_files(
+        headers, body, dest_path_for, max_bytes, 0, field, False, chunk_size, check_start
+    )
+    return received[0]
+
+
+async def receive_uploads(
+    headers: Mapping[str, str],
+    body: AsyncIterator[bytes],
+    dest_path_for: Callable[[str], Path],
+    max_bytes: int,
+    max_total_bytes: int,
+    field: str = "files",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> List[Tuple[str, StoredUpload]]:
+    """Stream every file of the ``field`` field of a multipart ``body`` to disk.
+
+    Like ``receive_upload``, with ``max_bytes`` applied to each file and
+    ``max_total_bytes`` to the file data of the whole body as it arrives.
+    Files already stored are removed when a later one fails. Returns
+    ``(name, stored)`` pairs in form order.
+    """
+    return await _receive_files(
+        headers, body, dest_path_for, max_bytes, max_total_bytes, field, True, chunk_size, None
+    )
+
+
+def extract_ifc_archive(
+    archive_path: Path,
+    dest_path_for: Callable[[str], Path],
+    max_member_bytes: int,
+    max_members: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> List[Tuple[str, StoredUpload]]:
+    """Extract the ``.ifc`` members of a zip archive, hashing each one.
+
+    ``dest_path_for`` maps a member's base name to its destination. Members
+    are copied through a fixed-size buffer with the same size limit as
+    single uploads (checked on the decompressed bytes, not the declared
+    size, so a zip bomb cannot get past it). Returns ``(name, stored)``
+    pairs in archive order.
+    """
+    extracted: List[Tuple[str, StoredUpload]] = []
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(".ifc")
+            ]
+            if len(members) > max_members:
+                raise UploadTooLargeError(f"Archive contains more than {max_members} IFC files")
+
+            for info in members:
+                name = Path(info.filename).name
+                dest_path = dest_path_for(name)
+                tmp_path = dest_path.parent / ".incoming" / f"{uuid.uuid4().hex}.part"
+                tmp_path.parent.mkdir(parents=True, exist_ok=True)
+                hasher = hashlib.sha256()
+                size = 0
+                try:
+                    with archive.open(info) as src, open(tmp_path, "wb") as fh:
+                        while True:
+                            chunk = src.read(chunk_size)
+                            if not chunk:
+                                break
+                            size += len(chunk)
+                            if max_member_bytes and size > max_member_bytes:
+                                raise _too_large(max_member_bytes, name)
+                            _write_chunk(fh, hasher, chunk)
+                    os.replace(tmp_path, dest_path)
+                except BaseException:
+                    tmp_path.unlink(missing_ok=True)
+                    raise
+                extracted.append((name, StoredUpload(path=dest_path, sha256=hasher.hexdigest(), size=size)))
+    except BaseException:
+        for _, stored in extracted:
+            stored.path.unlink(missing_ok=True)
+        raise
+    return extracted
@@ -0,0 +1,140 @@
+"""Process-pool worker tier for CPU-bound IFC processing.
+
+``ifcopenshell.open`` and the quantity walk hold the GIL for the whole parse,
+so running them on the event loop (or in a thread) stalls every other request.
+``ParseWorkerPool`` pushes that work into separate processes and keeps the
+number of queued jobs bounded so a burst of uploads is rejected up front
+instead of piling up in memory.
+
+Jobs run under ``metrics.run_captured`` so the timings they record in the
+worker process are merged into the API process's metrics.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturatedError(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class ParseWorkerPool:
+    """Bounded async front-end over a ``ProcessPoolExecutor``.
+
+    ``max_workers`` processes run jobs; up to ``max_queue_depth`` further jobs
+    may wait for a free worker. Anything beyond that raises
+    ``PoolSaturatedError`` immediately.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue_depth: Optional[int] = None,
+        max_tasks_per_child: Optional[int] = None,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue_depth = (
+            max_queue_depth if max_queue_depth is not None else self.max_workers * 4
+        )
+        # ifcopenshell does not always hand memory back to the OS, so workers
+        # can be recycled after a number of jobs.
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        # spawn rather than fork: the API process has running threads and
+        # ifcopenshell state that must not be duplicated into children.
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=self.max_tasks_per_child,
+        )
+        logger.info(
+            f"Started parse worker pool: {self.max_workers} workers, "
+            f"queue depth {self.max_queue_depth}"
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue_depth
+
+    @property
+    def queued(self) -> int:
+        return max(self._in_flight - self.max_workers, 0)
+
+    def has_capacity(self) -> bool:
+        return self._in_flight < self.capacity
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` in a worker process and await its result."""
+        if not self.has_capacity():
+            self._rejected += 1
+            raise PoolSaturatedError(
+                f"Parse queue is full ({self._in_flight} jobs in flight)"
+            )
+        if self._executor is None:
+            self.start()
+
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            try:
+                future = loop.run_in_executor(self._executor, metrics.run_captured, fn, *args)
+            except BrokenProcessPool:
+                self._restart()
+                future = loop.run_in_executor(self._executor, metrics.run_captured, fn, *args)
+            self._running = min(self._in_flight, self.max_workers)
+            result, samples = await future
+            metrics.REGISTRY.replay(samples)
+            self._completed += 1
+            return result
+        except BrokenProcessPool:
+            # A worker died (usually OOM-killed on a huge model); replace the
+            # pool so subsequent jobs are not failed as well.
+            self._failed += 1
+            self._restart()
+            raise RuntimeError("Worker process terminated while processing the file")
+        except Exception as e:
+            metrics.REGISTRY.replay(metrics.raised_samples(e))
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._running = min(self._in_flight, self.max_workers)
+
+    def _restart(self) -> None:
+        logger.warning("Parse worker pool is broken, restarting it")
+        self.shutdown(wait=False)
+        self.start()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self._in_flight,
+            "busy_workers": self._running,
+            "queued": self.queued,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+        }
@@ -9,6 +9,40 @@ const upload = multer({ dest: 'uploads/' });
 // BIM service configuration
 const BIM_SERVICE_URL = process.env.BIM_SERVICE_URL || 'http://localhost:8002';
 
+// Pass the BIM service's Retry-After on, so clients that are rate limited
+// (429) or shed under load (503) know when to try again.
+function forwardRetryAfter(res: Response, error: any) {
+  const retryAfter = error.response?.headers?.['retry-after'];
+  if (retryAfter) {
+    res.set('Retry-After', String(retryAfter));
+  }
+}
+
+// Relay a BIM service error. Client errors and load shedding (503) keep their
+// status and detail, so a 409 for a project that is still queued or parsing
+// reaches the caller with its status message and can be polled; anything else
+// is reported as a 500.
+function sendBimError(res: Response, error: any, notFoundMessage: string) {
+  const status = error.response?.status;
+  forwardRetryAfter(res, error);
+  if (status === 404) {
+    return res.status(404).json({
+      success: false,
+      error: notFoundMessage
+    });
+  }
+  if (status && (status < 500 || status === 503)) {
+    return res.status(status).json({
+      success: false,
+      error: error.response.data?.detail || 'BIM service error'
+    });
+  }
+  return res.status(500).json({
+    success: false,
+    error: 'Internal server error'
+  });
+}
+
 // Health check for BIM service
 router.get('/health', async (req: Request, res: Response) => {
   try {
@@ -57,23 +91,30 @@ router.post('/upload', upload.single('file'), async (req: Request, res: Response
       contentType: 'application/octet-stream'
     });
 
-    // Forward to BIM service
+    // Forward to BIM service. Processing blocks until the model is parsed, as
+    // it always has; ?async=true queues the file instead, answers 202 with the
+    // project id and leaves the client to poll /projects/:projectId for status.
+    const asyncMode = req.query.async === 'true';
     const response = await axios.post(`${BIM_SERVICE_URL}/upload`, formData, {
       headers: {
         ...formData.getHeaders()
       },
-      timeout: 30000 // 30 second timeout
+      params: { async_mode: asyncMode },
+      maxBodyLength: Infinity,
+      maxContentLength: Infinity,
+      // A blocking upload waits for the whole parse; async mode only for the file transfer
+      timeout: asyncMode ? 300000 : 900000
     });
 
     // Clean up temporary file
     fs.unlinkSync(req.file.path);
 
-    logger.info('IFC file processed successfully', { 
+    logger.info(asyncMode ? 'IFC file queued for processing' : 'IFC file processed successfully', { 
       filename: req.file.originalname,
       project_id: response.data.project_id 
     });
 
-    res.json(response.data);
+    res.status(response.status).json(response.data);
 
   } catch (error: any) {
     logger.error('Error processing IFC upload', { error: error.message });
@@ -88,6 +129,7 @@ router.post('/upload', upload.single('file'), async (req: Request, res: Response
     }
 
     if (error.response) {
+      forwardRetryAfter(res, error);
       res.status(error.response.status).json({
         success: false,
         error: error.response.data.detail || 'BIM service error'
@@ -112,17 +154,7 @@ router.get('/projects/:projectId', async (req: Request, res: Response) => {
   } catch (error: any) {
     logger.error('Error fetching project', { projectId: req.params.projectId, error: error.message });
     
-    if (error.response?.status === 404) {
-      res.status(404).json({
-        success: false,
-        error: 'Project not found'
-      });
-    } else {
-      res.status(500).json({
-        success: false,
-        error: 'Internal server error'
-      });
-    }
+    sendBimError(res, error, 'Project not found');
   }
 });
 
@@ -137,17 +169,7 @@ router.get('/projects/:projectId/quantities', async (req: Request, res: Response
   } catch (error: any) {
     logger.error('Error fetching quantities', { projectId: req.params.projectId, error: error.message });
     
-    if (error.response?.status === 404) {
-      res.status(404).json({
-        success: false,
-        error: 'Project not found'
-      });
-    } else {
-      res.status(500).json({
-        success: false,
-        error: 'Internal server error'
-      });
-    }
+    sendBimError(res, error, 'Project not found');
   }
 });
 
@@ -162,17 +184,7 @@ router.post('/projects/:projectId/estimate', async (req: Request, res: Response)
   } catch (error: any) {
     logger.error('Error generating estimate', { projectId: req.params.projectId, error: error.message });
     
-    if (error.response?.status === 404) {
-      res.status(404).json({
-        success: false,
-        error: 'Project not found'
-      });
-    } else {
-      res.status(500).json({
-        success: false,
-        error: 'Internal server error'
-      });
-    }
+    sendBimError(res, error, 'Project not found');
   }
 });
 
@@ -195,33 +207,32 @@ router.get('/projects/:projectId/report', async (req: Request, res: Response) =>
   } catch (error: any) {
     logger.error('Error downloading report', { projectId: req.params.projectId, error: error.message });
     
-    if (error.response?.status === 404) {
-      res.status(404).json({
-        success: false,
-        error: 'Project or report not found'
-      });
-    } else {
-      res.status(500).json({
-        success: false,
-        error: 'Internal server error'
-      });
-    }
+    sendBimError(res, error, 'Project or report not found');
   }
 });
 
-// List all projects
+// List projects (paginated; filters, sort and cursor are passed through)
 router.get('/projects', async (req: Request, res: Response) => {
   try {
-    const response = await axios.get(`${BIM_SERVICE_URL}/projects`);
+    const response = await axios.get(`${BIM_SERVICE_URL}/projects`, {
+      params: req.query
+    });
     res.json(response.data);
 
   } catch (error: any) {
     logger.error('Error listing projects', { error: error.message });
     
-    res.status(500).json({
-      success: false,
-      error: 'Internal server error'
-    });
+    if (error.response?.status === 400 || error.response?.status === 422) {
+      res.status(400).json({
+        success: false,
+        error: error.response.data.detail || 'Invalid query'
+      });
+    } else {
+      res.status(500).json({
+        success: false,
+        error: 'Internal server error'
+      });
+    }
   }
 });
 